@@ -1,3 +1,20 @@
+# Alertele si avertismentele trimise catre dashboard
+#
+# send_alert / send_warning sunt apelate din bucla de control, deci fac doar verificarile
+# ieftine: limita de frecventa si deduplicarea, separate pentru fiecare tip si cheie
+# (un avertisment de umiditate nu mai ascunde o alerta de blocaj), apoi pun notificarea
+# in coada. Serializarea JSON si publicarea MQTT ruleaza pe firul "alerts".
+#
+# Ultimele HISTORY_SIZE notificari sunt pastrate in memorie; dashboard-ul le cere dupa o
+# reconectare pe "alerts_history_request" si le primeste pe "alerts_history" (lista JSON,
+# cea mai veche prima, fiecare cu momentul trimiterii in "time").
+#
+# ROBOT_ALERTS_DEBUG=1 scrie in jurnal functia, fisierul si linia care au trimis notificarea
+import os
+import sys
+import threading
+# jurnalul (niveluri pe module)
+import logging
 # comunicarea MQTT
 import mqtt_service  
 # generarea de numere aleatorii
@@ -6,8 +23,24 @@ import random
 import json      
 # operatiuni cu timp   
 import time
-#stivei de apeluri        
-import inspect      
+# coada catre firul de publicare si istoricul limitat
+import queue
+from collections import deque
+
+TOPIC = "send_alerts_warnings"
+HISTORY_TOPIC = "alerts_history"
+
+# Intervalul minim intre doua notificari cu acelasi tip si aceeasi cheie (secunde)
+RATE_LIMITS = {"alert": 2, "warn": 2}
+# O notificare identica (tip, cheie, mesaj) este trimisa cel mult o data in acest interval
+DEDUP_WINDOW = 30
+
+HISTORY_SIZE = 50
+
+# Afisarea apelantului (doar pentru depanare)
+debug = os.environ.get("ROBOT_ALERTS_DEBUG") == "1"
+
+log = logging.getLogger(__name__)
 
 # Clasa - reprezentarea notificarilor
 class Notification():
@@ -29,93 +62,102 @@ class Notification():
         
         self.id = id 
 
-# Var globala pentru evidenta ultimei alerte trimise
-last_alert_time = 0
-
-# Functieactualizarea hartii si trimiterea prin MQTT
-def update_harta(harta, rx, ry):
-    # Lista care contine caracterele afisarea hartii
-    harta_flat = []
-    
-    # Parcurge o zona de 7x7 din harta incepand de la pozitia (14,10)
-    for y in range(10, 10 + 7):        # randurile 10 la 16
-        for x in range(14, 14 + 7):    # coloanele 14 la 20
-            char_harta = ''
-            
-            # Verifica daca pozitia curenta este pozitia robotului
-            if rx == x and ry == y:
-                char_harta = 'R'  # Marcheaza pozitia robotului cu 'R'
-            else:
-                # Determina caracterul corespunzator valorii din harta
-                match harta[y][x]:
-                    case 0:
-                        char_harta = "⠀"  # Spatiu gol/invizibil
-                    case 1:
-                        char_harta = "+"  
-                    case 2:
-                        char_harta = "#"   # obstacol
-                    case 3:
-                        char_harta = "↑"   
-                    case 4:
-                        char_harta = "→"   
-                    case 5:
-                        char_harta = "↓"   
-                    case 6:
-                        char_harta = "←"  
-                    case _:
-                        char_harta = "⠀"  # implicita pentru cazuri necunoscute
-            
-            # Add caracterul la lista 
-            harta_flat.append(char_harta)
-
-    # Afiseaza lista pentru debugging
-    print(harta_flat)
-
-    # Trimite harta actualizata prin MQTT ca mesaj JSON
-    mqtt_service.client.publish("update_harta", json.dumps(harta_flat))
+# Momentul ultimei notificari trimise, pe (tip, cheie)
+last_sent = {}
+# Ultimul mesaj trimis pe (tip, cheie) si momentul lui (pentru deduplicare)
+last_message = {}
+
+# Ultimele notificari trimise: (moment, notificare)
+history = deque(maxlen=HISTORY_SIZE)
+
+# Coada firului de publicare: (topic, notificare sau None pentru istoric)
+pending = queue.SimpleQueue()
+worker = None
+
+# Statistici: notificari trimise, oprite de limita de frecventa, duplicate
+sent = 0
+rate_limited = 0
+duplicates = 0
+
 
 # Functie trimiterea alertelor
-def send_alert(title, message, override_timer = False):
-    # Folosesc var globala pentru timpul ultimei alerte
-    global last_alert_time  
-    
-    # Verifica daca au trecut cel putin 2 secunde de la ultima alerta sau daca este fortat
-    if last_alert_time + 2 < time.time() or override_timer:
-        print("send_alert called.")  # Mesaj de debugging
-        
-        # Obtine informatii despre functia care a apelat aceasta functie
-        caller = inspect.stack()[1]
-        print(f"{caller.function} {caller.filename} {caller.lineno}")  # detalii apelant
-        
-        # Creeaza o noua notificare de tip alerta
-        notif = Notification(title, message, "alert")
-        
-        # Trimite notificarea prin MQTT ca mesaj JSON
-        mqtt_service.client.publish("send_alerts_warnings", json.dumps(notif.__dict__))
-        
-        # Actualizeaza timpul ultimei alerte
-        last_alert_time = time.time()
-    pass  
+def send_alert(title, message, override_timer = False, key = None):
+    notify("alert", title, message, override_timer, key, sys._getframe(1) if debug else None)
+
 
 # Functie trimiterea avertismentelor
-def send_warning(title, message, override_timer = False):
-    # Folosesc var globala pentru timpul ultimei alerte
-    global last_alert_time 
-    
-    # Verifica daca au trecut cel putin 2 secunde de la ultima alerta sau daca este fortat
-    if last_alert_time + 2 < time.time() or override_timer:
-        print("send_warning called.")  # Mesaj de debugging
-        
-        # Obtine informatii despre functia care a apelat aceasta functie
-        caller = inspect.stack()[1]
-        print(f"{caller.function} {caller.filename} {caller.lineno}")  # detalii apelant
-        
-        # Creeaza o noua notificare de tip avertisment
-        notif = Notification(title, message, "warn")
-        
-        # Trimite notificarea prin MQTT ca mesaj JSON
-        mqtt_service.client.publish("send_alerts_warnings", json.dumps(notif.__dict__))
-        
-        # Actualizeaza timpul ultimei alerte
-        last_alert_time = time.time()
-    pass  
\ No newline at end of file
+def send_warning(title, message, override_timer = False, key = None):
+    notify("warn", title, message, override_timer, key, sys._getframe(1) if debug else None)
+
+
+# Verifica limitele pentru (tip, cheie) si pune notificarea in coada
+# Cheia implicita este titlul; override_timer trece peste limita si peste deduplicare
+def notify(type, title, message, override_timer, key, caller):
+    global sent, rate_limited, duplicates
+    now = time.time()
+    key = (type, title if key is None else key)
+
+    if not override_timer:
+        if now - last_sent.get(key, 0) < RATE_LIMITS.get(type, 0):
+            rate_limited += 1
+            return
+        previous = last_message.get(key)
+        if previous is not None and previous[0] == message and now - previous[1] < DEDUP_WINDOW:
+            duplicates += 1
+            return
+
+    if caller is not None:
+        log.info("send %s from %s %s %d", type, caller.f_code.co_name, caller.f_code.co_filename, caller.f_lineno)
+
+    last_sent[key] = now
+    last_message[key] = (message, now)
+    notif = Notification(title, message, type)
+    history.append((now, notif))
+    sent += 1
+    submit(TOPIC, notif)
+
+
+# Cererea dashboard-ului: retrimite istoricul
+def request_history(payload=None):
+    submit(HISTORY_TOPIC, None)
+
+
+# Fara firul de publicare (ex. replay) mesajul este publicat pe loc
+def submit(topic, notif):
+    if worker is None:
+        publish(topic, notif)
+    else:
+        pending.put((topic, notif))
+
+
+def publish(topic, notif):
+    if notif is not None:
+        payload = json.dumps(notif.__dict__)
+    else:
+        payload = json.dumps([dict(entry.__dict__, time=round(moment, 3)) for moment, entry in list(history)])
+    mqtt_service.client.publish(topic, payload)
+
+
+# Firul de publicare: serializeaza si publica notificarile din coada
+# O notificare care nu poate fi publicata este scrisa in jurnal; firul continua cu urmatoarele
+def publish_loop():
+    while True:
+        topic, notif = pending.get()
+        try:
+            publish(topic, notif)
+        except Exception:
+            log.exception("failed to publish on %s", topic)
+
+
+def start():
+    global worker
+    if worker is not None:
+        return
+    worker = threading.Thread(target=publish_loop, name="alerts", daemon=True)
+    worker.start()
+
+
+# Statisticile notificarilor (pentru metrici / depanare)
+def stats():
+    return {"sent": sent, "rate_limited": rate_limited, "duplicates": duplicates,
+            "history": len(history), "queued": pending.qsize()}
@@ -0,0 +1,253 @@
+# Runtime asyncio pentru backend (ROBOT_RUNTIME=asyncio python main.py)
+#
+# Toate sursele de evenimente sunt conduse de o singura bucla asyncio:
+#   - portul serial al Pico-ului: loop.add_reader + pico_to_pi_service.feed()
+#   - MQTT: socket-ul clientului paho inregistrat in bucla (fara firul loop_start())
+#   - camera: cap.read() intr-un executor, apoi sarcina de viziune pe bucla
+#   - modurile: o corutina care face un pas al modului la fiecare pachet de telemetrie sau dupa
+#     MODE_TIMEOUT; starile modurilor sunt pasi scurti, fara asteptari blocante, asa ca
+#     temporizatoarele lor sunt verificate la fiecare pas
+# Callback-urile MQTT si masinile de stari ruleaza astfel pe acelasi fir, fara curse intre fire.
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+# clientul MQTT
+import paho.mqtt.client as mqtt
+# serial
+import serial
+# modulele backend-ului
+import shared
+import pico_to_pi_service
+import mqtt_service
+import mode_service
+import camera_service
+import preview_service
+import metrics_service
+import vision_workers
+import command_writer
+import pico_link
+import telemetry_service
+
+# Brokerul MQTT (implicit cel local, vezi shared.py)
+MQTT_HOST, MQTT_PORT = shared.mqtt_host, shared.mqtt_port
+
+# Cat asteapta modurile un pachet de telemetrie inainte sa faca oricum un pas (secunde)
+MODE_TIMEOUT = 0.1
+
+# Eveniment semnalat la fiecare pachet nou de telemetrie (creat in main())
+telemetry = None
+
+# Daca o scriere a comenzilor / procesarea comenzilor MQTT este deja programata pe bucla
+flush_scheduled = False
+commands_scheduled = False
+
+
+# Conduce clientul paho din bucla asyncio: citirea, scrierea si intretinerea
+# conexiunii se fac cand socket-ul este gata, nu pe un fir separat
+class AsyncMqtt():
+    def __init__(self, loop, client):
+        self.loop = loop
+        self.client = client
+        self.misc = None
+
+        client.on_socket_open = self.on_socket_open
+        client.on_socket_close = self.on_socket_close
+        client.on_socket_register_write = self.on_socket_register_write
+        client.on_socket_unregister_write = self.on_socket_unregister_write
+
+    # connect() ruleaza in executor, deci socket-ul este inregistrat pe bucla, nu pe firul apelant
+    def on_socket_open(self, client, userdata, sock):
+        self.loop.call_soon_threadsafe(self.attach, sock)
+
+    def on_socket_close(self, client, userdata, sock):
+        self.loop.call_soon_threadsafe(self.detach, sock)
+
+    def attach(self, sock):
+        self.loop.add_reader(sock, self.client.loop_read)
+        self.misc = self.loop.create_task(self.misc_loop())
+
+    def detach(self, sock):
+        self.loop.remove_reader(sock)
+        if self.misc is not None:
+            self.misc.cancel()
+
+    # publish() poate fi apelat si din alte fire; inregistrarea se face pe bucla
+    def on_socket_register_write(self, client, userdata, sock):
+        self.loop.call_soon_threadsafe(self.loop.add_writer, sock, client.loop_write)
+
+    def on_socket_unregister_write(self, client, userdata, sock):
+        self.loop.call_soon_threadsafe(self.loop.remove_writer, sock)
+
+    # Keepalive si retransmiteri (echivalentul loop_misc() din firul paho)
+    async def misc_loop(self):
+        while self.client.loop_misc() == mqtt.MQTT_ERR_SUCCESS:
+            await asyncio.sleep(1)
+
+
+# Apelat de bucla cand portul serial are date: decodifica toate pachetele complete
+def on_serial_readable(pico):
+    try:
+        waiting = pico.in_waiting
+        data = pico.read(waiting) if waiting else b""
+    except (serial.SerialException, OSError) as e:
+        pico_link.lost(pico, e)
+        return
+
+    if data and pico_to_pi_service.feed(data):
+        # Pe bucla nu exista sarcina de telemetrie: aplicam imediat ultimul pachet
+        pico_to_pi_service.receive()
+        # Siguranta reactioneaza la fiecare pachet, apoi trezim corutinele care asteapta telemetria
+        mode_service.check_safety()
+        telemetry.set()
+        telemetry.clear()
+
+
+# Portul (re)deschis de pico_link este citit de bucla
+def attach_serial(loop, pico):
+    loop.call_soon_threadsafe(loop.add_reader, pico.fileno(), on_serial_readable, pico)
+
+
+# Portul vechi iese din bucla inainte ca descriptorul lui sa fie refolosit
+def detach_serial(loop, pico):
+    fd = pico.fileno()
+    loop.call_soon_threadsafe(loop.remove_reader, fd)
+
+
+# Comenzile schimbate in acelasi pas al buclei pleaca intr-o singura scriere
+def run_flush():
+    global flush_scheduled
+    flush_scheduled = False
+    command_writer.flush()
+
+
+# Apelat la fiecare schimbare a comenzilor (si din firele executorului / HTTP)
+def request_flush(loop):
+    global flush_scheduled
+    if not flush_scheduled:
+        flush_scheduled = True
+        loop.call_soon_threadsafe(run_flush)
+
+
+# Comenzile MQTT din coada ruleaza dupa callback-ul paho curent
+def run_commands():
+    global commands_scheduled
+    commands_scheduled = False
+    mqtt_service.process_commands()
+    # Siguranta are ultimul cuvant si dupa comenzile manuale
+    mode_service.check_safety()
+
+
+def request_commands(loop):
+    global commands_scheduled
+    if not commands_scheduled:
+        commands_scheduled = True
+        loop.call_soon_threadsafe(run_commands)
+
+
+# Camera: citirea blocanta ruleaza in executor, procesarea pe bucla
+async def camera_loop(executor):
+    loop = asyncio.get_running_loop()
+    camera = camera_service.camera
+    camera.cap = await loop.run_in_executor(executor, camera_service.open_capture, camera.device)
+
+    while True:
+        t = metrics_service.start()
+        if camera.retrieve:
+            ret, frame = await loop.run_in_executor(executor, camera.cap.read)
+        else:
+            # Nimeni nu are nevoie de imagine: doar golim buffer-ul camerei
+            ret, frame = await loop.run_in_executor(executor, camera.cap.grab), None
+        metrics_service.stop("camera.read" if camera.retrieve else "camera.grab", t)
+
+        if not ret:
+            await asyncio.sleep(0.01)
+            continue
+
+        camera.publish(frame, time.time())
+        mode_service.run_vision()
+
+
+# Modurile manual / aspirare fac un pas la fiecare pachet de telemetrie
+# (sau dupa MODE_TIMEOUT, ca temporizatoarele lor sa expire si fara date noi)
+async def mode_loop():
+    while True:
+        try:
+            await asyncio.wait_for(telemetry.wait(), MODE_TIMEOUT)
+        except asyncio.TimeoutError:
+            pass
+        mode_service.run_mode()
+
+
+# Ruleaza o functie de rate ori pe secunda, pe termene fixe
+async def periodic(function, rate):
+    loop = asyncio.get_running_loop()
+    next_run = loop.time()
+    while True:
+        function()
+        next_run += 1 / rate
+        delay = next_run - loop.time()
+        if delay < 0:
+            # Termen pierdut: nu incercam sa recuperam
+            next_run = loop.time()
+            delay = 0
+        await asyncio.sleep(delay)
+
+
+# Publicarea statisticilor pe MQTT (in locul firului din metrics_service)
+async def metrics_loop(client):
+    while True:
+        await asyncio.sleep(metrics_service.publish_interval)
+        if metrics_service.enabled and metrics_service.stages:
+            client.publish(metrics_service.TOPIC, json.dumps(metrics_service.snapshot()))
+
+
+async def main():
+    global telemetry
+    loop = asyncio.get_running_loop()
+    telemetry = asyncio.Event()
+
+    # Portul serial este citit de bucla (in locul firului de citire din pico_to_pi_service),
+    # si dupa fiecare reconectare
+    pico_link.on_connect.append(lambda pico: attach_serial(loop, pico))
+    pico_link.on_disconnect.append(lambda pico: detach_serial(loop, pico))
+    if shared.pico is not None:
+        attach_serial(loop, shared.pico)
+
+    # Comenzile: trimise dupa callback-ul curent, plus keepalive-ul periodic
+    command_writer.on_change = lambda: request_flush(loop)
+
+    # MQTT pe bucla; comenzile primite ruleaza tot pe bucla
+    mqtt_service.on_command = lambda: request_commands(loop)
+    # Conectarea (DNS, TCP, CONNECT) este blocanta: ruleaza in executor, nu pe bucla
+    client = mqtt_service.client
+    AsyncMqtt(loop, client)
+    await loop.run_in_executor(None, client.connect, MQTT_HOST, MQTT_PORT)
+
+    tasks = [
+        mode_loop(),
+        periodic(mode_service.sample_sensors, mode_service.SENSOR_RATE),
+        periodic(mode_service.check_alerts, mode_service.ALERT_RATE),
+        periodic(command_writer.flush, mode_service.COMMAND_RATE),
+        periodic(mode_service.run_map, mode_service.MAP_RATE),
+        periodic(mode_service.run_preview, preview_service.preview_fps),
+        metrics_loop(client),
+    ]
+    if telemetry_service.sample_rate > 0:
+        tasks.append(periodic(telemetry_service.publish_step, telemetry_service.sample_rate))
+
+    # Viziunea: rezultatele proceselor de viziune sau camera citita in executor
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="camera")
+    if mode_service.use_vision_pipeline:
+        loop.add_reader(vision_workers.result_read_fd, mode_service.run_vision)
+    else:
+        tasks.append(camera_loop(executor))
+
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        if shared.pico is not None:
+            loop.remove_reader(shared.pico.fileno())
+        if mode_service.use_vision_pipeline:
+            loop.remove_reader(vision_workers.result_read_fd)
+        executor.shutdown(wait=False)
@@ -0,0 +1,161 @@
+# OpenCV pentru accesul la camera
+import cv2
+# firul de executie separat pentru citirea camerei
+import threading
+import time
+# masurarea duratelor pe etape
+import metrics_service
+# jurnalul (niveluri pe module)
+import logging
+
+log = logging.getLogger(__name__)
+
+# Parametrii camerei: rezolutie si dimensiunea buffer-ului driverului V4L2
+width, height, buffersize = 640, 480, 2
+
+
+# Deschide camera si seteaza rezolutia si dimensiunea buffer-ului
+def open_capture(device):
+    cap = cv2.VideoCapture(device)
+
+    # Configuram proprietatile camerei cu valorile dorite
+    log.info("camera %s: %dx%d, buffer size %d", device, width, height, buffersize)
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, buffersize)
+
+    return cap
+
+
+# Clasa care citeste continuu camera pe un fir separat si pastreaza doar cel mai nou frame
+class CameraGrabber():
+    device: str                  # Calea catre dispozitivul video
+    cap: cv2.VideoCapture        # Obiectul OpenCV pentru camera
+    frame: object                # Ultimul frame citit (None daca a fost doar golit din buffer)
+    frame_id: int                # Numarul de ordine al ultimului frame (0 = niciun frame)
+    frame_time: float            # Momentul capturii ultimului frame (time.time())
+    failed_reads: int            # Numarul de citiri esuate consecutive
+    retrieve: bool               # Decodam imaginile (False = doar golim buffer-ul driverului)
+    on_frame: object             # Functie apelata dupa publicarea fiecarui frame (sau None)
+
+    def __init__(self, device="/dev/video0"):
+        self.device = device
+        self.cap = None
+        self.frame = None
+        self.frame_id = 0
+        self.frame_time = 0
+        self.failed_reads = 0
+        self.retrieve = True
+        self.on_frame = None
+
+        # Conditia protejeaza slotul cu ultimul frame si trezeste cititorii care asteapta
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = False
+
+    # Deschide camera si porneste firul de citire
+    def start(self):
+        if self._running:
+            return
+
+        self.cap = open_capture(self.device)
+
+        self._running = True
+        self._thread = threading.Thread(target=self._grab_loop, name="camera-grabber", daemon=True)
+        self._thread.start()
+
+    # Bucla firului de citire - blocheaza doar acest fir, niciodata bucla de control
+    def _grab_loop(self):
+        while self._running:
+            t = metrics_service.start()
+            if self.retrieve:
+                # cap.read() aloca un array nou la fiecare apel, deci frame-urile
+                # publicate nu sunt suprascrise de citirile urmatoare
+                ret, frame = self.cap.read()
+            else:
+                # Nimeni nu are nevoie de imagine: scoatem frame-ul din buffer fara
+                # sa-l decodam, dar il publicam ca bucla de control sa pastreze ritmul camerei
+                ret, frame = self.cap.grab(), None
+            capture_time = time.time()
+            metrics_service.stop("camera.read" if self.retrieve else "camera.grab", t)
+
+            if not ret:
+                self.failed_reads += 1
+                # Afisam eroarea o singura data pe secventa de esecuri
+                if self.failed_reads == 1:
+                    log.warning("failed to capture frame from camera")
+                time.sleep(0.01)
+                continue
+
+            self.failed_reads = 0
+            self.publish(frame, capture_time)
+
+    # Publica un frame in slot si trezeste cititorii care asteapta
+    # (apelat de firul de citire sau, la replay, cu frame-uri din sesiune)
+    def publish(self, frame, capture_time):
+        with self._cond:
+            self.frame = frame
+            self.frame_id += 1
+            self.frame_time = capture_time
+            self._cond.notify_all()
+
+        # Ex. trezeste sarcina de viziune din planificator
+        if self.on_frame is not None:
+            self.on_frame()
+
+    # Returneaza imediat ultimul frame: (frame_id, frame_time, frame)
+    # frame_id este 0 si frame este None daca nu a fost capturat niciun frame;
+    # frame este None si daca imaginea nu a fost decodata (retrieve = False)
+    def get_latest(self):
+        with self._cond:
+            return self.frame_id, self.frame_time, self.frame
+
+    # Asteapta un frame mai nou decat frame_id (cel mult timeout secunde)
+    # Returneaza acelasi tuplu ca get_latest(); daca expira timpul, frame_id ramane neschimbat
+    def wait_newer(self, frame_id, timeout=None):
+        with self._cond:
+            self._cond.wait_for(lambda: self.frame_id > frame_id or not self._running, timeout)
+            return self.frame_id, self.frame_time, self.frame
+
+    # Opreste firul de citire si elibereaza camera
+    def release(self):
+        self._running = False
+        with self._cond:
+            self._cond.notify_all()
+
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+
+# Dispozitivul video folosit de robot
+device = "/dev/video0"
+
+# Instanta globala a camerei; este pornita de mode_service cu start()
+camera = CameraGrabber(device)
+
+
+# Functii de nivel modul pentru ceilalti consumatori
+def start():
+    camera.start()
+
+
+# Alege daca firul de citire decodeaza imaginile sau doar goleste buffer-ul camerei
+def set_retrieve(retrieve):
+    camera.retrieve = retrieve
+
+
+def get_latest():
+    return camera.get_latest()
+
+
+def wait_newer(frame_id, timeout=None):
+    return camera.wait_newer(frame_id, timeout)
+
+
+def release():
+    camera.release()
@@ -0,0 +1,176 @@
+# Scrierea comenzilor catre Pico (motoarele si perie / aspirator)
+#
+# Modurile, siguranta si comenzile MQTT doar actualizeaza starea dorita; flush() ruleaza
+# o data pe pas al buclei de control si trimite, intr-un singur write(), doar pachetele care
+# difera de ce a primit deja Pico-ul. Mai multe schimbari in acelasi pas devin o singura
+# scriere, iar starea curenta este retrimisa periodic (keepalive), ca Pico-ul sa revina
+# la starea corecta si dupa o comanda pierduta.
+#
+# Tintele de pozitie (protocolul v3) sunt evenimente, nu stari: comanda GOAL pleaca o singura
+# data, iar cat timp tinta ruleaza pe Pico nu retrimitem comanda motoarelor (ar anula-o).
+import os
+import time
+# erorile portului serial
+import serial
+# modul partajat (portul serial)
+import shared
+# masurarea duratelor pe etape
+import metrics_service
+# formatul comenzilor de tinta
+import pico_codec
+# conexiunea cu Pico-ul (starea legaturii si politica comenzilor cat timp este cazuta)
+import pico_link
+
+# Header-ele comenzilor (6 octeti fiecare)
+MOTORS_HEADER = bytes([0xF0, 0x0F])   # viteza_stanga, viteza_dreapta, directie_stanga, directie_dreapta
+STATES_HEADER = bytes([0x7A, 0xF3])   # stare_perie, stare_aspirator, rezervat, rezervat
+
+# De cate ori pe secunda retrimitem starea curenta chiar daca nu s-a schimbat (0 = niciodata)
+keepalive_rate = float(os.environ.get("ROBOT_KEEPALIVE_RATE", "2"))
+
+# Starea dorita (ultima ceruta de backend)
+motors = (0, 0, False, False)
+states = (False, False)
+# Parametrii tintelor de pozitie: viteza maxima (0-255), toleranta (pasi)
+goal_config = (120, 10)
+# Comanda GOAL netrimisa inca (id, pasi_stanga, pasi_dreapta) sau None
+pending_goal = None
+# Daca o tinta trimisa ruleaza pe Pico (pana la raport sau la o comanda directa)
+goal_active = False
+
+# Starea trimisa ultima data catre Pico (None = inca nimic trimis)
+sent_motors = None
+sent_states = None
+sent_goal_config = None
+last_write = 0
+
+# Apelat cand starea dorita difera de cea trimisa (bucla trezeste sarcina de scriere)
+on_change = None
+
+# Statistici: cereri primite, scrieri pe port, dintre care keepalive
+updates = 0
+writes = 0
+keepalives = 0
+
+
+def set_motors(left_speed, right_speed, left_reverse, right_reverse):
+    global motors, updates, sent_motors, goal_active, pending_goal
+    motors = (left_speed, right_speed, bool(left_reverse), bool(right_reverse))
+    updates += 1
+    if goal_active or pending_goal is not None:
+        # O comanda directa opreste tinta: trebuie trimisa chiar daca pare neschimbata
+        goal_active = False
+        pending_goal = None
+        sent_motors = None
+    if motors != sent_motors and on_change is not None:
+        on_change()
+
+
+# Porneste o tinta relativa pe Pico (pasi de encoder, in coordonatele firmware-ului)
+def start_goal(goal_id, left_steps, right_steps):
+    global motors, sent_motors, pending_goal, goal_active, updates
+    pending_goal = (goal_id, left_steps, right_steps)
+    goal_active = True
+    # Dupa tinta Pico-ul ramane oprit; keepalive-ul de dupa ea nu trebuie sa porneasca motoarele
+    motors = (0, 0, False, False)
+    sent_motors = motors
+    updates += 1
+    if on_change is not None:
+        on_change()
+
+
+# Apelat cand Pico-ul a raportat terminarea tintei
+def goal_finished():
+    global goal_active
+    goal_active = False
+
+
+def set_goal_config(max_speed, dead_band):
+    global goal_config
+    goal_config = (max_speed, dead_band)
+
+
+def set_states(perie, aspirator):
+    global states, updates
+    states = (bool(perie), bool(aspirator))
+    updates += 1
+    if states != sent_states and on_change is not None:
+        on_change()
+
+
+# Trimite schimbarile (sau toata starea, la keepalive / force) intr-o singura scriere
+def flush(force=False):
+    global sent_motors, sent_states, sent_goal_config, pending_goal, last_write, writes, keepalives
+
+    now = time.time()
+    keepalive = keepalive_rate > 0 and now - last_write >= 1 / keepalive_rate
+
+    # O singura citire a starii dorite (poate fi schimbata din firul MQTT)
+    current_motors, current_states, goal = motors, states, pending_goal
+
+    packet = bytearray()
+    # Cat timp ruleaza o tinta, comanda motoarelor nu este retrimisa (ar opri tinta)
+    if current_motors != sent_motors or ((force or keepalive) and not goal_active):
+        packet += MOTORS_HEADER + bytes(current_motors)
+    if force or keepalive or current_states != sent_states:
+        packet += STATES_HEADER + bytes(current_states) + bytes(2)
+    if goal is not None:
+        if goal_config != sent_goal_config:
+            packet += pico_codec.goal_config(*goal_config)
+        packet += pico_codec.goal(*goal)
+    if not packet:
+        return
+
+    # Legatura cazuta: starea ramane netrimisa pana la reconectare
+    pico = shared.pico
+    if pico is None:
+        return
+
+    t = metrics_service.start()
+    try:
+        pico.write(packet)
+    except (serial.SerialException, OSError) as e:
+        # Starea ramane netrimisa; pico_link reface legatura
+        pico_link.lost(pico, e)
+        return
+    metrics_service.stop("serial.write", t)
+
+    sent_motors, sent_states = current_motors, current_states
+    if goal is not None:
+        sent_goal_config = goal_config
+        # O tinta noua ceruta intre timp ramane de trimis
+        if pending_goal is goal:
+            pending_goal = None
+    last_write = now
+    writes += 1
+    if keepalive and not force:
+        keepalives += 1
+
+
+# Legatura a cazut: Pico-ul poate fi repornit, deci nu mai stim ce stare are
+def on_link_lost(port):
+    global sent_motors, sent_states, sent_goal_config, pending_goal, goal_active
+    sent_motors, sent_states, sent_goal_config = None, None, None
+    # Tinta in curs s-a pierdut odata cu legatura
+    pending_goal = None
+    goal_active = False
+
+
+# Dupa reconectare trimitem starea imediat, nu la urmatorul termen
+def on_link_connect(port):
+    global motors
+    if pico_link.offline_policy == "stop":
+        # Comenzile motoarelor cerute inainte sau in timpul intreruperii nu mai sunt trimise:
+        # motoarele pornesc oprite, iar modul activ le comanda din nou la pasul urmator
+        motors = (0, 0, False, False)
+    if on_change is not None:
+        on_change()
+
+
+pico_link.on_disconnect.append(on_link_lost)
+pico_link.on_connect.append(on_link_connect)
+
+
+# Statisticile scrierii (pentru metrici / depanare)
+def stats():
+    return {"updates": updates, "writes": writes, "keepalives": keepalives}
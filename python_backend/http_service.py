@@ -0,0 +1,54 @@
+# server HTTP din biblioteca standard, cu un fir pentru fiecare client
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import threading
+# modul partajat (indicatorul pentru hardware)
+import shared
+
+# Portul pe care serverul backend-ului asculta (Node-RED foloseste 1880)
+port = 8081
+
+# Rutele inregistrate de celelalte servicii: cale -> functie(request)
+routes = {}
+
+
+# Clasa care trimite fiecare cerere GET catre functia inregistrata pentru cale
+class RequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        # Ignoram parametrii din URL (ex. /camera.jpg?timestamp)
+        path = self.path.split("?", 1)[0]
+        handler = routes.get(path)
+
+        if handler is None:
+            self.send_error(404)
+            return
+
+        try:
+            handler(self)
+        except (BrokenPipeError, ConnectionResetError):
+            # Clientul a inchis conexiunea (ex. s-a inchis dashboard-ul)
+            pass
+
+    # Nu afisam fiecare cerere in consola
+    def log_message(self, format, *args):
+        pass
+
+
+# Inregistreaza o functie care raspunde la cererile GET pentru o cale
+def add_route(path, handler):
+    routes[path] = handler
+
+
+# Pornim serverul pe un fir separat, ca sa nu blocheze bucla de control
+# (fara hardware, ex. la replay, backend-ul ruleaza fara server)
+server = None
+if shared.hardware_enabled:
+    server = ThreadingHTTPServer(("0.0.0.0", port), RequestHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="http-server", daemon=True).start()
+
+
+# Opreste serverul la iesirea din program
+def stop():
+    if server is not None:
+        server.shutdown()
+        server.server_close()
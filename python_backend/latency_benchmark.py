@@ -0,0 +1,462 @@
+# Benchmark pentru latenta comenzilor: de la dashboard (MQTT) pana la portul serial al Pico-ului
+#
+# Backend-ul real (main.py) ruleaza intr-un proces separat, conectat la:
+#   - un broker MQTT minimal (LoopbackBroker, QoS 0) pe 127.0.0.1, pornit in acest proces
+#   - Pico-ul simulat pe un PTY (pico_simulator), tot in acest proces
+# Ambele capete sunt marcate cu time.time() (acelasi ceas pentru ambele procese):
+#   mqtt_to_serial          comanda publicata de "dashboard" -> pachetul motoarelor primit de Pico
+#   storm                   ultima comanda dintr-o rafala -> starea ei pe Pico
+#                           (si cate pachete ale motoarelor a produs rafala)
+#   telemetry_to_actuation  primul pachet cu ir_scari -> comanda de oprire
+#   mode_switch             "mode" publicat -> prima comanda de miscare a modului nou
+#
+# Utilizare:
+#   python latency_benchmark.py
+#   python latency_benchmark.py --runtime asyncio --count 500
+#   python latency_benchmark.py --output latenta.jsonl   - adauga o linie JSON (comparabila intre commit-uri)
+import os
+import sys
+import json
+import time
+import queue
+import signal
+import socket
+import struct
+import argparse
+import threading
+import subprocess
+# percentilele
+import numpy as np
+# clientul MQTT al "dashboard-ului"
+import paho.mqtt.client as mqtt
+# Pico-ul simulat
+import pico_simulator
+
+# Cat asteptam reactia la un eveniment (secunde); peste atat evenimentul este numarat ca pierdut
+TIMEOUT = 1.0
+# Cat asteptam pornirea backend-ului (conectarea la broker si la Pico)
+STARTUP_TIMEOUT = 30.0
+
+# Comenzile manuale folosite, prin rotatie (oricare doua consecutive schimba motoarele)
+DRIVE_COMMANDS = ("forward", "left", "down", "right")
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+# Broker MQTT 3.1.1 minimal, doar QoS 0: CONNECT, SUBSCRIBE, PUBLISH, PING, DISCONNECT
+# Mesajele retinute nu sunt pastrate (backend-ul nu are nevoie de ele pentru comenzi)
+class LoopbackBroker():
+    port: int                   # Portul ales de sistem
+    subscriptions: dict         # socket -> filtrele topicurilor
+
+    def __init__(self, host="127.0.0.1", port=0):
+        self.server = socket.create_server((host, port))
+        self.port = self.server.getsockname()[1]
+        self.subscriptions = {}
+        self.lock = threading.Lock()
+        self.running = False
+
+    def start(self):
+        self.running = True
+        threading.Thread(target=self.accept_loop, name="broker", daemon=True).start()
+
+    def stop(self):
+        self.running = False
+        self.server.close()
+        with self.lock:
+            for conn in self.subscriptions:
+                conn.close()
+
+    # Filtrele la care este abonat cineva (ex. pentru a sti cand backend-ul este gata)
+    def subscribed(self):
+        with self.lock:
+            return set().union(*self.subscriptions.values()) if self.subscriptions else set()
+
+    def accept_loop(self):
+        while self.running:
+            try:
+                conn, _ = self.server.accept()
+            except OSError:
+                return
+            # Pachetele mici pleaca imediat (fara Nagle), ca la un broker real pe loopback
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            with self.lock:
+                self.subscriptions[conn] = set()
+            threading.Thread(target=self.client_loop, args=(conn,), name="broker-client", daemon=True).start()
+
+    def client_loop(self, conn):
+        reader = conn.makefile("rb")
+        try:
+            while True:
+                header = reader.read(1)
+                if not header:
+                    break
+                body = reader.read(read_length(reader))
+                if not self.handle(conn, header[0], body):
+                    break
+        except (OSError, ValueError):
+            pass
+        with self.lock:
+            self.subscriptions.pop(conn, None)
+        conn.close()
+
+    # Trateaza un pachet; returneaza False cand clientul se deconecteaza
+    def handle(self, conn, header, body):
+        kind = header >> 4
+        if kind == 1:       # CONNECT
+            conn.sendall(b"\x20\x02\x00\x00")
+        elif kind == 3:     # PUBLISH
+            length = struct.unpack_from(">H", body)[0]
+            topic = body[2:2 + length].decode()
+            offset = 2 + length
+            qos = (header >> 1) & 3
+            if qos:
+                packet_id = body[offset:offset + 2]
+                offset += 2
+                conn.sendall(b"\x40\x02" + packet_id)
+            self.forward(topic, body[offset:])
+        elif kind == 8:     # SUBSCRIBE
+            packet_id, offset, filters = body[:2], 2, []
+            while offset < len(body):
+                length = struct.unpack_from(">H", body, offset)[0]
+                filters.append(body[offset + 2:offset + 2 + length].decode())
+                offset += 2 + length + 1
+            with self.lock:
+                self.subscriptions[conn].update(filters)
+            conn.sendall(encode_packet(0x90, packet_id + bytes(len(filters))))
+        elif kind == 10:    # UNSUBSCRIBE
+            conn.sendall(b"\xB0\x02" + body[:2])
+        elif kind == 12:    # PINGREQ
+            conn.sendall(b"\xD0\x00")
+        elif kind == 14:    # DISCONNECT
+            return False
+        return True
+
+    # Trimite mesajul (QoS 0) tuturor clientilor abonati la topic
+    def forward(self, topic, payload):
+        encoded = topic.encode()
+        packet = encode_packet(0x30, struct.pack(">H", len(encoded)) + encoded + payload)
+        with self.lock:
+            targets = [conn for conn, filters in self.subscriptions.items()
+                       if any(topic_matches(f, topic) for f in filters)]
+        for conn in targets:
+            try:
+                conn.sendall(packet)
+            except OSError:
+                pass
+
+
+# Lungimea ramasa din header-ul fix (cate 7 biti pe octet)
+def read_length(reader):
+    length, shift = 0, 0
+    while True:
+        byte = reader.read(1)
+        if not byte:
+            raise ValueError("connection closed")
+        length |= (byte[0] & 0x7F) << shift
+        if not byte[0] & 0x80:
+            return length
+        shift += 7
+
+
+def encode_packet(header, body):
+    length, encoded = len(body), bytearray()
+    while True:
+        byte, length = length & 0x7F, length >> 7
+        encoded.append(byte | (0x80 if length else 0))
+        if not length:
+            break
+    return bytes([header]) + bytes(encoded) + body
+
+
+# Potrivirea unui filtru MQTT (cu + si #) pe un topic
+def topic_matches(pattern, topic):
+    pattern_parts, topic_parts = pattern.split("/"), topic.split("/")
+    for i, part in enumerate(pattern_parts):
+        if part == "#":
+            return True
+        if i >= len(topic_parts) or (part != "+" and part != topic_parts[i]):
+            return False
+    return len(pattern_parts) == len(topic_parts)
+
+
+# Evenimentele vazute de Pico-ul simulat: comenzile motoarelor si intrarile trimise
+class PicoProbe():
+    def __init__(self, pico):
+        self.motors = queue.Queue()
+        self.inputs = queue.Queue()
+        self.connected = threading.Event()
+        pico.on_command = self.on_command
+        pico.on_input_sent = self.on_input_sent
+
+    def on_command(self, name, command, received):
+        if name == "motors":
+            self.motors.put((received, command[2:6]))
+        elif name == "states":
+            # Backend-ul trimite starea la conectare (si la fiecare keepalive)
+            self.connected.set()
+
+    def on_input_sent(self, name, value, sent):
+        self.inputs.put((name, value, sent))
+
+    def drain(self):
+        for events in (self.motors, self.inputs):
+            while not events.empty():
+                events.get_nowait()
+
+    # Prima comanda a motoarelor dupa momentul after care indeplineste conditia:
+    # (momentul, comanda, cate comenzi ale motoarelor au sosit pana la ea); momentul este None la timeout
+    def wait_motors(self, after, condition, timeout=TIMEOUT):
+        deadline = time.time() + timeout
+        count = 0
+        while True:
+            try:
+                received, motors = self.motors.get(timeout=max(0.0, deadline - time.time()))
+            except queue.Empty:
+                return None, None, count
+            if received < after:
+                continue
+            count += 1
+            if condition(motors):
+                return received, motors, count
+
+    def wait_input(self, name, value, timeout=TIMEOUT):
+        deadline = time.time() + timeout
+        while True:
+            try:
+                event = self.inputs.get(timeout=max(0.0, deadline - time.time()))
+            except queue.Empty:
+                return None
+            if event[0] == name and event[1] == value:
+                return event[2]
+
+
+def is_moving(motors):
+    return motors[0] > 0 or motors[1] > 0
+
+
+def is_stopped(motors):
+    return not is_moving(motors)
+
+
+# Distributia latentelor (ms) si evenimentele pierdute
+def summarize(latencies, timeouts, **extra):
+    result = {"count": len(latencies), "timeouts": timeouts}
+    if latencies:
+        samples = np.array(latencies) * 1000
+        p50, p95, p99 = np.percentile(samples, (50, 95, 99))
+        result.update({"mean_ms": round(float(samples.mean()), 3), "p50_ms": round(float(p50), 3),
+                       "p95_ms": round(float(p95), 3), "p99_ms": round(float(p99), 3),
+                       "max_ms": round(float(samples.max()), 3)})
+    result.update(extra)
+    return result
+
+
+class Benchmark():
+    def __init__(self, dashboard, probe, pico, args):
+        self.dashboard = dashboard
+        self.probe = probe
+        self.pico = pico
+        self.args = args
+        # Comanda motoarelor produsa de fiecare comanda manuala (invatata la mqtt_to_serial)
+        self.drive_motors = {}
+        self.last_motors = None
+
+    def publish(self, topic, payload=""):
+        sent = time.time()
+        self.dashboard.publish(topic, payload)
+        return sent
+
+    # Publica o comanda si asteapta reactia ei, fara sa o masoare
+    def settle(self, topic, payload=""):
+        self.probe.drain()
+        sent = self.publish(topic, payload)
+        received, _, _ = self.probe.wait_motors(sent, lambda motors: True, 0.3)
+        time.sleep(0.05)
+        return received
+
+    def set_mode(self, mode):
+        self.probe.drain()
+        self.publish("mode", mode)
+        time.sleep(0.3)
+        self.last_motors = None
+
+    # Comanda manuala -> pachetul motoarelor, cate o comanda la 1 / rate secunde
+    def mqtt_to_serial(self):
+        self.set_mode("manual")
+        latencies, timeouts = [], 0
+        for i in range(self.args.count):
+            topic = DRIVE_COMMANDS[i % len(DRIVE_COMMANDS)]
+            last = self.last_motors
+            sent = self.publish(topic)
+            received, motors, _ = self.probe.wait_motors(sent, lambda motors: motors != last)
+            if received is None:
+                timeouts += 1
+            else:
+                latencies.append(received - sent)
+                self.last_motors = motors
+                self.drive_motors.setdefault(topic, motors)
+            time.sleep(1 / self.args.rate)
+        return summarize(latencies, timeouts)
+
+    # Rafale de comenzi publicate una dupa alta; doar ultima conteaza pentru motoare
+    def storm(self):
+        self.set_mode("manual")
+        target = self.drive_motors.get("left")
+        latencies, timeouts, writes = [], 0, []
+        for _ in range(self.args.bursts):
+            # Pornim dintr-o stare diferita de cea finala a rafalei
+            self.settle("down")
+            self.probe.drain()
+            first = time.time()
+            for i in range(self.args.storm_size - 1):
+                self.dashboard.publish(DRIVE_COMMANDS[i % len(DRIVE_COMMANDS)])
+            sent = self.publish("left")
+            received, _, count = self.probe.wait_motors(
+                first, (lambda motors: motors == target) if target else is_moving)
+            if received is None:
+                timeouts += 1
+            else:
+                latencies.append(received - sent)
+                writes.append(count)
+            time.sleep(0.1)
+        return summarize(latencies, timeouts, storm_size=self.args.storm_size,
+                         motor_writes_per_burst=round(float(np.mean(writes)), 2) if writes else None)
+
+    # Senzorul de scari activat in timpul miscarii -> comanda de oprire
+    def telemetry_to_actuation(self):
+        self.set_mode("manual")
+        latencies, timeouts = [], 0
+        for _ in range(self.args.events):
+            # Rotirea pe loc nu depinde de distantele pana la pereti
+            if self.settle("left") is None:
+                timeouts += 1
+                continue
+            self.probe.drain()
+            self.pico.set_input("ir_scari", True)
+            sent = self.probe.wait_input("ir_scari", True)
+            received = self.probe.wait_motors(sent, is_stopped)[0] if sent else None
+            self.pico.set_input("ir_scari", False)
+            self.probe.wait_input("ir_scari", False)
+            if received is None:
+                timeouts += 1
+            else:
+                latencies.append(received - sent)
+            time.sleep(0.1)
+        return summarize(latencies, timeouts)
+
+    # Schimbarea modului -> prima comanda de miscare a modului nou
+    def mode_switch(self, mode):
+        latencies, timeouts = [], 0
+        for _ in range(self.args.switches):
+            self.set_mode("manual")
+            self.probe.drain()
+            sent = self.publish("mode", mode)
+            received = self.probe.wait_motors(sent, is_moving, self.args.mode_timeout)[0]
+            if received is None:
+                timeouts += 1
+            else:
+                latencies.append(received - sent)
+        self.set_mode("manual")
+        return summarize(latencies, timeouts)
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# Porneste backend-ul (main.py) conectat la broker si la Pico-ul simulat
+def start_backend(args, broker, pico):
+    env = dict(os.environ)
+    env.update({
+        "ROBOT_MQTT_HOST": "127.0.0.1",
+        "ROBOT_MQTT_PORT": str(broker.port),
+        "ROBOT_PICO_PORT": pico.path,
+        "ROBOT_RUNTIME": args.runtime,
+        "ROBOT_LOG_FILE": "",
+        "ROBOT_LOG_CONSOLE": "WARNING" if args.verbose else "OFF",
+    })
+    output = None if args.verbose else subprocess.DEVNULL
+    return subprocess.Popen([sys.executable, "main.py"], cwd=BACKEND_DIR, env=env,
+                            stdout=output, stderr=output)
+
+
+def wait_ready(broker, probe, backend):
+    deadline = time.time() + STARTUP_TIMEOUT
+    while time.time() < deadline:
+        if backend.poll() is not None:
+            raise RuntimeError(f"backend exited with code {backend.returncode}")
+        if "forward" in broker.subscribed() and probe.connected.is_set():
+            return
+        time.sleep(0.05)
+    raise RuntimeError("backend did not connect to the broker and the simulated Pico")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pentru latenta comenzilor (MQTT -> Pico)")
+    parser.add_argument("--runtime", choices=("threads", "asyncio"), default="threads")
+    parser.add_argument("--count", type=int, default=200, help="comenzi manuale masurate")
+    parser.add_argument("--rate", type=float, default=20, help="comenzi manuale pe secunda")
+    parser.add_argument("--bursts", type=int, default=20, help="rafale de comenzi")
+    parser.add_argument("--storm-size", type=int, default=50, help="comenzi pe rafala")
+    parser.add_argument("--events", type=int, default=50, help="activari ale senzorului de scari")
+    parser.add_argument("--switches", type=int, default=10, help="schimbari de mod")
+    parser.add_argument("--modes", default="aspirare", help="modurile masurate la schimbare (separate prin virgula)")
+    parser.add_argument("--mode-timeout", type=float, default=3.0,
+                        help="cat asteptam prima miscare dupa schimbarea modului (secunde)")
+    parser.add_argument("--telemetry-rate", type=float, default=100, help="pachete de telemetrie pe secunda")
+    parser.add_argument("--port", default="/tmp/pico-bench", help="calea portului simulat")
+    parser.add_argument("--output", help="fisierul JSON lines la care se adauga rezultatul (implicit stdout)")
+    parser.add_argument("--verbose", action="store_true", help="afiseaza iesirea backend-ului")
+    args = parser.parse_args()
+
+    broker = LoopbackBroker()
+    broker.start()
+    pico = pico_simulator.SimulatedPico(args.port, args.telemetry_rate, fixed_rate=True, seed=0)
+    probe = PicoProbe(pico)
+    pico.start()
+
+    dashboard = mqtt.Client()
+    dashboard.connect("127.0.0.1", broker.port)
+    dashboard.loop_start()
+
+    backend = start_backend(args, broker, pico)
+    try:
+        wait_ready(broker, probe, backend)
+        benchmark = Benchmark(dashboard, probe, pico, args)
+        results = {"mqtt_to_serial": benchmark.mqtt_to_serial(), "storm": benchmark.storm(),
+                   "telemetry_to_actuation": benchmark.telemetry_to_actuation()}
+        for mode in filter(None, args.modes.split(",")):
+            results[f"mode_switch.{mode}"] = benchmark.mode_switch(mode)
+    finally:
+        backend.send_signal(signal.SIGINT)
+        try:
+            backend.wait(5)
+        except subprocess.TimeoutExpired:
+            backend.kill()
+        dashboard.loop_stop()
+        dashboard.disconnect()
+        pico.stop()
+        broker.stop()
+
+    report = {
+        "time": round(time.time(), 3),
+        "commit": git_commit(),
+        "runtime": args.runtime,
+        "telemetry_rate": args.telemetry_rate,
+        "pico": {"version": pico.version, "commands": dict(pico.commands)},
+        "results": results,
+    }
+    line = json.dumps(report)
+    if args.output:
+        with open(args.output, "a") as output:
+            output.write(line + "\n")
+    print(line)
+
+
+if __name__ == "__main__":
+    main()
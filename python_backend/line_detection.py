@@ -0,0 +1,156 @@
+# OpenCV pentru transformata Hough
+import cv2
+# operatii vectorizate pe array-uri
+import numpy as np
+# masurarea duratelor pe etape
+import metrics_service
+
+# Parametrii transformatei Hough probabilistice
+HOUGH_RHO = 1
+HOUGH_THETA = np.pi / 180
+HOUGH_THRESHOLD = 60
+HOUGH_MIN_LINE_LENGTH = 150
+
+# Pragul pentru clasificarea liniilor (raportul dintre dx si dy)
+LINE_TYPE_THRESH = 0.7
+
+# Distanta minima (in pixeli) intre doua linii de rost diferite
+CLUSTER_GAP = 40
+
+# Parametrii preprocesarii imaginii (prag binar si dimensiunea blur-ului)
+BINARY_THRESHOLD = 125
+BLUR_SIZE = (11, 11)
+
+# Coloanele din rezultatul lui fit_lines()
+OFFSET, SLOPE, LO, HI, WEIGHT = 0, 1, 2, 3, 4
+
+
+# Preprocesarea imaginii color: tonuri de gri, prag binar si blur
+# gray si binary pot fi buffere prealocate (ex. memorie partajata) pentru a evita alocarile
+def preprocess(frame, gray=None, binary=None):
+    # Convertim imaginea color in tonuri de gri pentru procesare
+    t = metrics_service.start()
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=gray)
+    metrics_service.stop("vision.gray", t)
+
+    # Aplicam thresholding binar pentru a obtine o imagine alb-negru
+    t = metrics_service.start()
+    ret, gray = cv2.threshold(gray, BINARY_THRESHOLD, 255, cv2.THRESH_BINARY, dst=gray)
+    metrics_service.stop("vision.threshold", t)
+
+    # Aplicam blur pentru a netezi imaginea binara
+    t = metrics_service.start()
+    binary = cv2.blur(gray, BLUR_SIZE, dst=binary)
+    metrics_service.stop("vision.blur", t)
+    return binary
+
+
+# Ruleaza transformata Hough pe imaginea binara
+# Returneaza un array (N,1,4) de segmente sau None daca nu s-a gasit nimic
+def find_segments(frame_binary, min_line_length=HOUGH_MIN_LINE_LENGTH):
+    t = metrics_service.start()
+    lines = cv2.HoughLinesP(frame_binary, rho=HOUGH_RHO, theta=HOUGH_THETA,
+                            threshold=HOUGH_THRESHOLD, minLineLength=min_line_length)
+    metrics_service.stop("vision.hough", t)
+    return lines
+
+
+# Clasifica toate segmentele dintr-o singura trecere
+# Returneaza segmentele ca array (N,4) float si mastile pentru orizontal / vertical
+def classify(lines, thresh=LINE_TYPE_THRESH):
+    segments = np.asarray(lines, dtype=np.float32).reshape(-1, 4)
+
+    dx = np.abs(segments[:, 2] - segments[:, 0])
+    dy = np.abs(segments[:, 3] - segments[:, 1])
+
+    # Aceeasi ordine de verificare ca in clasificarea pe segmente: intai orizontal
+    horizontal = dy <= thresh * dx
+    vertical = ~horizontal & (dx <= thresh * dy)
+
+    return segments, horizontal, vertical
+
+
+# Grupeaza segmentele de acelasi tip in linii de rost separate
+# Fiecare linie este descrisa in jurul centrului imaginii:
+#   offset - pozitia transversala a liniei la mijlocul imaginii (x pentru verticale, y pentru orizontale)
+#   slope  - panta transversala fata de axa liniei (dx/dy pentru verticale, dy/dx pentru orizontale)
+#   lo, hi - intinderea liniei de-a lungul axei ei
+#   weight - lungimea totala a segmentelor din grup
+# Returneaza un array (K,5) sortat dupa distanta fata de centrul imaginii
+def fit_lines(segments, vertical, width, height, cluster_gap=CLUSTER_GAP):
+    if len(segments) == 0:
+        return np.empty((0, 5), dtype=np.float64)
+
+    segments = segments.astype(np.float64)
+
+    # Pentru liniile verticale axa liniei este y, iar pentru cele orizontale este x
+    if vertical:
+        across1, along1, across2, along2 = segments[:, 0], segments[:, 1], segments[:, 2], segments[:, 3]
+        centre_along, centre_across = height / 2, width / 2
+    else:
+        across1, along1, across2, along2 = segments[:, 1], segments[:, 0], segments[:, 3], segments[:, 2]
+        centre_along, centre_across = width / 2, height / 2
+
+    d_along = along2 - along1
+    d_across = across2 - across1
+
+    # Panta fiecarui segment (segmentele degenerate, de lungime 0, au panta 0)
+    slope = np.divide(d_across, d_along, out=np.zeros_like(d_across), where=d_along != 0)
+    # Pozitia transversala a fiecarui segment prelungit pana la centrul imaginii
+    offset = across1 + slope * (centre_along - along1)
+    # Segmentele lungi conteaza mai mult in medie
+    length = np.maximum(np.hypot(d_along, d_across), 1.0)
+
+    # Sortam dupa offset si taiem grupurile acolo unde distanta dintre vecini depaseste cluster_gap
+    order = np.argsort(offset, kind="stable")
+    offset, slope, length = offset[order], slope[order], length[order]
+    lo = np.minimum(along1, along2)[order]
+    hi = np.maximum(along1, along2)[order]
+
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(offset) > cluster_gap) + 1))
+
+    # Medii ponderate cu lungimea pentru fiecare grup
+    weight = np.add.reduceat(length, starts)
+    fitted = np.column_stack((
+        np.add.reduceat(offset * length, starts) / weight,
+        np.add.reduceat(slope * length, starts) / weight,
+        np.minimum.reduceat(lo, starts),
+        np.maximum.reduceat(hi, starts),
+        weight,
+    ))
+
+    # Liniile cele mai apropiate de centrul imaginii sunt primele
+    return fitted[np.argsort(np.abs(fitted[:, OFFSET] - centre_across), kind="stable")]
+
+
+# Transforma o linie din fit_lines() in capetele [x1, y1, x2, y2]
+# Liniile verticale incep de jos (y1 > y2), cele orizontale incep din stanga (x1 < x2)
+def line_endpoints(line, vertical, width, height):
+    offset, slope, lo, hi = line[OFFSET], line[SLOPE], line[LO], line[HI]
+
+    if vertical:
+        centre_along = height / 2
+        return [int(round(offset + slope * (hi - centre_along))), int(hi),
+                int(round(offset + slope * (lo - centre_along))), int(lo)]
+
+    centre_along = width / 2
+    return [int(lo), int(round(offset + slope * (lo - centre_along))),
+            int(hi), int(round(offset + slope * (hi - centre_along)))]
+
+
+# Detecteaza toate liniile de rost din rezultatul lui HoughLinesP
+# Returneaza doua liste (orizontale, verticale) de linii [x1, y1, x2, y2],
+# fiecare sortata dupa distanta fata de centrul imaginii
+def detect_lines(lines, width, height, thresh=LINE_TYPE_THRESH, cluster_gap=CLUSTER_GAP):
+    if lines is None or len(lines) == 0:
+        return [], []
+
+    segments, horizontal, vertical = classify(lines, thresh)
+
+    hfit = fit_lines(segments[horizontal], False, width, height, cluster_gap)
+    vfit = fit_lines(segments[vertical], True, width, height, cluster_gap)
+
+    hlines = [line_endpoints(line, False, width, height) for line in hfit]
+    vlines = [line_endpoints(line, True, width, height) for line in vfit]
+
+    return hlines, vlines
@@ -0,0 +1,246 @@
+# OpenCV pentru filtrul Kalman
+import cv2
+# operatii pe array-uri
+import numpy as np
+# detectia vectorizata a liniilor de rost
+import line_detection
+# masurarea duratelor pe etape
+import metrics_service
+
+# Jumatatea latimii benzii de cautare din jurul liniei prezise (pixeli)
+SEARCH_BAND = 48
+
+# Dupa cate frame-uri consecutive fara masuratoare se considera linia pierduta
+MAX_MISSED = 3
+
+# Pasul (in pixeli) dintre esantioanele folosite la masurarea in banda
+SAMPLE_STEP = 4
+
+# Un esantion trebuie sa contina cel putin atatia pixeli albi (ponderati) ca sa conteze
+MIN_SAMPLE_MASS = 4 * 255
+
+# Esantioanele mai pline de atat (intersectii, zone albe) sunt ignorate
+MAX_SAMPLE_FILL = 0.6
+
+# Abaterea maxima (pixeli) a unui esantion fata de dreapta potrivita
+MAX_RESIDUAL = 6
+
+# La cate frame-uri se face oricum o cautare pe toata imaginea (linii noi care intra in cadru)
+FULL_SEARCH_INTERVAL = 15
+
+
+# Urmarirea unei singure linii (verticala sau orizontala) cu un filtru Kalman
+# cu viteza constanta pe starea [offset, slope, d_offset, d_slope]
+class LineTrack():
+    vertical: bool            # Tipul liniei urmarite
+    active: bool              # Exista o linie urmarita
+    missed: int               # Frame-uri consecutive fara masuratoare
+    lo: float                 # Intinderea ultimei linii masurate de-a lungul axei ei
+    hi: float
+
+    def __init__(self, vertical):
+        self.vertical = vertical
+        self.active = False
+        self.missed = 0
+        self.lo, self.hi = 0.0, 0.0
+
+        self.kalman = cv2.KalmanFilter(4, 2)
+        self.kalman.transitionMatrix = np.array([[1, 0, 1, 0],
+                                                 [0, 1, 0, 1],
+                                                 [0, 0, 1, 0],
+                                                 [0, 0, 0, 1]], dtype=np.float32)
+        self.kalman.measurementMatrix = np.array([[1, 0, 0, 0],
+                                                  [0, 1, 0, 0]], dtype=np.float32)
+        # Offsetul variaza cu cativa pixeli pe frame, panta mult mai putin
+        self.kalman.processNoiseCov = np.diag([4.0, 1e-4, 1.0, 1e-5]).astype(np.float32)
+        self.kalman.measurementNoiseCov = np.diag([9.0, 1e-3]).astype(np.float32)
+
+    # Porneste urmarirea de la o linie detectata pe toata imaginea
+    def acquire(self, line):
+        self.kalman.statePost = np.array([[line[line_detection.OFFSET]], [line[line_detection.SLOPE]], [0], [0]], dtype=np.float32)
+        self.kalman.errorCovPost = np.diag([9.0, 1e-3, 4.0, 1e-4]).astype(np.float32)
+        self.lo, self.hi = line[line_detection.LO], line[line_detection.HI]
+        self.active = True
+        self.missed = 0
+
+    # Prezice pozitia liniei in frame-ul curent: (offset, slope)
+    def predict(self):
+        state = self.kalman.predict()
+        return float(state[0, 0]), float(state[1, 0])
+
+    # Corecteaza filtrul cu o masuratoare si returneaza linia netezita
+    def correct(self, line):
+        measurement = np.array([[line[line_detection.OFFSET]], [line[line_detection.SLOPE]]], dtype=np.float32)
+        state = self.kalman.correct(measurement)
+        self.lo, self.hi = line[line_detection.LO], line[line_detection.HI]
+        self.missed = 0
+        return np.array([state[0, 0], state[1, 0], self.lo, self.hi, line[line_detection.WEIGHT]])
+
+    # Linia prezisa (offset, slope din predict()) pe ultima intindere masurata, fara pondere
+    def predicted(self, prediction):
+        return np.array([prediction[0], prediction[1], self.lo, self.hi, 0.0])
+
+    # Inregistreaza un frame fara masuratoare; dupa MAX_MISSED linia este pierduta
+    def miss(self):
+        self.missed += 1
+        if self.missed > MAX_MISSED:
+            self.active = False
+
+    def reset(self):
+        self.active = False
+        self.missed = 0
+
+
+# Tracker pentru linia verticala si cea orizontala folosite de masina de stari
+# Cat timp o linie este urmarita, ea este masurata doar intr-o banda ingusta in jurul
+# pozitiei prezise; Hough pe toata imaginea ramane doar pentru (re)achizitie
+class GroutTracker():
+    vline_track: LineTrack
+    hline_track: LineTrack
+    frames_since_full: int
+    full_searches: int        # Statistici: cautari pe toata imaginea
+    band_searches: int        # Statistici: cautari in banda
+
+    def __init__(self, band=SEARCH_BAND):
+        self.band = band
+        self.vline_track = LineTrack(True)
+        self.hline_track = LineTrack(False)
+        self.frames_since_full = 0
+        self.full_searches = 0
+        self.band_searches = 0
+
+    # Uita liniile urmarite (ex. la intrarea in modul perie)
+    def reset(self):
+        self.vline_track.reset()
+        self.hline_track.reset()
+        self.frames_since_full = 0
+
+    # Proceseaza un frame binar si returneaza (hline, vline) ca [x1, y1, x2, y2] sau None
+    # horizontal / vertical aleg liniile cerute; o linie care nu este ceruta nu este urmarita
+    # (este uitata si se cauta din nou pe toata imaginea cand este ceruta iar)
+    def update(self, frame_binary, horizontal=True, vertical=True):
+        height, width = frame_binary.shape[:2]
+        tracks = (self.hline_track, self.vline_track)
+        wanted = (horizontal, vertical)
+
+        for track, want in zip(tracks, wanted):
+            if not want:
+                track.reset()
+
+        if not any(wanted):
+            return None, None
+
+        # Prezicem pozitia liniilor urmarite
+        predictions = [track.predict() if track.active else None for track in tracks]
+
+        self.frames_since_full += 1
+        full_search = (not all(track.active for track, want in zip(tracks, wanted) if want)
+                       or self.frames_since_full >= FULL_SEARCH_INTERVAL)
+
+        if full_search:
+            # O singura transformata Hough pe toata imaginea pentru ambele linii
+            self.full_searches += 1
+            self.frames_since_full = 0
+            segments = line_detection.find_segments(frame_binary)
+            t = metrics_service.start()
+            candidates = self._fit(segments, width, height)
+            metrics_service.stop("vision.classify", t)
+        else:
+            candidates = None
+
+        results = []
+        for index, track in enumerate(tracks):
+            if not wanted[index]:
+                results.append(None)
+                continue
+
+            if full_search:
+                lines = candidates[index]
+            else:
+                # Cautare doar in banda din jurul liniei prezise
+                self.band_searches += 1
+                t = metrics_service.start()
+                lines = self._fit_band(frame_binary, track.vertical, predictions[index], width, height)
+                metrics_service.stop("vision.band_fit", t)
+
+            results.append(self._associate(track, predictions[index], lines, width, height))
+
+        return results[0], results[1]
+
+    # Clasifica si grupeaza segmentele: (linii orizontale, linii verticale) ca array-uri (K,5)
+    def _fit(self, segments, width, height):
+        if segments is None:
+            empty = np.empty((0, 5))
+            return empty, empty
+
+        segments, horizontal, vertical = line_detection.classify(segments)
+        return (line_detection.fit_lines(segments[horizontal], False, width, height),
+                line_detection.fit_lines(segments[vertical], True, width, height))
+
+    # Masoara linia doar in banda din jurul pozitiei prezise, fara Hough:
+    # pe randuri esantionate (coloane pentru liniile orizontale) calculam centrul
+    # pixelilor albi din fereastra benzii, apoi facem o regresie liniara ponderata
+    # Returneaza un array (1,5) cu linia masurata sau (0,5) daca linia nu se vede
+    def _fit_band(self, frame_binary, vertical, prediction, width, height):
+        offset, slope = prediction
+        along_size = height if vertical else width
+        across_size = width if vertical else height
+        centre_along = along_size / 2
+
+        along = np.arange(0, along_size, SAMPLE_STEP)
+        predicted = np.rint(offset + slope * (along - centre_along)).astype(np.int32)
+        across = np.clip(predicted[:, None] + np.arange(-self.band, self.band + 1), 0, across_size - 1)
+
+        # Ferestrele benzii pentru fiecare esantion, extrase dintr-o singura indexare
+        if vertical:
+            values = frame_binary[along[:, None], across].astype(np.float32)
+        else:
+            values = frame_binary[across, along[:, None]].astype(np.float32)
+
+        mass = values.sum(axis=1)
+        window = values.shape[1] * 255.0
+        # Esantionul e valid daca vede rostul, dar nu e acoperit aproape complet
+        # (intersectii cu linia perpendiculara sau zone albe mari)
+        valid = (mass >= MIN_SAMPLE_MASS) & (mass <= MAX_SAMPLE_FILL * window)
+
+        if np.count_nonzero(valid) * SAMPLE_STEP < line_detection.HOUGH_MIN_LINE_LENGTH:
+            return np.empty((0, 5))
+
+        along = along[valid] - centre_along
+        centre = (values[valid] * across[valid]).sum(axis=1) / mass[valid]
+        weight = mass[valid]
+
+        # Regresie ponderata, repetata o data fara esantioanele aberante
+        for _ in range(2):
+            fit_slope, fit_offset = np.polyfit(along, centre, 1, w=np.sqrt(weight))
+            inliers = np.abs(centre - (fit_offset + fit_slope * along)) <= MAX_RESIDUAL
+            if np.count_nonzero(inliers) * SAMPLE_STEP < line_detection.HOUGH_MIN_LINE_LENGTH:
+                return np.empty((0, 5))
+            along, centre, weight = along[inliers], centre[inliers], weight[inliers]
+
+        return np.array([[fit_offset, fit_slope, along.min() + centre_along, along.max() + centre_along,
+                          len(along) * SAMPLE_STEP]])
+
+    # Alege masuratoarea pentru o linie urmarita si actualizeaza filtrul
+    def _associate(self, track, prediction, lines, width, height):
+        if track.active:
+            if len(lines) > 0:
+                # Masuratoarea cea mai apropiata de pozitia prezisa, daca e in banda
+                distance = np.abs(lines[:, line_detection.OFFSET] - prediction[0])
+                best = int(np.argmin(distance))
+                if distance[best] <= self.band:
+                    smoothed = track.correct(lines[best])
+                    return line_detection.line_endpoints(smoothed, track.vertical, width, height)
+
+            track.miss()
+            if track.active:
+                # Pana la MAX_MISSED frame-uri fara masuratoare (zgomot, o pata) linia ramane
+                # cea prezisa, ca masina de stari sa nu o considere pierduta
+                return line_detection.line_endpoints(track.predicted(prediction), track.vertical, width, height)
+
+        # Linie noua: luam linia cea mai apropiata de centrul imaginii (prima din lista)
+        if len(lines) > 0:
+            track.acquire(lines[0])
+            return line_detection.line_endpoints(lines[0], track.vertical, width, height)
+
+        return None
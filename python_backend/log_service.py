@@ -0,0 +1,115 @@
+# Jurnalul backend-ului: niveluri pe module, scriere pe un fir separat, fisier JSON-lines cu rotatie
+#
+# Fiecare modul foloseste logging.getLogger(__name__); tranzitiile masinilor de stari merg pe
+# loggerul "fsm". Un mesaj sub nivelul loggerului costa doar verificarea nivelului. Un mesaj
+# acceptat este pus ca atare (neformatat) intr-o coada: formatarea, JSON-ul si scrierea
+# ruleaza pe firul QueueListener, nu in bucla de control. De aceea argumentele trebuie sa fie
+# valori (numere, siruri), nu obiecte care se schimba dupa apel; textele scumpe (ex. harta)
+# se construiesc doar sub logger.isEnabledFor(...).
+#
+# ROBOT_LOG_LEVEL=INFO                     nivelul implicit
+# ROBOT_LOG_LEVELS=fsm=DEBUG,mqtt_service=DEBUG   niveluri pe loggere
+# ROBOT_LOG_FILE=robot.log.jsonl           fisierul JSON-lines (gol = fara fisier)
+# ROBOT_LOG_CONSOLE=INFO                   nivelul afisat in consola (OFF = fara consola)
+#
+# Nivelurile pot fi schimbate si in timpul rularii, pe topicul "log_level" (ex. "fsm=DEBUG"),
+# ca urma masinii de stari sa fie pornita doar cand este nevoie de ea.
+import os
+import json
+import queue
+import logging
+import logging.handlers
+
+level = os.environ.get("ROBOT_LOG_LEVEL", "INFO").upper()
+module_levels = os.environ.get("ROBOT_LOG_LEVELS", "")
+log_file = os.environ.get("ROBOT_LOG_FILE", "robot.log.jsonl")
+console_level = os.environ.get("ROBOT_LOG_CONSOLE", "INFO").upper()
+
+# Rotatia fisierului: dimensiunea maxima si numarul de fisiere vechi pastrate
+MAX_BYTES = 5 * 1024 * 1024
+BACKUP_COUNT = 3
+
+# Coada dintre bucla si firul de scriere (put() pe SimpleQueue nu ia un lock Python)
+records = queue.SimpleQueue()
+listener = None
+
+
+# Pune inregistrarea in coada asa cum este; mesajul este formatat pe firul de scriere
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # Traceback-ul trebuie citit pe firul care a prins exceptia
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+# Un obiect JSON pe linie: momentul, nivelul, loggerul, firul si mesajul
+class JsonLinesFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "t": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "msg": record.getMessage(),
+        }
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+# Nivelurile pe loggere: "fsm=DEBUG,mqtt_service=WARNING" (sau un singur nivel, pentru radacina)
+def set_levels(spec):
+    for item in spec.replace(";", ",").split(","):
+        name, _, value = item.strip().rpartition("=")
+        if not value:
+            continue
+        try:
+            logging.getLogger(name.strip() or None).setLevel(value.strip().upper())
+        except ValueError:
+            logging.getLogger(__name__).warning("unknown log level %r", value)
+
+
+# Handler MQTT pentru "log_level"
+def on_level_request(payload):
+    set_levels(payload)
+
+
+# Configureaza radacina: coada catre firul de scriere, fisierul si consola
+def setup():
+    global listener
+    if listener is not None:
+        return
+
+    handlers = []
+    if log_file:
+        file_handler = logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=MAX_BYTES, backupCount=BACKUP_COUNT, encoding="utf-8")
+        file_handler.setFormatter(JsonLinesFormatter())
+        handlers.append(file_handler)
+    if console_level != "OFF":
+        console = logging.StreamHandler()
+        console.setLevel(console_level)
+        console.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+        handlers.append(console)
+
+    # Campurile pe care nu le scriem nu mai sunt completate la fiecare inregistrare
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(DeferredQueueHandler(records))
+    set_levels(module_levels)
+
+    listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+    listener.start()
+
+
+# Scrie ce a ramas in coada (la iesire)
+def shutdown():
+    global listener
+    if listener is not None:
+        listener.stop()
+        listener = None
@@ -1,3 +1,6 @@
+# Jurnalul: configurat inaintea celorlalte module, care pot scrie in jurnal la import
+import log_service
+log_service.setup()
 # interacționa cu sistemul de operare (fisiere, directoare, variabile de mediu)
 import os
 # OpenCV 
@@ -9,70 +12,86 @@ import serial
 import numpy as np  
 # Serviciu pentru controlul motoarelor
 import motor_service 
+# Scrierea comenzilor catre Pico
+import command_writer
 # Serviciu pentru gestionarea modurilor de functionare 
 import mode_service 
 # Serviciu pentru comunicarea MQTT 
 import mqtt_service 
 # Serviciu pentru comunicarea de la Pico la Raspberry Pi
 import pico_to_pi_service  
-
-# Functie determina tipul unei linii pe baza coordonatelor
-def get_line_type(x1, y1, x2, y2, thresh):
-    # diferentelor absolute pe axele x si y
-    dx = abs(x2 - x1)
-    dy = abs(y2 - y1)
-
-    # Determinarea tipului de linie pe baza pragului
-    if dy <= thresh * dx:
-        return "horizontal"  # Linie orizontala
-    elif dx <= thresh * dy:
-        return "vertical"    # Linie verticala
-    else:
-        return "diagonal"    # Linie diagonala
-
-# Functie calculeaza linia medie dintr-un set de linii
-def get_average_line(lines):
-    # Verificarea daca exista linii de procesat
-    if len(lines) > 0:
-        # Initializarea liniei medii cu valori zero
-        average_line = [0, 0, 0, 0]
-        
-        # Suma coordonatelor tuturor liniilor
-        for line in lines:
-            average_line[0] = average_line[0] + line[0][0]  # x1
-            average_line[1] = average_line[1] + line[0][1]  # y1
-            average_line[2] = average_line[2] + line[0][2]  # x2
-            average_line[3] = average_line[3] + line[0][3]  # y2
-    
-        # Calcularea mediei pentru fiecare coordonata
-        for i in range(4):
-            average_line[i] = int(average_line[i] / len(lines))
-        
-        # Returnarea liniei medii calculate cu succes
-        return True, average_line
-
-    # Returnarea valorilor implicite daca nu exista linii
-    return False, [0,0,0,0]
+# Serviciu pentru camera video
+import camera_service
+# Serverul HTTP al backend-ului
+import http_service
+# Conexiunea cu Pico-ul
+import pico_link
+# Pipeline-ul de viziune pe mai multe procese
+import vision_workers
+# Inregistrarea sesiunii pentru replay
+import session_recorder
+# Masurarea duratelor pe etape
+import metrics_service
+# Telemetria pentru dashboard
+import telemetry_service
+# Alertele si avertismentele (publicate pe firul lor)
+import alerts_warnings_service
+# Planificatorul sarcinilor din bucla de control
+import scheduler
+# modul partajat (runtime-ul ales)
+import shared
 
 # oprirea periei si aspiratorului
 motor_service.set_perie(False)  
 motor_service.set_aspirator(False)  
 
-# Bucla principala de functionare
+# Statisticile etapelor: /metrics pentru dashboard
+http_service.add_route("/metrics", metrics_service.serve)
+# Starea legaturii cu Pico-ul (conectat / reconectari)
+http_service.add_route("/link", pico_link.serve)
+
+# Firul care publica alertele si avertismentele (in ambele runtime-uri)
+alerts_warnings_service.start()
+
 try:
-    while True:
-        # Primirea datelor de la Pico
-        pico_to_pi_service.receive()
-        # Rularea modului curent de functionare
-        mode_service.run()
+    if shared.runtime == "asyncio":
+        # Bucla asyncio conduce portul serial, MQTT, camera si modurile
+        import asyncio
+        import async_runtime
+        asyncio.run(async_runtime.main())
+    else:
+        # Publicarea periodica a statisticilor pe MQTT
+        metrics_service.start_publishing(mqtt_service.client)
+        # Publicarea telemetriei pentru dashboard
+        telemetry_service.start_publishing()
+
+        # Bucla principala de functionare: fiecare subsistem ruleaza la frecventa lui
+        # (telemetrie, siguranta, viziune, moduri, senzori, alerte, previzualizare),
+        # iar intre termene bucla doarme
+        loop = scheduler.Scheduler()
+        mode_service.register_tasks(loop)
+        loop.run_forever()
 except KeyboardInterrupt:
     # Capturarea intreruperii de la tastatura (Ctrl+C)
     print("Exiting...")
 
 # Eliberarea resurselor la iesirea din program
-# Eliberarea camerei video
-mode_service.cap.release()
+# Trimiterea ultimelor comenzi ramase netrimise
+command_writer.flush()
+# Oprirea firului de citire si eliberarea camerei video
+camera_service.release()
+# Oprirea proceselor de viziune (daca pipeline-ul a fost pornit)
+vision_workers.stop()
+
+# Oprirea serverului HTTP pentru previzualizare
+http_service.stop()
+
+# Scrierea ultimelor inregistrari din sesiune (daca inregistrarea este activata)
+session_recorder.close()
 
 # Oprirea si deconectarea serviciului MQTT
 mqtt_service.client.loop_stop()  
-mqtt_service.client.disconnect() 
\ No newline at end of file
+mqtt_service.client.disconnect()
+
+# Scrierea ultimelor mesaje din jurnal
+log_service.shutdown()
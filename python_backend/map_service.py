@@ -0,0 +1,239 @@
+# Transmiterea hartii de detectie (modul perie) catre dashboard
+#
+# Harta este urmarita printr-o fereastra (viewport) centrata pe robot, de size x size celule,
+# in care fiecare celula acopera zoom x zoom celule ale hartii. Sarcina "map" din bucla de
+# control compara fereastra curenta cu ce a primit deja dashboard-ul si publica doar
+# diferentele. Masina de stari doar scrie in harta (DetectionMap numara modificarile), iar
+# harta si pozitia sunt citite de aici; fara schimbari sarcina iese in mai putin de o microsecunda.
+#
+# Topicul "map" (JSON):
+#   keyframe: {"seq": 3, "key": true, "x0": 12, "y0": 11, "size": 7, "zoom": 1, "robot": [15, 14],
+#              "cells": "0001200..."}  - cate un caracter pe celula, rand cu rand
+#   diferenta: {"seq": 4, "key": false, "shift": [0, -1], "x0": 12, "y0": 10, "robot": [15, 13],
+#               "cells": [[3, "2"], [10, "4"]]}  - indexul in fereastra noua si valoarea
+#   "shift" apare cand fereastra s-a mutat (dashboard-ul muta celulele pe care le are deja),
+#   "robot" cand s-a schimbat pozitia robotului (coordonate pe harta).
+#   Valorile sunt cele din harta ("0" gol, "1" detectat, "2" obstacol, "3"-"6" traseul spre
+#   N / E / S / V), iar "." este in afara hartii.
+#
+# Dashboard-ul cere un keyframe la conectare pe "map_request" si schimba fereastra pe
+# "map_viewport" ({"size": 15, "zoom": 2} sau doar dimensiunea).
+# Topicul vechi "update_harta" (lista de 7x7 caractere, cu "R" pentru robot) este pastrat
+# pentru sablonul existent din dashboard, tot centrat pe robot.
+#
+# Mesajele sunt publicate pe clientul MQTT primit de la apelant (mode_service), ca harta
+# sa nu depinda de mqtt_service (care importa modurile, iar modul perie importa harta).
+import json
+import time
+
+TOPIC = "map"
+LEGACY_TOPIC = "update_harta"
+LEGACY_SIZE = 7
+
+# Fereastra implicita si intervalul dintre keyframe-uri (secunde)
+viewport_size = 7
+zoom = 1
+KEYFRAME_INTERVAL = 10
+
+OUTSIDE = "."
+
+# La zoom > 1 o celula afiseaza valoarea cea mai importanta din blocul ei:
+# obstacol > traseu > detectat > gol
+IMPORTANCE = {0: 0, 1: 1, 3: 2, 4: 2, 5: 2, 6: 2, 2: 3}
+
+# Simbolurile pentru afisarea in consola si pentru topicul vechi
+TEXT_SYMBOLS = {0: " ", 1: "+", 2: "#", 3: "↑", 4: "→", 5: "↓", 6: "←"}
+LEGACY_SYMBOLS = {0: "⠀", 1: "+", 2: "#", 3: "↑", 4: "→", 5: "↓", 6: "←"}
+
+# Harta de detectie cu numarator de modificari: o scriere harta[y][x] = v incrementeaza
+# version, asa ca sarcina "map" stie fara sa parcurga harta daca s-a schimbat ceva
+class DetectionMap(list):
+    version: int
+
+    def __init__(self, width, height, value=0):
+        super().__init__(MapRow(self, [value] * width) for _ in range(height))
+        self.version = 0
+
+
+# Un rand al hartii (citirile sunt cele ale unei liste obisnuite)
+class MapRow(list):
+    __slots__ = ("owner",)
+
+    def __init__(self, owner, values):
+        super().__init__(values)
+        self.owner = owner
+
+    def __setitem__(self, index, value):
+        list.__setitem__(self, index, value)
+        self.owner.version += 1
+
+
+# Ce are deja dashboard-ul: harta urmarita, originea si celulele ferestrei, pozitia robotului
+last_map = None
+last_origin = None
+last_cells = None
+last_robot = None
+last_legacy = None
+# Versiunea hartii, pozitia si fereastra la ultima publicare (pentru iesirea rapida)
+last_key = None
+last_keyframe = 0.0
+keyframe_requested = True
+seq = 0
+
+# Statistici: mesaje si octeti publicati
+messages = 0
+bytes_sent = 0
+
+
+# Cere un keyframe la urmatoarea publicare (ex. un dashboard abia conectat)
+def request_keyframe(payload=None):
+    global keyframe_requested
+    keyframe_requested = True
+
+
+# Schimba fereastra: "15" sau {"size": 15, "zoom": 2}
+def set_viewport(payload):
+    global viewport_size, zoom
+    try:
+        value = json.loads(payload)
+    except ValueError:
+        return
+    if isinstance(value, dict):
+        viewport_size = max(1, int(value.get("size", viewport_size)))
+        zoom = max(1, int(value.get("zoom", zoom)))
+    elif isinstance(value, int):
+        viewport_size = max(1, value)
+    request_keyframe()
+
+
+# Valoarea unei celule din fereastra (blocul de zoom x zoom celule de la x, y)
+def block_value(grid, x, y, scale):
+    height, width = len(grid), len(grid[0])
+    best = None
+    for cy in range(max(0, y), min(height, y + scale)):
+        row = grid[cy]
+        for cx in range(max(0, x), min(width, x + scale)):
+            value = row[cx]
+            if best is None or IMPORTANCE.get(value, 0) > IMPORTANCE.get(best, 0):
+                best = value
+    return OUTSIDE if best is None else str(best)
+
+
+# Originea ferestrei: aliniata la blocurile de zoom, ca sa se mute doar cand robotul trece in alt bloc
+def viewport_origin(rx, ry, size, scale):
+    return (rx // scale - size // 2) * scale, (ry // scale - size // 2) * scale
+
+
+# Celulele ferestrei cu originea data, rand cu rand
+def viewport_cells(grid, origin, size, scale):
+    x0, y0 = origin
+    return [block_value(grid, x0 + i * scale, y0 + j * scale, scale)
+            for j in range(size) for i in range(size)]
+
+
+# Sarcina "map": publica pe client schimbarile ferestrei (daca exista) pentru harta si pozitia date
+def publish(client, grid, rx, ry):
+    global last_map, last_origin, last_cells, last_robot, last_key, last_keyframe, keyframe_requested, seq
+
+    now = time.time()
+    size, scale = viewport_size, zoom
+
+    # Nimic schimbat de la ultima publicare (harta fara numarator este comparata celula cu celula)
+    key = (getattr(grid, "version", None), rx, ry, size, scale)
+    if (key[0] is not None and key == last_key and grid is last_map
+            and not keyframe_requested and now - last_keyframe < KEYFRAME_INTERVAL):
+        return
+    last_key = key
+
+    origin = viewport_origin(rx, ry, size, scale)
+    cells = viewport_cells(grid, origin, size, scale)
+    robot = [rx, ry]
+
+    keyframe = (keyframe_requested or grid is not last_map or last_cells is None
+                or len(last_cells) != len(cells) or now - last_keyframe >= KEYFRAME_INTERVAL)
+    if keyframe:
+        message = {"seq": seq, "key": True, "x0": origin[0], "y0": origin[1], "size": size,
+                   "zoom": scale, "robot": robot, "cells": "".join(cells)}
+    else:
+        message = delta(origin, cells, size, scale)
+        if robot != last_robot:
+            message["robot"] = robot
+        if len(message) == 2:
+            # Nimic schimbat in fereastra
+            last_map = grid
+            publish_legacy(client, grid, rx, ry)
+            return
+    send(client, TOPIC, json.dumps(message, separators=(",", ":")))
+
+    last_map, last_origin, last_cells, last_robot = grid, origin, cells, robot
+    if keyframe:
+        keyframe_requested = False
+        last_keyframe = now
+    seq += 1
+    publish_legacy(client, grid, rx, ry)
+
+
+# Diferenta fata de fereastra anterioara (mutata cu shift, daca originea s-a schimbat)
+def delta(origin, cells, size, scale):
+    message = {"seq": seq, "key": False}
+    dx, dy = (origin[0] - last_origin[0]) // scale, (origin[1] - last_origin[1]) // scale
+    if dx or dy:
+        message["shift"] = [dx, dy]
+        message["x0"], message["y0"] = origin
+
+    changed = []
+    for j in range(size):
+        for i in range(size):
+            # Celula pe care dashboard-ul o are deja in aceasta pozitie (None = iesita din fereastra)
+            oi, oj = i + dx, j + dy
+            old = last_cells[oj * size + oi] if 0 <= oi < size and 0 <= oj < size else None
+            value = cells[j * size + i]
+            if value != old:
+                changed.append([j * size + i, value])
+    if changed:
+        message["cells"] = changed
+    return message
+
+
+# Topicul vechi: fereastra de 7x7 centrata pe robot, doar cand se schimba
+def publish_legacy(client, grid, rx, ry):
+    global last_legacy
+    x0, y0 = rx - LEGACY_SIZE // 2, ry - LEGACY_SIZE // 2
+    height, width = len(grid), len(grid[0])
+    harta_flat = []
+    for y in range(y0, y0 + LEGACY_SIZE):
+        for x in range(x0, x0 + LEGACY_SIZE):
+            if x == rx and y == ry:
+                harta_flat.append("R")
+            elif 0 <= x < width and 0 <= y < height:
+                harta_flat.append(LEGACY_SYMBOLS.get(grid[y][x], "⠀"))
+            else:
+                harta_flat.append("⠀")
+    if harta_flat == last_legacy:
+        return
+    last_legacy = harta_flat
+    send(client, LEGACY_TOPIC, json.dumps(harta_flat))
+
+
+def send(client, topic, payload):
+    global messages, bytes_sent
+    client.publish(topic, payload)
+    messages += 1
+    bytes_sent += len(payload)
+
+
+# Harta ca text, pentru consola (un singur sir, afisat cu un singur print)
+def render(grid, rx, ry):
+    lines = []
+    for y, row in enumerate(grid):
+        chars = [TEXT_SYMBOLS.get(value, " ") for value in row]
+        if y == ry:
+            chars[rx] = "R"
+        lines.append("".join(chars))
+    return "\n".join(lines)
+
+
+# Statisticile publicarii (pentru metrici / depanare)
+def stats():
+    return {"messages": messages, "bytes": bytes_sent, "seq": seq,
+            "viewport": {"size": viewport_size, "zoom": zoom}}
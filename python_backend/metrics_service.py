@@ -0,0 +1,190 @@
+# Masurarea duratelor pe etape in bucla de control (receive, camera, viziune, FSM, serial, JPEG)
+#
+# Activare: ROBOT_METRICS=1 sau mesajul "true" pe topicul MQTT "metrics_enable".
+# Cand este oprit, start() returneaza 0 si stop() iese imediat, deci apelurile pot ramane in cod.
+#
+# Utilizare:
+#   t = metrics_service.start()
+#   ...
+#   metrics_service.stop("vision.hough", t)
+#
+# Statisticile (p50/p95/p99/max pe ultimele WINDOW masuratori si frecventa buclei) sunt
+# publicate periodic pe topicul MQTT "metrics" (JSON) si servite la /metrics in format text.
+import os
+import json
+import threading
+import time
+# percentilele
+import numpy as np
+
+# Numarul de masuratori pastrate pentru fiecare etapa
+WINDOW = 512
+
+# Intervalul (secunde) dintre doua publicari pe MQTT
+publish_interval = 5
+
+# Topicul MQTT pe care se publica statisticile
+TOPIC = "metrics"
+
+# Masurarea este pornita / oprita
+enabled = os.environ.get("ROBOT_METRICS") == "1"
+
+
+# Ultimele WINDOW durate (secunde) ale unei etape, intr-un buffer circular
+class Stage():
+    samples: list     # Duratele masurate
+    count: int        # Numarul total de masuratori
+
+    def __init__(self):
+        self.samples = [0.0] * WINDOW
+        self.count = 0
+
+    def add(self, seconds):
+        self.samples[self.count % WINDOW] = seconds
+        self.count += 1
+
+    # Statisticile pe fereastra curenta, in milisecunde
+    def summary(self):
+        samples = np.array(self.samples[:min(self.count, WINDOW)]) * 1000
+        if len(samples) == 0:
+            return {"count": 0}
+
+        p50, p95, p99 = np.percentile(samples, (50, 95, 99))
+        return {
+            "count": self.count,
+            "p50_ms": round(float(p50), 4),
+            "p95_ms": round(float(p95), 4),
+            "p99_ms": round(float(p99), 4),
+            "max_ms": round(float(samples.max()), 4),
+        }
+
+
+# Etapele masurate: nume -> Stage (create la prima masuratoare)
+stages = {}
+
+# Momentul ultimei iteratii a buclei principale
+last_tick = 0.0
+
+
+# Porneste sau opreste masurarea in timpul rularii
+def set_enabled(value):
+    global enabled, last_tick
+    enabled = value
+    last_tick = 0.0
+
+
+# Inceputul unei masuratori: momentul curent sau 0 daca masurarea este oprita
+def start():
+    if not enabled:
+        return 0.0
+    return time.perf_counter()
+
+
+# Sfarsitul unei masuratori pornite cu start()
+def stop(name, start_time):
+    if not start_time:
+        return
+    record(name, time.perf_counter() - start_time)
+
+
+# Adauga o durata masurata in alta parte (ex. in procesul de detectie)
+def record(name, seconds):
+    if not enabled:
+        return
+    stage = stages.get(name)
+    if stage is None:
+        stage = stages[name] = Stage()
+    stage.add(seconds)
+
+
+# Apelat o data pe iteratie de bucla principala: masoara durata iteratiei
+def tick():
+    global last_tick
+    if not enabled:
+        return
+    now = time.perf_counter()
+    if last_tick:
+        record("loop", now - last_tick)
+    last_tick = now
+
+
+# Toate statisticile ca dictionar (pentru JSON)
+def snapshot():
+    result = {"enabled": enabled, "stages": {name: stage.summary() for name, stage in list(stages.items())}}
+
+    loop_hz = loop_rate()
+    if loop_hz is not None:
+        result["loop_rate_hz"] = round(loop_hz, 2)
+
+    return result
+
+
+# Frecventa buclei din durata medie a ultimelor iteratii (None inainte de prima masuratoare)
+def loop_rate():
+    loop = stages.get("loop")
+    if loop is None or loop.count == 0:
+        return None
+    samples = loop.samples[:min(loop.count, WINDOW)]
+    return len(samples) / sum(samples)
+
+
+# Statisticile in formatul text de expunere (compatibil Prometheus), pentru /metrics
+def exposition():
+    data = snapshot()
+    lines = [
+        "# HELP robot_metrics_enabled Masurarea etapelor este pornita",
+        "# TYPE robot_metrics_enabled gauge",
+        f"robot_metrics_enabled {int(data['enabled'])}",
+    ]
+
+    if "loop_rate_hz" in data:
+        lines += [
+            "# HELP robot_loop_rate_hz Frecventa buclei principale",
+            "# TYPE robot_loop_rate_hz gauge",
+            f"robot_loop_rate_hz {data['loop_rate_hz']}",
+        ]
+
+    lines += [
+        "# HELP robot_stage_seconds Durata etapelor pe ultimele masuratori",
+        "# TYPE robot_stage_seconds summary",
+    ]
+    # Maximul este o familie separata (gauge), scrisa dupa toate esantioanele rezumatului
+    maxima = [
+        "# HELP robot_stage_seconds_max Durata maxima a etapelor pe ultimele masuratori",
+        "# TYPE robot_stage_seconds_max gauge",
+    ]
+    for name, summary in data["stages"].items():
+        if summary["count"] == 0:
+            continue
+        for quantile in ("50", "95", "99"):
+            value = summary[f"p{quantile}_ms"] / 1000
+            lines.append(f'robot_stage_seconds{{stage="{name}",quantile="0.{quantile}"}} {value:.7f}')
+        lines.append(f'robot_stage_seconds_count{{stage="{name}"}} {summary["count"]}')
+        maxima.append(f'robot_stage_seconds_max{{stage="{name}"}} {summary["max_ms"] / 1000:.7f}')
+    lines += maxima
+
+    return "\n".join(lines) + "\n"
+
+
+# Ruta HTTP /metrics (inregistrata in main.py prin http_service.add_route)
+def serve(request):
+    body = exposition().encode()
+    request.send_response(200)
+    request.send_header("Content-Type", "text/plain; version=0.0.4")
+    request.send_header("Content-Length", str(len(body)))
+    request.send_header("Cache-Control", "no-cache")
+    request.end_headers()
+    request.wfile.write(body)
+
+
+# Firul care publica statisticile pe MQTT; percentilele se calculeaza aici, nu in bucla de control
+def publish_loop(client):
+    while True:
+        time.sleep(publish_interval)
+        if enabled and stages:
+            client.publish(TOPIC, json.dumps(snapshot()))
+
+
+# Porneste publicarea periodica cu clientul MQTT dat
+def start_publishing(client):
+    threading.Thread(target=publish_loop, args=(client,), name="metrics-publisher", daemon=True).start()
@@ -9,6 +9,17 @@ from enum import Enum
 import alerts_warnings_service  
 # comunicarea MQTT
 import mqtt_service       
+# produsele de viziune cerute de mod
+from vision_frame import Needs
+# masina de stari (tranzitii, timpi pe stari, urma)
+import state_machine
+# jurnalul (niveluri pe module)
+import logging
+
+log = logging.getLogger(__name__)
+
+# Modul nu foloseste camera (se bazeaza pe senzori / comenzi)
+needs = Needs.NONE
 
 # Definim starile posibile ale robotului 
 class States(Enum):
@@ -18,25 +29,47 @@ class States(Enum):
     ROTATE_RIGHT = 3      # robotul se roteste la dreapta
     MOVE_BACKWARD = 4     # robotul se misca inapoi
 
+# Tranzitiile permise din fiecare stare
+TRANSITIONS = {
+    States.MOVE_FORWARD: (States.DECIDE_DIRECTION,),
+    States.DECIDE_DIRECTION: (States.MOVE_BACKWARD, States.ROTATE_LEFT, States.ROTATE_RIGHT),
+    States.ROTATE_LEFT: (States.MOVE_FORWARD,),
+    States.ROTATE_RIGHT: (States.MOVE_FORWARD,),
+    States.MOVE_BACKWARD: (States.DECIDE_DIRECTION,),
+}
+
 # Clasa gestionarea starii robotului
 class RobotState():
-    # starea curenta a robotului
-    state: States  
+    # masina de stari (starea curenta este machine.state)
+    machine: "state_machine.StateMachine"
     # distanta minima pentru detectarea obstacolelor              
     min_distance: int  
     # timpul cand se termina rotatia         
     finish_rotate_time: float   
+    # timpul pana la care masina de stari asteapta (fara sa blocheze bucla)
+    wait_timer: float
     
     # Constructorul clasei - initializeaza valorile de baza
     def __init__(self):
-        self.state = States.MOVE_FORWARD  # robotul incepe prin a merge inainte
         self.min_distance = 35            # distanta minima de 35 cm
         self.finish_rotate_time = 0       # nu avem rotatie activa initial
-    
-    # Functie schimbarea starii robotului cu afisare
+        self.wait_timer = 0               # nu asteptam initial
+
+        # Robotul incepe prin a merge inainte; la iesirea din orice miscare motoarele sunt oprite
+        # (o tranzitie nedeclarata duce tot in MOVE_FORWARD)
+        stop = {state: motor_service.stop for state in
+                (States.MOVE_FORWARD, States.ROTATE_LEFT, States.ROTATE_RIGHT, States.MOVE_BACKWARD)}
+        self.machine = state_machine.StateMachine("aspirare", self, TRANSITIONS, States.MOVE_FORWARD,
+                                                  on_exit=stop)
+
+    # Starea curenta a robotului
+    @property
+    def state(self):
+        return self.machine.state
+
+    # Functie schimbarea starii robotului
     def changeState(self, new_state: States):
-        print(f"[STATE CHANGE] {self.state} --> {new_state}")
-        self.state = new_state
+        self.machine.transition(new_state)
     
     # Functia pentru miscarea inainte
     def MOVE_FORWARD(self):
@@ -44,8 +77,8 @@ class RobotState():
         if (pico_to_pi_service.us_front < self.min_distance or
             pico_to_pi_service.us_left < self.min_distance / 2 or
             pico_to_pi_service.us_right < self.min_distance / 2):
-            motor_service.stop()  # oprim motoarele
-            time.sleep(1)         # asteptam 1 secunda
+            # motoarele sunt oprite la iesirea din stare
+            self.wait_timer = time.time() + 1  # asteptam 1 secunda inainte de decizie
             self.changeState(States.DECIDE_DIRECTION)  # trecem la decizia directiei
         else:
             motor_service.forwards()  # continuam sa mergem inainte
@@ -71,7 +104,6 @@ class RobotState():
         motor_service.left()  # activam motorul stang pentru rotatie dreapta
         # Verificam daca s-a terminat timpul de rotatie
         if(time.time() >= self.finish_rotate_time):
-            motor_service.stop()  # oprim motoarele
             self.changeState(States.MOVE_FORWARD)  # reluam miscarea inainte
         pass
     
@@ -80,7 +112,6 @@ class RobotState():
         motor_service.backwards()  # mergem inapoi
         # Verificam daca s-a terminat timpul de miscare inapoi
         if(time.time() >= self.finish_rotate_time):
-            motor_service.stop()  # oprim motoarele
             self.changeState(States.DECIDE_DIRECTION)  # decidem din nou directia
         pass
     
@@ -89,7 +120,6 @@ class RobotState():
         motor_service.right()  # activam motorul drept pentru rotatie stanga
         # Verificam daca s-a terminat timpul de rotatie
         if(time.time() >= self.finish_rotate_time):
-            motor_service.stop()  # oprim motoarele
             self.changeState(States.MOVE_FORWARD)  # reluam miscarea inainte
         pass
     
@@ -97,65 +127,51 @@ class RobotState():
     def run(self):
         # Comentariu pentru debug - afiseaza valorile senzorilor
         # print(f"front {pico_to_pi_service.us_front} left {pico_to_pi_service.us_left} right {pico_to_pi_service.us_right}")
+
+        # In timpul asteptarii nu rulam nicio stare (bucla de control nu este blocata)
+        if time.time() < self.wait_timer:
+            return
         
-        # Dictionarul care face legatura intre stari si functiile corespunzatoare
-        state_lookup = {
-            States.MOVE_FORWARD: self.MOVE_FORWARD,
-            States.DECIDE_DIRECTION: self.DECIDE_DIRECTION,
-            States.ROTATE_LEFT: self.ROTATE_LEFT,
-            States.ROTATE_RIGHT: self.ROTATE_RIGHT,
-            States.MOVE_BACKWARD: self.MOVE_BACKWARD,
-        }
-        
-        # Obtinem functia corespunzatoare starii curente
-        state_function = state_lookup[self.state]
-        
-        # Verificam daca starea este valida
-        if not state_function:
-            print("INVALID STATE DETECTED.")  # afisam eroare
-            self.changeState(self.MOVE_FORWARD)  # resetam la starea de baza
-        else:
-            state_function()  # executam functia corespunzatoare starii
+        # Executam functia starii curente
+        self.machine.handler()
 
 # Cream instanta globala a starii robotului
 state = RobotState()
 
 # Variabile globale pentru detectarea blocajelor
-# timpul ultimei rulari
-last_run = 0  
 ir_scari_array = [False for i in range(0, 20)]  # ultimele 20 de citiri IR
 # indexul curent in array-ul IR
 ir_scari_index = 0  
 # timpul ultimei alerte trimise
 last_alert = 0  
 
-# Functia principala care ruleaza continuu
+# Pasul masinii de stari (rulat de planificator la mode_service.MODE_RATE)
 def run():
-    global last_alert, last_run, ir_scari_index, ir_scari_array
-    
-    # Executam logica la fiecare 1/20 secunde (20 Hz)
-    if time.time() > last_run:
-        # Salvam starea curenta a senzorului IR in array
-        ir_scari_array[ir_scari_index] = bool(pico_to_pi_service.ir_scari)
-        # Actualizam indexul circular (revine la 0 dupa 19)
-        ir_scari_index = (ir_scari_index + 1) % 20
-        
-        # Verificam daca toate valorile din array sunt True (blocaj detectat)
-        if all(x == ir_scari_array[0] for x in ir_scari_array) and ir_scari_array[0] == True:
-            # Trimitem alerta doar daca au trecut 20 secunde de la ultima alerta
-            if time.time() > last_alert + 20:
-                print("Trimitem warning...")
-                # Trimitem alerta de blocaj
-                alerts_warnings_service.send_alert("Blocaj detectat", "Un blocaj a fost detectat in mod aspirator autonom.")
-                # Comutam robotul in mod manual
-                mqtt_service.client.publish("set_mode", "manual")
-                mqtt_service.mode = "manual"
-                # Actualizam timpul ultimei alerte
-                last_alert = time.time()
-       
-        # Setam timpul pentru urmatoarea rulare (50ms mai tarziu)
-        last_run = time.time() + (1 / 20)
-    
     # Executam logica principala a robotului
     state.run()
-    pass
\ No newline at end of file
+
+# Esantionarea senzorului IR (rulata de planificator la 20 Hz)
+def sample_sensors():
+    global ir_scari_index
+
+    # Salvam starea curenta a senzorului IR in array
+    ir_scari_array[ir_scari_index] = bool(pico_to_pi_service.ir_scari)
+    # Actualizam indexul circular (revine la 0 dupa 19)
+    ir_scari_index = (ir_scari_index + 1) % 20
+
+# Evaluarea alertelor pe ultimele 20 de citiri (rulata de planificator la 1 Hz)
+def check_alerts():
+    global last_alert
+
+    # Verificam daca toate valorile din array sunt True (blocaj detectat)
+    if all(x == ir_scari_array[0] for x in ir_scari_array) and ir_scari_array[0] == True:
+        # Trimitem alerta doar daca au trecut 20 secunde de la ultima alerta
+        if time.time() > last_alert + 20:
+            log.debug("blocaj detectat, trimitem alerta")
+            # Trimitem alerta de blocaj
+            alerts_warnings_service.send_alert("Blocaj detectat", "Un blocaj a fost detectat in mod aspirator autonom.")
+            # Comutam robotul in mod manual
+            mqtt_service.client.publish("set_mode", "manual")
+            mqtt_service.mode = "manual"
+            # Actualizam timpul ultimei alerte
+            last_alert = time.time()
\ No newline at end of file
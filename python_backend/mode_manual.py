@@ -5,9 +5,15 @@ import alerts_warnings_service
 import time
  # Serviciu pentru controlul motoarelor
 import motor_service 
+# produsele de viziune cerute de mod
+from vision_frame import Needs
+# jurnalul (niveluri pe module)
+import logging
 
-# Var ultima data cand s-a executat functia principala
-last_run = 0
+log = logging.getLogger(__name__)
+
+# Modul nu foloseste camera (se bazeaza pe senzori / comenzi)
+needs = Needs.NONE
 
 #Stocheaza ultimele 20 de citiri de la senzorul infrarosu de pe scari
 # Initializam cu False pentru toate valorile
@@ -23,10 +29,8 @@ last_alert = 0
 aspirator_mode = False  # Modul aspirator pornit/oprit
 perie_mode = False      # Modul perie pornit/oprit
 
+# Pasul modului manual (rulat de planificator la mode_service.MODE_RATE)
 def run():
-    # Declaram variabilele globale pe care le vom modifica in functie
-    global last_alert, last_run, ir_scari_index, ir_scari_array, aspirator_mode, perie_mode
-    
     # Setam statusul motoarelor in functie de modurile curente
     motor_service.aspirator_status = aspirator_mode
     motor_service.perie_status = perie_mode
@@ -34,28 +38,28 @@ def run():
     # Scriem starile motoarelor in sistem
     motor_service.write_states()
 
-    # Verificam daca a trecut destul timp de la ultima executie
-    if time.time() > last_run:
-        # Citim starea senzorului IR si o salvam in array la pozitia curenta
-        ir_scari_array[ir_scari_index] = bool(pico_to_pi_service.ir_scari)
-        
-        # Actualizam indexul pentru urmatoarea citire (circular, revine la 0 dupa 19)
-        ir_scari_index = (ir_scari_index + 1) % 20
-
-        # toate valorile din array sunt identice = True -> blocaj - senzorul detecteaza continuu ceva
-        if all(x == ir_scari_array[0] for x in ir_scari_array) and ir_scari_array[0] == True:
-            # Verificam daca au trecut cel putin 20 de secunde de la ultima alerta pentru a evita trimiterea prea multor alerte
-            if time.time() > last_alert + 20:
-                print("Trimitem warning...")  # Mesaj de debug in consola
-                
-                # Trimitem alerta de blocaj
-                alerts_warnings_service.send_warning("Blocaj detectat", "Un blocaj a fost detectat in mod manual.")
-                
-                # Actualizam timpul ultimei alerte
-                last_alert = time.time()
-        
-        # Setam timpul pentru urmatoarea executie (1/20 secunde = 50ms)
-        # Aceasta inseamna ca functia va rula la fiecare 50ms
-        last_run = time.time() + (1 / 20)
-
-    pass
\ No newline at end of file
+# Esantionarea senzorului de scari (rulata de planificator la 20 Hz)
+def sample_sensors():
+    global ir_scari_index
+
+    # Citim starea senzorului IR si o salvam in array la pozitia curenta
+    ir_scari_array[ir_scari_index] = bool(pico_to_pi_service.ir_scari)
+    
+    # Actualizam indexul pentru urmatoarea citire (circular, revine la 0 dupa 19)
+    ir_scari_index = (ir_scari_index + 1) % 20
+
+# Evaluarea alertelor pe ultimele 20 de citiri (rulata de planificator la 1 Hz)
+def check_alerts():
+    global last_alert
+
+    # toate valorile din array sunt identice = True -> blocaj - senzorul detecteaza continuu ceva
+    if all(x == ir_scari_array[0] for x in ir_scari_array) and ir_scari_array[0] == True:
+        # Verificam daca au trecut cel putin 20 de secunde de la ultima alerta pentru a evita trimiterea prea multor alerte
+        if time.time() > last_alert + 20:
+            log.debug("blocaj detectat, trimitem avertisment")  # Mesaj de debug
+            
+            # Trimitem alerta de blocaj
+            alerts_warnings_service.send_warning("Blocaj detectat", "Un blocaj a fost detectat in mod manual.")
+            
+            # Actualizam timpul ultimei alerte
+            last_alert = time.time()
\ No newline at end of file
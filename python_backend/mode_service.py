@@ -15,26 +15,54 @@ import alerts_warnings_service
 import time 
 # Serviciu pentru comunicarea de la Pico la Raspberry Pi
 import pico_to_pi_service 
+# Serviciu pentru camera video (fir separat de citire)
+import camera_service
+# Serviciu pentru previzualizarea camerei in dashboard (MJPEG)
+import preview_service
+# Produsele de viziune cerute de moduri, calculate doar la cerere
+import vision_frame
+from vision_frame import Needs, VisionFrame
 
-# Initializam camera video
-cap = cv2.VideoCapture("/dev/video0")
+# Pipeline pe mai multe procese pentru captura si detectie (optional)
+import vision_workers
+import os
+# modul partajat (indicatorul pentru hardware)
+import shared
+# jurnalul (niveluri pe module)
+import logging
+# inregistrarea sesiunii pentru replay
+import session_recorder
+# masurarea duratelor pe etape
+import metrics_service
+# scrierea comenzilor catre Pico
+import command_writer
+# transmiterea hartii de detectie catre dashboard
+import map_service
 
-# Setam parametrii pentru rezolutia si buffer-ul camerei
-width, height, buffersize = 640, 480, 2
+log = logging.getLogger(__name__)
 
-# Configuram proprietatile camerei cu valorile dorite
-print(f"Setting CAP_PROP_FRAME_WIDTH to {width}")
-# Setam latimea frame-ului
-cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)  
-print(f"Setting CAP_PROP_FRAME_HEIGHT to {height}")
-# Setam inaltimea frame-ului
-cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)  
-print(f"Setting CAP_PROP_BUFFERSIZE to {buffersize}")
-# Setam dimensiunea buffer-ului
-cap.set(cv2.CAP_PROP_BUFFERSIZE, buffersize)  
+# ROBOT_VISION_PIPELINE=1 muta captura, preprocesarea si detectia in procese separate;
+# implicit totul ruleaza in acest proces (camera citita pe un fir separat de camera_service)
+use_vision_pipeline = os.environ.get("ROBOT_VISION_PIPELINE") == "1"
 
-# Timpul ultimei rulari a ciclului de verificare senzori
-last_run = 0  
+# Fara hardware (ex. la replay) frame-urile sunt publicate din afara in camera_service
+if not shared.hardware_enabled:
+    use_vision_pipeline = False
+elif use_vision_pipeline:
+    vision_workers.start(camera_service.device)
+elif shared.runtime != "asyncio":
+    # In runtime-ul asyncio camera este citita de async_runtime
+    camera_service.start()
+
+# Id-ul ultimului frame procesat de bucla de control
+last_frame_id = 0
+
+# Ultimul frame procesat (pentru previzualizare) si id-ul ultimului frame trimis previzualizarii
+last_vision = None
+last_preview_id = 0
+
+# Produsele de viziune cerute ultima data camerei / proceselor de viziune
+last_needs = Needs.ALL
 
 # Array pentru monitorizarea senzorului IR al aspiratorului (ultimele 20 de valori)
 ir_aspiraor_array = [False for i in range(0, 20)]
@@ -48,75 +76,122 @@ umiditate_index = 0
 
 last_alert = 0  # Timpul ultimei alerte trimise
 
-def run():
-    """Functia principala care ruleaza ciclul de procesare"""
-    
-    # Citim un frame de la camera
-    ret, frame = cap.read()
+# Frecventele sarcinilor din bucla de control (Hz)
+TELEMETRY_RATE = 100    # Citirea pachetelor de la Pico (trimise la 20 Hz)
+MQTT_RATE = 100         # Comenzile primite pe MQTT (si trezire la fiecare mesaj)
+SAFETY_RATE = 100       # Oprirea la scari
+VISION_RATE = 60        # Verificarea frame-urilor noi (si trezire la fiecare frame al camerei)
+MODE_RATE = 50          # Pasul masinii de stari pentru modurile manual / aspirare
+COMMAND_RATE = 100      # Trimiterea comenzilor schimbate (si trezire la fiecare schimbare)
+SENSOR_RATE = 20        # Esantionarea senzorilor pentru alerte
+ALERT_RATE = 1          # Evaluarea alertelor
+MAP_RATE = 5            # Transmiterea schimbarilor din harta modului perie
+
+# Produsele de viziune de care are nevoie modul curent (si starea lui)
+def current_needs():
+    if mqtt_service.mode == "manual":
+        needs = mode_manual.needs
+    elif mqtt_service.mode == "aspirare":
+        needs = mode_aspirator_autonom.needs
+    elif mqtt_service.mode == "perie":
+        needs = mode_smart_perie_autonom.get_needs()
+    else:
+        needs = Needs.NONE
+
+    # Previzualizarea si inregistrarea sesiunii sunt si ele consumatori
+    if preview_service.is_watched("camera") or session_recorder.enabled:
+        needs |= Needs.FRAME
+    if preview_service.is_watched("camerabin"):
+        needs |= Needs.BINARY
+
+    return vision_frame.expand(needs)
+
+# Cere camerei (sau proceselor de viziune) doar produsele necesare pentru urmatoarele frame-uri
+def update_needs():
+    global last_needs
 
-    # Verificam daca frame-ul a fost citit cu succes
-    if not ret:
-        print("Failed to capture frame from camera.")
+    needs = current_needs()
+    if needs == last_needs:
         return
+    last_needs = needs
+
+    if use_vision_pipeline:
+        vision_workers.set_needs(needs)
+    else:
+        camera_service.set_retrieve(bool(needs & Needs.FRAME))
+
+# Sarcina de viziune: ia cel mai nou frame si ruleaza masina de stari din modul perie
+def run_vision():
+    global last_frame_id, last_vision
+
+    if use_vision_pipeline:
+        # Luam cel mai nou rezultat al detectiei, fara sa asteptam
+        result = vision_workers.get_latest_result()
+        new_frame = result is not None
+        if new_frame:
+            frame_id, frame_time, detect_time, products, hline, vline = result
+            last_frame_id = frame_id
+            # Etapele din procesele de viziune nu se vad aici; pastram durata detectiei
+            # si intarzierea de la captura pana la bucla de control
+            metrics_service.record("vision.detect", detect_time)
+            metrics_service.record("vision.frame_age", time.time() - frame_time)
+            frame, frame_binary = vision_workers.get_frame(frame_id)
+            if frame is not None:
+                session_recorder.record_frame(frame_id, frame, frame_time)
+
+            # Desenam liniile pe o copie doar daca se uita cineva la previzualizare
+            if frame is not None and (preview_service.is_watched("camera") or preview_service.is_watched("camerabin")):
+                frame = frame.copy()
+                frame_binary = frame_binary.copy() if frame_binary is not None else None
+            else:
+                frame, frame_binary = None, None
+
+            # Liniile au fost deja detectate in procesul de detectie
+            vision = VisionFrame(frame_id, frame_time, frame, frame_binary, (hline, vline), products)
+    else:
+        # Luam ultimul frame disponibil fara sa asteptam camera
+        frame_id, frame_time, frame = camera_service.get_latest()
+
+        # Procesam imaginea doar daca a sosit un frame nou
+        new_frame = frame_id != last_frame_id
+        if new_frame:
+            last_frame_id = frame_id
+            if frame is not None:
+                session_recorder.record_frame(frame_id, frame, frame_time)
+
+            # Comentariu: linia de resize este comentata
+            #frame = cv2.resize(frame[0:310, 0:640], (640, 640))
+
+            # Tonuri de gri, prag binar, blur si liniile se calculeaza doar la cerere
+            vision = VisionFrame(frame_id, frame_time, frame)
+
+    if new_frame:
+        last_vision = vision
 
-    # Comentariu: linia de resize este comentata
-    #frame = cv2.resize(frame[0:310, 0:640], (640, 640))
-
-    # Convertim imaginea color in tonuri de gri pentru procesare
-    frame_gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-    
-    # Aplicam thresholding binar pentru a obtine o imagine alb-negru
-    ret, frame_binary = cv2.threshold(frame_gray, 125, 255, cv2.THRESH_BINARY)
-    
-    # Aplicam blur pentru a netezi imaginea binara
-    frame_binary = cv2.blur(frame_binary, (11, 11))
-    
-    # Declaram variabilele globale care vor fi modificate
-    global last_alert, last_run, ir_aspiraor_array, ir_aspirator_index, umiditate_array, umiditate_index
-    
-    # Verificam daca este timpul sa rulam ciclul de monitorizare senzori (la fiecare 1/20 secunde)
-    if time.time() > last_run:
-        
-        # Adaugam valoarea curenta a senzorului IR in array si actualizam indexul
-        ir_aspiraor_array[ir_aspirator_index] = bool(pico_to_pi_service.ir_aspirator)
-        ir_aspirator_index = (ir_aspirator_index + 1) % 20  # Circular buffer
-
-        # Verificam daca toate valorile din array sunt False (recipient aproape plin)
-        if all(x == ir_aspiraor_array[0] for x in ir_aspiraor_array) and ir_aspiraor_array[0] == False:
-            # Trimitem alerta doar daca au trecut 180 secunde de la ultima alerta
-            if time.time() > last_alert + 180:
-                print("Trimitem warning...")
-                alerts_warnings_service.send_alert("Recipient aproape plin detectat", "Recipientul de la aspirator este aproape plin.")
-                # Oprim modurile de functionare
-                mode_manual.aspirator_mode = False
-                mode_manual.perie_mode = False
-                last_alert = time.time()
-                
-        # Adaugam valoarea curenta a senzorului de umiditate in array si actualizam indexul
-        umiditate_array[umiditate_index] = bool(pico_to_pi_service.senzor_umid)
-        umiditate_index = (umiditate_index + 1) % 20  # Circular buffer
-
-        # Verificam daca toate valorile din array sunt False (umiditate detectata)
-        if all(x == umiditate_array[0] for x in umiditate_array) and umiditate_array[0] == False:
-            # Trimitem alerta doar daca au trecut 60 secunde de la ultima alerta
-            if time.time() > last_alert + 60:
-                print("Trimitem warning...")
-                alerts_warnings_service.send_alert("Umiditate detectata", "Un nivel inalt de umiditate a fost detectat pe gresie.")
-                # Oprim modurile de functionare
-                mode_manual.aspirator_mode = False
-                mode_manual.perie_mode = False
-                last_alert = time.time()
-        
-        # Setam timpul pentru urmatoarea rulare (1/20 secunde in viitor)
-        last_run = time.time() + (1 / 20)
+        # Masina de stari din modul perie reactioneaza doar la frame-uri noi
+        if mqtt_service.mode == "perie":
+            t = metrics_service.start()
+            # Liniile se calculeaza doar daca starea le cere
+            mode_smart_perie_autonom.run(vision)
+            metrics_service.stop("fsm.perie", t)
+            # Siguranta are ultimul cuvant dupa orice comanda a masinii de stari
+            check_safety()
 
+    # Produsele cerute pentru urmatorul frame (modul sau starea s-ar putea sa se fi schimbat)
+    update_needs()
+
+# Sarcina pentru modurile conduse de senzori / comenzi (manual, aspirare)
+def run_mode():
     # Alegem modul de functionare bazat pe comanda MQTT
+    t = metrics_service.start()
     if mqtt_service.mode == "manual":
         # Rulam modul manual
         mode_manual.run()
+        metrics_service.stop("fsm.manual", t)
     elif mqtt_service.mode == "aspirare":
         # Rulam modul autonom pentru aspirare
         mode_aspirator_autonom.run()
+        metrics_service.stop("fsm.aspirare", t)
     elif mqtt_service.mode == "perie":
         # Verificam daca modul perie s-a terminat si nu a fost anuntat inca
         if mode_smart_perie_autonom.state.state == mode_smart_perie_autonom.States.END and mode_smart_perie_autonom.state.has_announced_end == False:
@@ -128,13 +203,103 @@ def run():
             motor_service.set_perie(False)
             motor_service.set_aspirator(False)
 
-        # Rulam modul autonom pentru perie cu frame-urile procesate
-        mode_smart_perie_autonom.run(frame, frame_binary)
+    # Siguranta are ultimul cuvant dupa orice comanda a modului
+    check_safety()
 
-    # Verificam senzorii de scari pentru siguranta - oprim robotul daca detectam scari
+# Sarcina de siguranta: oprim robotul daca detectam scari
+# (ruleaza si separat, la fiecare pachet de telemetrie, nu doar dupa pasii masinilor de stari)
+def check_safety():
     if pico_to_pi_service.ir_scari and motor_service.last_requested_action != "backwards":
         motor_service.stop()
 
-    # Salvam imaginile pentru monitorizare (frame original si frame binar)
-    cv2.imwrite("/tmp/camera.jpg", frame, [int(cv2.IMWRITE_JPEG_QUALITY), 50])
-    cv2.imwrite("/tmp/camerabin.jpg", frame_binary, [int(cv2.IMWRITE_JPEG_QUALITY), 50])
\ No newline at end of file
+# Sarcina de esantionare a senzorilor (20 Hz): completeaza ferestrele de 20 de valori
+def sample_sensors():
+    global ir_aspirator_index, umiditate_index
+
+    # Adaugam valoarea curenta a senzorului IR in array si actualizam indexul
+    ir_aspiraor_array[ir_aspirator_index] = bool(pico_to_pi_service.ir_aspirator)
+    ir_aspirator_index = (ir_aspirator_index + 1) % 20  # Circular buffer
+
+    # Adaugam valoarea curenta a senzorului de umiditate in array si actualizam indexul
+    umiditate_array[umiditate_index] = bool(pico_to_pi_service.senzor_umid)
+    umiditate_index = (umiditate_index + 1) % 20  # Circular buffer
+
+    # Senzorul de scari este urmarit de modul activ
+    if mqtt_service.mode == "manual":
+        mode_manual.sample_sensors()
+    elif mqtt_service.mode == "aspirare":
+        mode_aspirator_autonom.sample_sensors()
+
+# Sarcina de evaluare a alertelor (1 Hz) pe ferestrele esantionate
+def check_alerts():
+    global last_alert
+
+    # Verificam daca toate valorile din array sunt False (recipient aproape plin)
+    if all(x == ir_aspiraor_array[0] for x in ir_aspiraor_array) and ir_aspiraor_array[0] == False:
+        # Trimitem alerta doar daca au trecut 180 secunde de la ultima alerta
+        if time.time() > last_alert + 180:
+            log.debug("recipient aproape plin, trimitem alerta")
+            alerts_warnings_service.send_alert("Recipient aproape plin detectat", "Recipientul de la aspirator este aproape plin.")
+            # Oprim modurile de functionare
+            mode_manual.aspirator_mode = False
+            mode_manual.perie_mode = False
+            last_alert = time.time()
+
+    # Verificam daca toate valorile din array sunt False (umiditate detectata)
+    if all(x == umiditate_array[0] for x in umiditate_array) and umiditate_array[0] == False:
+        # Trimitem alerta doar daca au trecut 60 secunde de la ultima alerta
+        if time.time() > last_alert + 60:
+            log.debug("umiditate detectata, trimitem alerta")
+            alerts_warnings_service.send_alert("Umiditate detectata", "Un nivel inalt de umiditate a fost detectat pe gresie.")
+            # Oprim modurile de functionare
+            mode_manual.aspirator_mode = False
+            mode_manual.perie_mode = False
+            last_alert = time.time()
+
+    # Alertele modului activ (blocaj)
+    if mqtt_service.mode == "manual":
+        mode_manual.check_alerts()
+    elif mqtt_service.mode == "aspirare":
+        mode_aspirator_autonom.check_alerts()
+
+# Sarcina de transmitere a hartii: doar diferentele fata de ce are deja dashboard-ul
+def run_map():
+    if mqtt_service.mode == "perie":
+        state = mode_smart_perie_autonom.state
+        map_service.publish(mqtt_service.client, state.detection_map, state.x, state.y)
+
+# Sarcina de previzualizare: trimite cel mai nou frame (original si binar)
+# Codarea JPEG se face pe firul serviciului, doar cand se uita cineva
+def run_preview():
+    global last_preview_id
+
+    vision = last_vision
+    if vision is None or vision.frame_id == last_preview_id or vision.frame is None:
+        return
+    last_preview_id = vision.frame_id
+
+    frame_binary = vision.binary() if preview_service.is_watched("camerabin") else None
+    preview_service.submit(vision.frame_id, vision.frame, frame_binary)
+
+# Inregistreaza sarcinile buclei de control in planificator (scheduler.Scheduler)
+# Prioritatea da si ordinea in care ruleaza sarcinile scadente in acelasi moment
+def register_tasks(loop):
+    loop.add("telemetry", pico_to_pi_service.receive, TELEMETRY_RATE, priority=0)
+    # Comenzile MQTT ruleaza pe bucla, dupa telemetrie si inaintea sigurantei
+    loop.add("mqtt", mqtt_service.process_commands, MQTT_RATE, priority=1)
+    loop.add("safety", check_safety, SAFETY_RATE, priority=2)
+    loop.add("vision", run_vision, VISION_RATE, priority=3)
+    loop.add("mode", run_mode, MODE_RATE, priority=4)
+    # Dupa siguranta, viziune si moduri: comenzile din acest pas pleaca intr-o singura scriere
+    loop.add("commands", command_writer.flush, COMMAND_RATE, priority=5)
+    loop.add("sensors", sample_sensors, SENSOR_RATE, priority=6)
+    loop.add("alerts", check_alerts, ALERT_RATE, priority=7)
+    loop.add("map", run_map, MAP_RATE, priority=8)
+    loop.add("preview", run_preview, preview_service.preview_fps, priority=9)
+
+    # Fiecare frame nou al camerei trezeste sarcina de viziune imediat
+    camera_service.camera.on_frame = lambda: loop.notify("vision")
+    # O comanda MQTT primita este procesata fara sa astepte termenul
+    mqtt_service.on_command = lambda: loop.notify("mqtt")
+    # O comanda schimbata (ex. stop cerut pe MQTT) este trimisa fara sa astepte termenul
+    command_writer.on_change = lambda: loop.notify("commands")
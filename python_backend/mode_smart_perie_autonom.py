@@ -13,6 +13,18 @@ import pico_to_pi_service
 import time
 # serviciul de alerte si avertismente
 import alerts_warnings_service
+# afisarea hartii de detectie
+import map_service
+# urmarirea liniilor de rost intre frame-uri
+import line_tracker
+# produsele de viziune cerute de fiecare stare
+from vision_frame import Needs
+# masina de stari (tranzitii, timpi pe stari, urma)
+import state_machine
+# jurnalul (niveluri pe module)
+import logging
+
+log = logging.getLogger(__name__)
 
 # Variabila globala pentru a marca terminarea executiei
 am_terminat = False
@@ -84,16 +96,53 @@ class States(Enum):
     END = 11              # Stare finala
 
 
+# Tranzitiile permise din fiecare stare (rotatiile se repeta in aceeasi stare pana gasesc linia)
+TRANSITIONS = {
+    States.MOVE_FORWARD: (States.DECIDE_ROTATION, States.END),
+    States.DECIDE_ROTATION: (States.GO_FORWARD, States.GO_LEFT, States.GO_RIGHT, States.END),
+    States.GO_FORWARD: (States.MOVE_FORWARD,),
+    States.GO_LEFT: (States.LEFT_LOSE_VLINE,),
+    States.LEFT_LOSE_VLINE: (States.LEFT_LOSE_VLINE, States.LEFT_GET_VLINE),
+    States.LEFT_GET_VLINE: (States.LEFT_GET_VLINE, States.LEFT_FINISH),
+    States.LEFT_FINISH: (States.MOVE_FORWARD,),
+    States.GO_RIGHT: (States.RIGHT_LOSE_VLINE,),
+    States.RIGHT_LOSE_VLINE: (States.RIGHT_LOSE_VLINE, States.RIGHT_GET_VLINE),
+    States.RIGHT_GET_VLINE: (States.RIGHT_GET_VLINE, States.RIGHT_FINISH),
+    States.RIGHT_FINISH: (States.MOVE_FORWARD,),
+    States.END: (),
+}
+
+# Produsele de viziune folosite de fiecare stare; starile conduse doar
+# de encodere (GO_*, *_FINISH) si cele de decizie nu folosesc camera
+state_needs = {
+    States.MOVE_FORWARD: Needs.VLINE | Needs.HLINE,
+    States.DECIDE_ROTATION: Needs.NONE,
+    States.GO_FORWARD: Needs.NONE,
+    States.GO_LEFT: Needs.NONE,
+    States.LEFT_LOSE_VLINE: Needs.VLINE,
+    States.LEFT_GET_VLINE: Needs.VLINE,
+    States.LEFT_FINISH: Needs.NONE,
+    States.GO_RIGHT: Needs.NONE,
+    States.RIGHT_LOSE_VLINE: Needs.VLINE,
+    States.RIGHT_GET_VLINE: Needs.VLINE,
+    States.RIGHT_FINISH: Needs.NONE,
+    States.END: Needs.NONE,
+}
+
+# Roza vanturilor afisata deasupra hartii in jurnal
+COMPASS = "     N     \n    /\\     \n     |     \nW<------->E\n     |     \n    \\/     \n     S     \n"
+
+
 # Clasa pentru starea robotului
 class RobotState():
     direction: Direction      # Directie curenta
-    state: States            # Stare curenta
+    machine: "state_machine.StateMachine"  # Masina de stari (starea curenta este machine.state)
     rotation_choice: str     # Alegerea de rotatie
     goal_forward: float      # Obiectiv de miscare inainte
     x: int                   # Coordonata X
     y: int                   # Coordonata Y
     has_announced_end: bool  # Flag pentru anuntarea terminarii
-    detection_map: list      # Harta de detectie
+    detection_map: "map_service.DetectionMap"  # Harta de detectie
     tip_alerta: str         # Tipul alertei
     alerta_reason: str      # Motivul alertei
     direction_stack: list   # Stiva de directii
@@ -101,7 +150,9 @@ class RobotState():
     def __init__(self):
         # Initializare stare robotului
         self.direction = Direction()
-        self.state = States.MOVE_FORWARD
+        # O tranzitie nedeclarata (eroare interna) termina traseul
+        self.machine = state_machine.StateMachine("perie", self, TRANSITIONS, States.MOVE_FORWARD,
+                                                  fallback=States.END)
         self.rotation_choice = "forward"
         self.x = 15  # Pozitie initiala X
         self.y = 15  # Pozitie initiala Y
@@ -112,13 +163,9 @@ class RobotState():
         self.alerta_reason = "N/A"
         self.direction_stack = []
 
-        # Initializare harta de detectie 32x32
-        self.detection_map = []
-        for y in range(0, 32):
-            self.detection_map.insert(y, [])
-            for x in range(0, 32):
-                self.detection_map[y].insert(x, [])
-                self.detection_map[y][x] = 0  # Nedetectat / Spatiu Gol
+        # Initializare harta de detectie 32x32 (0 = Nedetectat / Spatiu Gol);
+        # harta numara modificarile, ca map_service sa transmita doar schimbarile
+        self.detection_map = map_service.DetectionMap(32, 32)
 
         # Marcheaza pozitia initiala pe harta
         self.detection_map[self.y][self.x] = 3   # Pozitia curenta
@@ -126,48 +173,21 @@ class RobotState():
         self.detection_map[dy][dx] = 2 # Pozitia stanga
         self.x, self.y = self.direction.apply_coord_offset(self.x, self.y) #Avansare
 
-    # Afiseaza harta cu pozitia robotului
-    def printMap(self):
-        print("     N     ")
-        print("    /\\     ")
-        print("     |     ")
-        print("W<------->E")
-        print("     |     ")
-        print("    \\/     ")
-        print("     S     ")
-
-        # Actualizeaza serviciul de alerte cu harta
-        alerts_warnings_service.update_harta(self.detection_map, self.x, self.y)
-
-        # Afiseaza harta caracter cu caracter
-        for y in range(0, 32):
-            for x in range(0, 32):
-                if x == self.x and y == self.y:
-                    print("R", end="")  # R = Robot
-                else:
-                    match self.detection_map[y][x]:
-                        case 0:
-                            print(" ", end="")  # Spatiu gol
-                        case 1:
-                            print("+", end="")  # Ceva detectat
-                        case 2:
-                            print("#", end="")  # Obstacol
-                        case 3:
-                            print("↑", end="")  # Directie Nord
-                        case 4:
-                            print("→", end="")  # Directie Est
-                        case 5:
-                            print("↓", end="")  # Directie Sud
-                        case 6:
-                            print("←", end="")  # Directie Vest
-                        case _:
-                            print(" ", end="")  # Default
-            print("\n", end="")
+    # Harta cu pozitia robotului, ca text pentru jurnal
+    # (dashboard-ul o primeste de la map_service, sarcina "map")
+    def mapText(self):
+        return COMPASS + map_service.render(self.detection_map, self.x, self.y)
+
+    # Stare curenta
+    @property
+    def state(self):
+        return self.machine.state
 
     # Schimba starea robotului
     def changeState(self, new_state: States):
-        print(f"[STATE CHANGE] {self.state} --> {new_state}")
-        self.state = new_state
+        if not self.machine.transition(new_state):
+            self.tip_alerta = "alerta"
+            self.alerta_reason = "O eroare interna a fost detectata."
         self.wait_timer = time.time() + 0.75  # Timer de asteptare
 
     # Stare: Miscare inainte
@@ -182,7 +202,7 @@ class RobotState():
         # Verifica daca exista linie orizontala (intersectie)
         if hline:
             hline_y = (hline[1] + hline[3]) / 2 
-            print(f"hline y is {hline_y}")
+            log.debug("hline y is %s", hline_y)
             # Daca linia orizontala e in zona de interes
             if 20 < hline_y and hline_y < 220:
                 motor_service.stop()
@@ -195,11 +215,10 @@ class RobotState():
 
     # Stare: Decizie de rotatie la intersectie
     def DECIDE_ROTATION(self, frame, hline, vline):
-        # Afiseaza datele de la senzorii ultrasonici
-        print(f"{pico_to_pi_service.us_left}, {pico_to_pi_service.us_front}, {pico_to_pi_service.us_right}")
-        print("[MAP] ================================")
-        self.printMap()
-        print("[MAP] ================================")
+        # Datele de la senzorii ultrasonici si harta (construita doar daca nivelul DEBUG este activ)
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("us %s, %s, %s\n%s", pico_to_pi_service.us_left, pico_to_pi_service.us_front,
+                      pico_to_pi_service.us_right, self.mapText())
 
         motor_service.stop()
 
@@ -224,36 +243,32 @@ class RobotState():
             left_dir = self.direction.turn_left().direction
             right_dir = self.direction.turn_right().direction
             last_dir = self.direction_stack[-1] # Ultima directie salvata
-            print(f"ULTIMA DIRECTIE DE PE STACK: {last_dir}")
-            print(f"STANGA: {left_dir}")
-            print(f"DREAPTA: {right_dir}")
-
-            print(f"{last_dir == left_dir} {self.detection_map[ly][lx]}")
-            print(f"{last_dir == right_dir} {self.detection_map[ry][rx]}")
+            log.debug("ultima directie de pe stack: %s, stanga: %s (%s), dreapta: %s (%s)",
+                      last_dir, left_dir, self.detection_map[ly][lx], right_dir, self.detection_map[ry][rx])
 
             # Incearca sa se intoarca pe ultima directie din stiva
             if(last_dir == left_dir and self.detection_map[ly][lx] != 2):
                 self.direction_stack.pop()  # Scoate directia din stiva
                 motor_service.move_forward_steps(1350) # Se deplaseaza
-                print("stanga")
+                log.debug("stanga")
                 self.detection_map[self.y][self.x] = int(left_dir) + 3 # Marcheaza pe harta
                 self.changeState(States.GO_LEFT)  # Schimba starea
                 return
             elif(last_dir == right_dir and self.detection_map[ry][rx] != 2):
                 self.direction_stack.pop()
                 motor_service.move_forward_steps(1350)
-                print("dreapta")
+                log.debug("dreapta")
                 self.detection_map[self.y][self.x] = int(right_dir) + 3
                 self.changeState(States.GO_RIGHT)
                 return
         
         # Caz general - alege directia pe baza hartii
-        print("caz general")
+        log.debug("caz general")
         self.detection_map[self.y][self.x] = int(self.direction.direction) + 3
 
         # Adauga directia curenta pe stiva daca e obstacol in fata
         if(pico_to_pi_service.us_front < 45):
-            print(f"ADAUGAT DIRECTIE PE STACK: {self.direction.direction}")
+            log.debug("adaugat directie pe stack: %s", self.direction.direction)
             self.direction_stack.append(self.direction.direction)
 
         # Alege directia: inainte > stanga > dreapta
@@ -263,12 +278,12 @@ class RobotState():
         elif(self.detection_map[ly][lx] == 0):
             motor_service.move_forward_steps(1350)
             self.changeState(States.GO_LEFT)
-            print("stanga")
+            log.debug("stanga")
             self.detection_map[self.y][self.x] = int(self.direction.turn_left().direction) + 3
         elif(self.detection_map[ry][rx] == 0):
             motor_service.move_forward_steps(1350)
             self.changeState(States.GO_RIGHT)
-            print("dreapta")
+            log.debug("dreapta")
             self.detection_map[self.y][self.x] = int(self.direction.turn_right().direction) + 3
         else:
             # Nu mai sunt directii disponibile - termina
@@ -428,7 +443,7 @@ class RobotState():
     # Stare: Terminare executie
     def END(self, frame, hline, vline):
         if not self.has_announced_end:
-            print("State machine has entered END state.")
+            log.info("state machine has entered END state: %s", self.alerta_reason)
             # Opreste toate sistemele robotului
             if self.tip_alerta == "alerta":
                 alerts_warnings_service.send_alert("Traseu terminat.", self.alerta_reason, True)
@@ -439,37 +454,20 @@ class RobotState():
             motor_service.set_aspirator(False)  # Opreste aspiratorul
         pass
 
+    # Produsele de viziune de care are nevoie starea curenta
+    # (si in timpul asteptarii de dupa o tranzitie: starea nu ruleaza, dar tracker-ul
+    # continua sa masoare liniile, ca sa nu le piarda la fiecare schimbare de stare)
+    def needs(self):
+        return state_needs[self.state]
+
     # Functia principala care ruleaza masina de stari
     def run(self, frame, hline, vline):
         # Verifica timerul de asteptare
         if time.time() < self.wait_timer:
             return
         
-        # Dictionar pentru maparea starilor la functii
-        state_lookup = {
-                States.MOVE_FORWARD: self.MOVE_FORWARD,
-                States.DECIDE_ROTATION: self.DECIDE_ROTATION,
-                States.GO_FORWARD: self.GO_FORWARD,
-                States.GO_LEFT: self.GO_LEFT,
-                States.LEFT_LOSE_VLINE: self.LEFT_LOSE_VLINE,
-                States.LEFT_GET_VLINE: self.LEFT_GET_VLINE,
-                States.LEFT_FINISH: self.LEFT_FINISH,
-                States.GO_RIGHT: self.GO_RIGHT,
-                States.RIGHT_LOSE_VLINE: self.RIGHT_LOSE_VLINE,
-                States.RIGHT_GET_VLINE: self.RIGHT_GET_VLINE,
-                States.RIGHT_FINISH: self.RIGHT_FINISH,
-                States.END: self.END
-        }
-
-        # Executa functia corespunzatoare starii curente
-        state_function = state_lookup[self.state]
-        if not state_function:
-            print("INVALID STATE DETECTED.")
-            self.tip_alerta = "alerta"
-            self.alerta_reason = "O eroare interna a fost detectata."
-            self.changeState(States.END)
-        else:
-            state_function(frame, hline, vline)
+        # Executa functia starii curente
+        self.machine.handler(frame, hline, vline)
 
 # Instanta globala a starii robotului
 state = RobotState()
@@ -477,112 +475,55 @@ state = RobotState()
 # Constanta pentru cantitatea de rotatie
 ROTATE_AMOUNT_STEPS = 1800
 
-# Determina tipul unei linii pe baza coordonatelor
-def get_line_type(x1, y1, x2, y2, thresh):
-    dx = abs(x2 - x1)  # Diferenta pe axa X
-    dy = abs(y2 - y1)  # Diferenta pe axa Y
-
-    # Clasifica linia pe baza proportiei dx/dy
-    if dy <= thresh * dx:
-        return "horizontal"  # Linie orizontala
-    elif dx <= thresh * dy:
-        return "vertical"    # Linie verticala
-    else:
-        return "diagonal"    # Linie diagonala
-
-# Calculeaza linia medie dintr-un set de linii
-def get_average_line(lines, line_type=None):
-    if len(lines) > 0:
-        # Initializeaza suma coordonatelor
-        average_line = [0, 0, 0, 0]
-        
-        # Sumeaza toate coordonatele liniilor
-        for line in lines:
-            average_line[0] = average_line[0] + line[0][0]
-            average_line[1] = average_line[1] + line[0][1]
-            average_line[2] = average_line[2] + line[0][2]
-            average_line[3] = average_line[3] + line[0][3]
-    
-        # Calculeaza media
-        for i in range(4):
-            average_line[i] = int(average_line[i] / len(lines))
-
-        # Cod pentru normalizarea liniilor
-        """
-        if line_type == "vertical":
-            # Calculate average x coordinate
-            avg_x = (average_line[0] + average_line[2]) // 2
-            
-            # Determine if line direction should be top-to-bottom or bottom-to-top
-            if average_line[1] <= average_line[3]:
-                return True, [avg_x, 0, avg_x, 639]
-            else:
-                return True, [avg_x, 639, avg_x, 0]
-        elif line_type == "horizontal":
-            avg_y = (average_line[1] + average_line[3]) // 2
-            if average_line[0] <= average_line[2]:
-                return True, [0, avg_y, 639, avg_y]
-            else:
-                return True, [639, avg_y, 0, avg_y]
-        """
+# Tracker pentru liniile de rost: pastreaza liniile intre frame-uri
+# si cauta pe toata imaginea doar cand o linie este pierduta
+tracker = line_tracker.GroutTracker()
 
-        return True, average_line
+# Produsele de viziune cerute de starea curenta (mode_service le cere pentru urmatorul frame)
+def get_needs():
+    return state.needs()
 
-    # Nu s-au gasit linii
-    return False, [0,0,0,0]
+# Ruleaza masina de stari cu liniile deja detectate
+def run_lines(frame, hline, vline, needs=Needs.LINES):
+    # Primeste datele de la microcontroler
+    pico_to_pi_service.receive()
 
-# Detecteaza liniile in imaginea binara
-def run_detect(frame, frame_binary):
-    # Detectia liniilor cu transformata Hough
-    lines = cv2.HoughLinesP(frame_binary, rho=1, theta=np.pi/180, threshold=60, minLineLength=150)
-    
-    # Daca nu s-au gasit linii, opreste motoarele
-    if lines is None:
+    # Daca starea urmareste liniile si nu este urmarita niciuna, opreste motoarele.
+    # Spre deosebire de detectia fara tracker (oprire la orice frame fara segmente Hough),
+    # o linie urmarita ramane cea prezisa cel mult line_tracker.MAX_MISSED frame-uri fara
+    # masuratoare, asa ca robotul merge mai departe peste cateva frame-uri zgomotoase si se
+    # opreste la primul frame dupa care ambele linii sunt pierdute
+    if needs & Needs.LINES and hline is None and vline is None:
         motor_service.stop()
-        return False, None, False, None
-    
-    # Separarea liniilor pe tipuri
-    hlines = []  # Linii orizontale
-    vlines = []  # Linii verticale
-    
-    for line in lines:
-        x1, y1, x2, y2 = line[0]
-        line_type = get_line_type(x1, y1, x2, y2, 0.7)
-        if line_type == "horizontal":
-            hlines.append(line)
-        elif line_type == "vertical":
-            vlines.append(line)
-    
-    # Calculeaza liniile medii pentru fiecare tip
-    hret, hline = get_average_line(hlines, "horizontal")
-    vret, vline = get_average_line(vlines, "vertical")
 
-    # Seteaza la None daca nu s-au gasit linii
-    if not hret:
-        hline = None
-    
-    if not vret:
-        vline = None
+    # Frame-ul poate lipsi daca nimeni nu urmareste previzualizarea
+    if frame is not None:
+        # Deseneaza linia orizontala detectata
+        if hline is not None:
+            cv2.line(frame, (hline[0], hline[1]),  (hline[2], hline[3]), (255, 0, 255), 5) 
+        
+        # Deseneaza linia verticala detectata
+        if vline is not None:
+            cv2.line(frame, (vline[0], vline[1]),  (vline[2], vline[3]), (255, 255, 0), 5) 
+
+    # Ruleaza masina de stari cu liniile detectate
+    state.run(frame, hline, vline)
 
-    return hret, hline, vret, vline
+# Functia principala de executie, pentru un frame nou (vision_frame.VisionFrame)
+def run(vision):
+    needs = state.needs()
 
-# Functia principala de executie
-def run(frame, frame_binary):
-    # Primeste datele de la microcontroler
-    pico_to_pi_service.receive()
+    # Frame-ul a fost capturat inainte ca starea sa ceara liniile - asteptam urmatorul
+    if needs & Needs.LINES & ~vision.available:
+        return
 
-    # Detecteaza liniile in imagine
-    hret, hline, vret, vline = run_detect(frame, frame_binary)
-    
-    # Deseneaza linia orizontala detectata
-    if hret:
-        cv2.line(frame, (hline[0], hline[1]),  (hline[2], hline[3]), (255, 0, 255), 5) 
-    
-    # Deseneaza linia verticala detectata
-    if vret:
-        cv2.line(frame, (vline[0], vline[1]),  (vline[2], vline[3]), (255, 255, 0), 5) 
+    if needs & Needs.LINES:
+        # Liniile urmarite (netezite) sau None daca nu se vad; calculate o singura data pe frame
+        hline, vline = vision.lines(tracker, needs)
+    else:
+        # Starea nu foloseste camera: tracker-ul cauta din nou cand liniile vor fi cerute
+        tracker.reset()
+        hline, vline = None, None
 
     # Ruleaza masina de stari cu liniile detectate
-    state.run(frame, hline, vline)
-
-    return frame_binary
\ No newline at end of file
+    run_lines(vision.frame, hline, vline, needs)
@@ -1,8 +1,14 @@
-# # modul partajat
-import shared
 import time
 # modul pentru comunicarea Pi Pico cu Raspberry Pi
 import pico_to_pi_service
+# scrierea comenzilor catre Pico (doar schimbarile, o data pe pas al buclei)
+import command_writer
+# rapoartele tintelor executate de Pico
+import pico_codec
+# jurnalul (niveluri pe module)
+import logging
+
+log = logging.getLogger(__name__)
 
 max_move_speed = 120  # Viteza maxima pentru miscare lineara
 max_rotate_speed = 255  # Viteza maxima pentru rotatie
@@ -16,11 +22,9 @@ last_requested_action = ""
 def write_states():
     """Functie care trimite statusul periei si aspiratorului catre microcontroller"""
     global perie_status, aspirator_status
-    # Cream pachetul de date pentru setarea statusului componentelor
-    # Format: [header1, header2, stare_perie, stare_aspirator, rezervat1, rezervat2]
-    byte_buffer = bytearray([0x7A, 0xF3, perie_status, aspirator_status, 0, 0])
-    # Trimitem datele catre microcontroller prin conexiunea seriala
-    shared.pico.write(byte_buffer)
+    # Pachetul [0x7A, 0xF3, stare_perie, stare_aspirator, 0, 0] este trimis de command_writer,
+    # doar daca starea difera de cea trimisa deja
+    command_writer.set_states(perie_status, aspirator_status)
 
 def set_perie(status: bool):
     """Functie pentru controlul periei robotului"""
@@ -40,11 +44,9 @@ def set_motors(left_speed: int, right_speed: int, left_reverse: bool, right_reve
     left_speed = max(0, min(left_speed, 255))
     right_speed = max(0, min(right_speed, 255))
 
-    # Cream pachetul de date pentru controlul motoarelor
-    # Format: [header1, header2, viteza_stanga, viteza_dreapta, directie_stanga, directie_dreapta]
-    byte_buffer = bytearray([0xF0, 0x0F, left_speed, right_speed, left_reverse, right_reverse])
-    # Trimitem comanda catre microcontroller
-    shared.pico.write(byte_buffer)
+    # Pachetul [0xF0, 0x0F, viteza_stanga, viteza_dreapta, directie_stanga, directie_dreapta]
+    # este trimis de command_writer la sfarsitul pasului, doar daca s-a schimbat ceva
+    command_writer.set_motors(left_speed, right_speed, left_reverse, right_reverse)
 
 def forwards():
     """Functie pentru miscarea robotului inainte"""
@@ -64,49 +66,77 @@ def backwards():
 step_goal_a = 0  # Pozitia tinta pentru motorul A (stanga)
 step_goal_b = 0  # Pozitia tinta pentru motorul B (dreapta)
 
-def move_forward_steps(steps):
-    """Functie pentru miscarea inainte cu un numar specific de pasi"""
+# Tinta executata de Pico (protocolul v3): id-ul ultimei tinte trimise si
+# id-ul tintei care inca ruleaza pe Pico (None daca miscarea se face din bucla de control)
+goal_id = 0
+firmware_goal = None
+goal_start = 0
+
+# Dupa cat timp fara raport de la Pico continuam miscarea din bucla de control (secunde)
+GOAL_TIMEOUT = 5
+
+def set_goal_steps(steps_a, steps_b):
+    """Functie care seteaza tintele relative pentru ambele motoare"""
+    global step_goal_a, step_goal_b, goal_id, firmware_goal, goal_start
     # Primim pozitia actuala a motoarelor de la microcontroller
     pico_to_pi_service.receive()
-    global step_goal_a, step_goal_b
     # Calculam pozitiile tinta pentru ambele motoare
-    step_goal_a = pico_to_pi_service.motor_a_pos + steps
+    step_goal_a = pico_to_pi_service.motor_a_pos + steps_a
+    step_goal_b = pico_to_pi_service.motor_b_pos + steps_b
+
+    # Daca firmware-ul stie sa execute tinta, o trimitem o singura data; Pico-ul regleaza
+    # pozitia local si raporteaza cand a ajuns, fara sa depinda de latenta buclei de control
+    if pico_to_pi_service.goals_supported:
+        goal_id = goal_id % 255 + 1
+        firmware_goal = goal_id
+        goal_start = time.time()
+        pico_to_pi_service.goal_report = None
+        # Pozitiile din firmware au semnul invers fata de cele din pico_to_pi_service
+        command_writer.start_goal(goal_id, -steps_a, -steps_b)
+
+def move_forward_steps(steps):
+    """Functie pentru miscarea inainte cu un numar specific de pasi"""
     # Motorul B primeste 90% din pasi pentru compensarea diferentelor mecanice
-    step_goal_b = pico_to_pi_service.motor_b_pos + int(steps * 0.9)
+    set_goal_steps(steps, int(steps * 0.9))
 
 def move_backward_steps(steps):
     """Functie pentru miscarea inapoi cu un numar specific de pasi"""
-    # Primim pozitia actuala a motoarelor de la microcontroller
-    pico_to_pi_service.receive()
-    global step_goal_a, step_goal_b
     # Calculam pozitiile tinta pentru ambele motoare (scadem pasii)
-    step_goal_a = pico_to_pi_service.motor_a_pos - steps
-    step_goal_b = pico_to_pi_service.motor_b_pos - int(steps * 0.9)
+    set_goal_steps(-steps, -int(steps * 0.9))
 
 def rotate_right_steps(steps):
     """Functie pentru rotirea la dreapta cu un numar specific de pasi"""
-    # Primim pozitia actuala a motoarelor de la microcontroller
-    pico_to_pi_service.receive()
-    global step_goal_a, step_goal_b
     # Pentru rotire la dreapta: motorul stang inainte, motorul drept inapoi
-    step_goal_a = pico_to_pi_service.motor_a_pos + steps
-    step_goal_b = pico_to_pi_service.motor_b_pos - int(steps)
+    set_goal_steps(steps, -int(steps))
 
 def rotate_left_steps(steps):
     """Functie pentru rotirea la stanga cu un numar specific de pasi"""
-    # Primim pozitia actuala a motoarelor de la microcontroller
-    pico_to_pi_service.receive()
-    global step_goal_a, step_goal_b
     # Pentru rotire la stanga: motorul stang inapoi, motorul drept inainte
-    step_goal_a = pico_to_pi_service.motor_a_pos - steps
-    step_goal_b = pico_to_pi_service.motor_b_pos + int(steps)
+    set_goal_steps(-steps, int(steps))
 
 # executarea pas cu pas a miscarii motoarelor pana cand ating tinta
 def run_goal_steps() -> bool:
     """Functie care executa miscarea catre pozitiile tinta setate anterior"""
-    global last_requested_action
+    global last_requested_action, firmware_goal
     last_requested_action = "run_steps"  # Inregistram actiunea pentru debugging
-    
+
+    # Tinta ruleaza pe Pico: doar verificam raportul
+    if firmware_goal is not None:
+        report = pico_to_pi_service.goal_report
+        if report is not None and report[0] == firmware_goal:
+            firmware_goal = None
+            command_writer.goal_finished()
+            if report[1] == pico_codec.GOAL_REACHED:
+                return True  # Miscarea s-a terminat
+            # Tinta a fost anulata (ex. oprire de siguranta): continuam din bucla de control
+        elif time.time() - goal_start > GOAL_TIMEOUT:
+            # Raport pierdut: comanda directa de mai jos opreste si tinta de pe Pico
+            # (command_writer o trimite chiar daca pare neschimbata)
+            log.warning("no report for Pico goal %s, stepping from the host", firmware_goal)
+            firmware_goal = None
+        else:
+            return False  # Miscarea inca nu s-a terminat
+
     # Primim pozitiile actuale ale motoarelor
     pico_to_pi_service.receive()
     global step_goal_a, step_goal_b
@@ -188,11 +218,11 @@ def backwards_correct(vline):
         
         # Corectia pentru deviere la stanga
         if average_x < -x_dev_lim:
-            print("CORRECTING LEFT")  # Mesaj de debugging
+            log.debug("correcting left")  # Mesaj de debugging
             motor_right = 255  # Crestem viteza motorului drept
         # Corectia pentru deviere la dreapta
         elif x_dev_lim < average_x:
-            print("CORRECTING RIGHT")  # Mesaj de debugging
+            log.debug("correcting right")  # Mesaj de debugging
             motor_left = 255   # Crestem viteza motorului stang
             
         # Aplicam setarile (mergem inapoi)
@@ -9,112 +9,217 @@ import pico_to_pi_service
 import mode_aspirator_autonom  
 import mode_manual 
 import mode_smart_perie_autonom  
+# Pipeline-ul de viziune pe mai multe procese
+import vision_workers
+# modul partajat (indicatorul pentru hardware)
+import shared
+# inregistrarea sesiunii pentru replay
+import session_recorder
+# masurarea duratelor pe etape
+import metrics_service
+# coada comenzilor primite
+from collections import deque
+# telemetria pentru dashboard (schema si cererile de keyframe)
+import telemetry_service
+# harta pentru dashboard (fereastra si cererile de keyframe)
+import map_service
+# istoricul alertelor (cerut de dashboard dupa reconectare)
+import alerts_warnings_service
+# jurnalul (niveluri pe module)
+import logging
+# nivelurile jurnalului, schimbate din dashboard
+import log_service
+# statisticile si urma masinilor de stari
+import state_machine
+
+log = logging.getLogger(__name__)
 
 # Var globala care stocheaza modul curent de functionare
+# (schimbata doar pe firul buclei de control, de process_commands si de moduri)
 mode = "manual"
 
+# Comenzile primite pe firul paho, in asteptarea buclei de control: (handler, payload, moment)
+# append / popleft pe deque sunt atomice, deci coada nu are nevoie de lock;
+# cand coada este plina, cea mai veche comanda este aruncata
+COMMAND_QUEUE_SIZE = 64
+commands = deque(maxlen=COMMAND_QUEUE_SIZE)
+
+# Apelat la fiecare comanda pusa in coada (bucla trezeste sarcina care o proceseaza)
+on_command = None
+
+# Statistici: mesaje primite, aruncate (coada plina), procesate, pe topicuri necunoscute
+received = 0
+dropped = 0
+processed = 0
+unknown = 0
+
 # Functie care se executa cand clientul MQTT se conecteaza cu succes
 def mqtt_on_connect(client, userdata, flags, rc):
     # Verifica daca conexiunea a fost realizata cu succes (cod 0)
     if rc == 0:
-        # Se aboneaza la toate topicurile MQTT necesare pentru control
-        client.subscribe("forward")  # Abonare la comenzi pentru miscarea inainte
-        client.subscribe("left")  # Abonare la comenzi pentru rotirea la stanga
-        client.subscribe("right")  # Abonare la comenzi pentru rotirea la dreapta
-        client.subscribe("down")  # Abonare la comenzi pentru miscarea inapoi
-        client.subscribe("mode")  # Abonare la schimbarea modului de functionare
-        client.subscribe("aspirator_manual")  # Abonare la controlul manual al aspiratorului
-        client.subscribe("perie_manual")  # Abonare la controlul manual al periei
+        # Abonare la toate topicurile din tabela de comenzi, intr-un singur mesaj SUBSCRIBE
+        client.subscribe([(topic, 0) for topic in handlers])
+        # Schema telemetriei, pentru dashboard-urile care decodifica mesajele binare
+        telemetry_service.publish_schema(client)
     else:
         # Afiseaza mesaj de eroare si inchide aplicatia daca conexiunea a esuat
-        print("failed to connect.")
+        log.error("failed to connect (rc %d)", rc)
         os.exit()
 
-# Functie care se executa cand se primeste un mesaj MQTT
-def mqtt_on_message(client, userdata, msg):     
-    # Afiseaza informatii despre mesajul primit (timestamp, continut, topic, QoS)
-    print(f"{time.time()} Received message: {msg.payload.decode()} on topic {msg.topic} with QoS {msg.qos}")
-    
-    # Declara ca folosim variabila globala mode
+# Functie care se executa cand se primeste un mesaj MQTT (pe firul paho)
+# Mesajul este doar decodificat si pus in coada; comanda ruleaza pe bucla de control
+def mqtt_on_message(client, userdata, msg):
+    global received, dropped, unknown
+    # Inregistram mesajul pentru replay (daca inregistrarea este activata)
+    session_recorder.record_mqtt(msg.topic, msg.payload)
+
+    # O singura decodare a continutului
+    payload = msg.payload.decode()
+
+    # Mesajul primit (continut, topic, QoS), doar la nivelul DEBUG
+    log.debug("received %s on topic %s with QoS %d", payload, msg.topic, msg.qos)
+
+    received += 1
+    handler = handlers.get(msg.topic)
+    if handler is None:
+        unknown += 1
+        return
+
+    if len(commands) == COMMAND_QUEUE_SIZE:
+        dropped += 1
+    commands.append((handler, payload, time.time()))
+    if on_command is not None:
+        on_command()
+
+# Ruleaza comenzile din coada (pe firul buclei de control, la inceputul pasului)
+def process_commands():
+    global processed
+    while commands:
+        handler, payload, receive_time = commands.popleft()
+        # Cat a asteptat comanda in coada
+        metrics_service.record("mqtt.queue", time.time() - receive_time)
+        handler(payload)
+        processed += 1
+
+# Controlul manual al aspiratorului
+def on_aspirator_manual(payload):
+    mode_manual.aspirator_mode = payload == "true"
+
+# Controlul manual al periei
+def on_perie_manual(payload):
+    mode_manual.perie_mode = payload == "true"
+
+# Pornirea / oprirea masurarii etapelor
+def on_metrics_enable(payload):
+    metrics_service.set_enabled(payload == "true")
+
+# Cadrul complet de telemetrie (handler-ul este cautat la apel: telemetry_service importa
+# modurile, care importa acest modul, deci poate fi inca incomplet cand se construieste tabela)
+def on_telemetry_request(payload):
+    telemetry_service.request_keyframe(payload)
+
+# Harta completa si fereastra hartii (cautate la apel, ca handler-ul telemetriei)
+def on_map_request(payload):
+    map_service.request_keyframe(payload)
+
+def on_map_viewport(payload):
+    map_service.set_viewport(payload)
+
+# Retrimiterea ultimelor alerte / avertismente
+def on_alerts_request(payload):
+    alerts_warnings_service.request_history(payload)
+
+# Timpii pe stari, tranzitiile si urma masinilor de stari
+def on_fsm_trace_request(payload):
+    state_machine.publish_trace(client, payload)
+
+# Schimbarea modului de functionare
+def on_mode(payload):
     global mode
+    # Modul selectat
+    log.info("mod select: %s", payload)
+    # Opreste toate motoarele inainte de schimbarea modului
+    motor_service.stop()
+    # Actualizeaza modul curent cu cel primit
+    mode = payload
+
+    # Reseteaza starile aspiratorului si periei
+    motor_service.perie_status = False
+    motor_service.aspirator_status = False
 
-    # Verifica daca mesajul este pentru controlul manual al aspiratorului
-    if msg.topic == "aspirator_manual":
-        # Seteaza starea aspiratorului manual pe baza mesajului primit
-        mode_manual.aspirator_mode = bool(msg.payload.decode() == "true")
-    
-    # Verifica daca mesajul este pentru controlul manual al periei
-    if msg.topic == "perie_manual":
-        # Seteaza starea periei manuale pe baza mesajului primit
-        mode_manual.perie_mode = bool(msg.payload.decode() == "true")
-
-    # Verifica daca mesajul este pentru schimbarea modului de functionare
-    if msg.topic == "mode":
-        # Afiseaza modul selectat
-        print(f"Mod select: {msg.payload.decode()}")
-        # Opreste toate motoarele inainte de schimbarea modului
+    # Configureaza robotul pe baza modului selectat
+    if mode == "aspirare":
+        # Mod autonom de aspirare - activeaza doar aspiratorul
+        motor_service.aspirator_status = True
+        # Reseteaza timer-ul pentru alertele din modul aspirator autonom
+        mode_aspirator_autonom.last_alert = 0
+    elif mode == "perie":
+        # Mod autonom cu perie - activeaza si aspiratorul si peria
+        motor_service.aspirator_status = True
+        motor_service.perie_status = True
+        # Initializeaza starea robotului pentru modul perie inteligenta
+        mode_smart_perie_autonom.state = mode_smart_perie_autonom.RobotState()
+        # Liniile urmarite anterior nu mai sunt valabile
+        mode_smart_perie_autonom.tracker.reset()
+        vision_workers.reset_tracker()
+    elif mode == "manual":
+        # Mod manual - opreste toate motoarele
         motor_service.stop()
-        # Actualizeaza modul curent cu cel primit
-        mode = msg.payload.decode()
-        
-        # Reseteaza starile aspiratorului si periei
-        motor_service.perie_status = False
-        motor_service.aspirator_status = False
-
-        # Configureaza robotul pe baza modului selectat
-        if mode == "aspirare":
-            # Mod autonom de aspirare - activeaza doar aspiratorul
-            motor_service.aspirator_status = True
-            # Reseteaza timer-ul pentru alertele din modul aspirator autonom
-            mode_aspirator_autonom.last_alert = 0
-        elif mode == "perie":
-            # Mod autonom cu perie - activeaza si aspiratorul si peria
-            motor_service.aspirator_status = True
-            motor_service.perie_status = True
-            # Initializeaza starea robotului pentru modul perie inteligenta
-            mode_smart_perie_autonom.state = mode_smart_perie_autonom.RobotState()
-        elif mode == "manual":
-            # Mod manual - opreste toate motoarele si scrie starile
-            motor_service.stop()
-            motor_service.write_states()
 
-        # Scrie starile curente ale motoarelor
-        motor_service.write_states()
-        
-        # Iese din functie pentru a nu procesa alte comenzi
-        return
-    
-    # Procesarea comenzilor doar daca robotul este in modul manual
-    if mode == "manual":
-        # Gestionarea comenzii pentru miscarea inainte
-        if msg.topic == "forward":
-            # Verifica daca senzorul IR detecteaza scari
-            if pico_to_pi_service.ir_scari:
-                # Opreste robotul daca detecteaza scari (masura de siguranta)
-                motor_service.stop()
-            else:
-                # Misca robotul inainte daca nu sunt detectate scari
-                motor_service.forwards()
-        # Gestionarea comenzii pentru rotirea la stanga
-        elif msg.topic == "left":
-            motor_service.left()
-        # Gestionarea comenzii pentru rotirea la dreapta
-        elif msg.topic == "right":
-            motor_service.right()
-        # Gestionarea comenzii pentru miscarea inapoi
-        elif msg.topic == "down":
-            motor_service.backwards()
-
-        # Opreste motoarele cand butonul este eliberat
-        if msg.payload.decode() == "released":
+    # Scrie starile curente ale motoarelor
+    motor_service.write_states()
+
+# Miscarea inainte, oprita daca senzorul IR detecteaza scari (masura de siguranta)
+def forwards_safe():
+    if pico_to_pi_service.ir_scari:
+        motor_service.stop()
+    else:
+        motor_service.forwards()
+
+# Handler pentru un buton de miscare din dashboard: actiunea cat timp butonul este apasat,
+# oprirea cand este eliberat; comenzile conteaza doar in modul manual
+def drive(action):
+    def handler(payload):
+        if mode != "manual":
+            return
+        if payload == "released":
             motor_service.stop()
+        else:
+            action()
+    return handler
+
+# Tabela topic -> handler (handler-ul primeste continutul decodificat)
+handlers = {
+    "forward": drive(forwards_safe),             # Miscarea inainte
+    "left": drive(motor_service.left),           # Rotirea la stanga
+    "right": drive(motor_service.right),         # Rotirea la dreapta
+    "down": drive(motor_service.backwards),      # Miscarea inapoi
+    "mode": on_mode,                             # Schimbarea modului de functionare
+    "aspirator_manual": on_aspirator_manual,     # Controlul manual al aspiratorului
+    "perie_manual": on_perie_manual,             # Controlul manual al periei
+    "metrics_enable": on_metrics_enable,         # Pornirea / oprirea masurarii etapelor
+    "telemetry_request": on_telemetry_request,    # Cadru complet de telemetrie
+    "map_request": on_map_request,               # Harta completa (in fereastra curenta)
+    "map_viewport": on_map_viewport,             # Dimensiunea / zoom-ul ferestrei hartii
+    "alerts_history_request": on_alerts_request,  # Istoricul alertelor si avertismentelor
+    "log_level": log_service.on_level_request,    # Nivelurile jurnalului (ex. "fsm=DEBUG")
+    "fsm_trace_request": on_fsm_trace_request,    # Statisticile si urma masinilor de stari
+}
+
+# Statisticile cozii de comenzi (pentru metrici / depanare)
+def stats():
+    return {"received": received, "dropped": dropped, "processed": processed,
+            "unknown": unknown, "queued": len(commands)}
 
 # Crearea clientului MQTT
 client = mqtt.Client()
 # Asocierea functiilor de callback pentru conectare si primirea mesajelor
 client.on_connect = mqtt_on_connect
 client.on_message = mqtt_on_message
-# Conectarea la brokerul MQTT local pe portul standard 1883
-client.connect("localhost", 1883)
-# Pornirea loop-ului MQTT in background pentru a procesa mesajele
-client.loop_start()
\ No newline at end of file
+# Fara hardware (ex. la replay) nu ne conectam; clientul este inlocuit din afara
+# In runtime-ul asyncio conexiunea este condusa de async_runtime, fara firul paho
+if shared.hardware_enabled and shared.runtime != "asyncio":
+    # Conectarea la brokerul MQTT (implicit cel local, pe portul standard 1883)
+    client.connect(shared.mqtt_host, shared.mqtt_port)
+    # Pornirea loop-ului MQTT in background pentru a procesa mesajele
+    client.loop_start()
\ No newline at end of file
@@ -0,0 +1,266 @@
+# Decodarea pachetelor de telemetrie trimise de Pico (sketch_dec19a.ino)
+#
+# Pachetul v1 are 24 de octeti: header 0x54, apoi "<fff???ll"
+#   us_front, us_left, us_right (float, cm), ir_scari, ir_aspirator, senzor_umid (bool),
+#   pozitia motorului stang si a celui drept (long)
+#
+# Pachetul v2 are 32 de octeti: header 0x55, numarul de ordine (uint16), micros() pe Pico
+# (uint32), aceleasi date ca v1 si CRC-16/CCITT (init 0xFFFF) peste tot ce este inainte.
+# Versiunea 2 este ceruta la pornire cu comanda HELLO; Pico raspunde cu un ACK (header 0x56)
+# la viteza curenta, apoi trece la viteza ceruta. Un firmware vechi ignora comanda si
+# ramane la v1 / 9600. Versiunea 3 pastreaza pachetele v2 si adauga tintele de pozitie
+# executate pe Pico (comenzile GOAL / GOAL_CONFIG si raportul 0x57 la terminarea tintei).
+#
+# Octetii primiti sunt adunati intr-un buffer refolosit; toate pachetele complete sunt
+# decodificate dintr-o data cu unpack_from pe un memoryview, fara copii intermediare.
+#
+# Pachetul v1 nu are suma de control, asa ca fiecare pachet este validat structural
+# (booleenii trebuie sa fie 0 / 1, distantele finite si in domeniul senzorului, iar dupa
+# pachet trebuie sa urmeze un header, daca au sosit deja octetii urmatori). La un pachet
+# invalid cautam urmatorul header si incercam din nou de acolo (resincronizare).
+import re
+import struct
+# CRC-16/CCITT implementat in C
+from binascii import crc_hqx
+# jurnalul (niveluri pe module)
+import logging
+
+log = logging.getLogger(__name__)
+
+HEADER_V1 = 0x54
+TELEMETRY_V1 = struct.Struct("<fff???ll")
+PACKET_SIZE_V1 = 1 + TELEMETRY_V1.size
+
+HEADER_V2 = 0x55
+TELEMETRY_V2 = struct.Struct("<HIfff???ll")
+CRC = struct.Struct("<H")
+PACKET_SIZE_V2 = 1 + TELEMETRY_V2.size + CRC.size
+
+# Raspunsul la HELLO: versiune, codul vitezei, perioada telemetriei (ms), CRC
+HEADER_ACK = 0x56
+ACK = struct.Struct("<BBB")
+PACKET_SIZE_ACK = 1 + ACK.size + CRC.size
+
+# Raportul de terminare a unei tinte de pozitie (v3): id, stare, CRC
+HEADER_GOAL = 0x57
+GOAL_REPORT = struct.Struct("<BB")
+PACKET_SIZE_GOAL = 1 + GOAL_REPORT.size + CRC.size
+GOAL_REACHED, GOAL_CANCELLED = 1, 2
+
+# Comanda HELLO (6 octeti, ca restul comenzilor): 0xC5 0x5C versiune cod_viteza perioada_ms 0
+HELLO = struct.Struct("<BBBBBB")
+HELLO_HEADER = (0xC5, 0x5C)
+
+# Comanda GOAL (v3): 0x9D id pasi_stanga pasi_dreapta (int16, relativi, in pasi de encoder)
+GOAL = struct.Struct("<BBhh")
+GOAL_HEADER = 0x9D
+# Comanda GOAL_CONFIG: 0x9E 0xE9 viteza_maxima (0-255) toleranta (pasi) 0 0
+GOAL_CONFIG = struct.Struct("<BBBBBB")
+GOAL_CONFIG_HEADER = (0x9E, 0xE9)
+
+# Vitezele suportate; in HELLO / ACK se trimite indexul din lista
+BAUD_RATES = [9600, 115200, 230400, 460800, 921600]
+
+# Orice octet care poate incepe un pachet
+HEADERS = (HEADER_V1, HEADER_V2, HEADER_ACK, HEADER_GOAL)
+HEADER_PATTERN = re.compile(b"[\x54-\x57]")
+
+# pulseIn() are timeout de 100 ms: cel mult ~1700 cm (0 cand nu vine ecou)
+MAX_DISTANCE = 1800.0
+
+# Dimensiunea initiala a buffer-ului de primire (creste daca sosesc mai multe date)
+BUFFER_SIZE = 4096
+
+
+# Construieste comanda HELLO pentru versiunea, viteza si frecventa telemetriei cerute
+def hello(version, baudrate, rate):
+    period = max(1, min(255, round(1000 / rate)))
+    return HELLO.pack(*HELLO_HEADER, version, BAUD_RATES.index(baudrate), period, 0)
+
+
+# Construieste comanda GOAL; pasii relativi sunt limitati la int16
+def goal(goal_id, left, right):
+    left = max(-32768, min(32767, left))
+    right = max(-32768, min(32767, right))
+    return GOAL.pack(GOAL_HEADER, goal_id, left, right)
+
+
+# Construieste comanda GOAL_CONFIG
+def goal_config(max_speed, dead_band):
+    return GOAL_CONFIG.pack(*GOAL_CONFIG_HEADER, max(0, min(255, max_speed)), max(0, min(255, dead_band)), 0, 0)
+
+
+# Verifica datele unui pachet (distantele si octetii booleeni); True daca sunt plauzibile
+def check_values(view, distances, bools_offset):
+    # Booleenii sunt scrisi de firmware ca 0 / 1; orice alta valoare inseamna date corupte
+    for i in range(bools_offset, bools_offset + 3):
+        if view[i] > 1:
+            return False
+
+    for distance in distances:
+        if not (0.0 <= distance <= MAX_DISTANCE):
+            # Include si NaN (orice comparatie cu NaN este falsa)
+            return False
+
+    return True
+
+
+# Verifica suma de control a unui pachet de size octeti aflat la offset
+def check_crc(view, offset, size):
+    end = offset + size - CRC.size
+    return crc_hqx(view[offset:end], 0xFFFF) == CRC.unpack_from(view, end)[0]
+
+
+class Decoder():
+    buffer: bytearray       # Buffer-ul de primire, refolosit intre apeluri
+    length: int             # Cati octeti valizi sunt in buffer
+    packets: int            # Pachete decodificate
+    bad_frames: int         # Pachete cu header valid, dar continut invalid (sau CRC gresit)
+    skipped_bytes: int      # Octeti aruncati la resincronizare
+    resyncs: int            # De cate ori am pierdut sincronizarea
+    lost: int               # Pachete v2 lipsa (goluri in numerele de ordine)
+    last_seq: int           # Numarul de ordine al ultimului pachet v2 (None inainte de primul)
+    ack: tuple              # Ultimul ACK primit: (versiune, viteza, perioada_ms) sau None
+    goal: tuple             # Ultimul raport de tinta: (id, stare) sau None
+
+    def __init__(self, size=BUFFER_SIZE):
+        self.buffer = bytearray(size)
+        self.view = memoryview(self.buffer)
+        self.length = 0
+        self.packets = 0
+        self.bad_frames = 0
+        self.skipped_bytes = 0
+        self.resyncs = 0
+        self.lost = 0
+        self.last_seq = None
+        self.ack = None
+        self.goal = None
+
+    # Adauga octetii primiti si decodifica toate pachetele complete
+    # Returneaza lista pachetelor, in ordinea sosirii: (seq, micros, *valorile v1);
+    # pentru pachetele v1 seq si micros sunt None
+    def feed(self, data):
+        end = self.length + len(data)
+        if end > len(self.buffer):
+            # Marim buffer-ul (rar: doar daca s-au adunat multe date deodata)
+            self.view.release()
+            self.buffer.extend(bytes(end - len(self.buffer)))
+            self.view = memoryview(self.buffer)
+        self.view[self.length:end] = data
+        self.length = end
+
+        return self.decode_all()
+
+    # Incearca sa decodifice pachetul care incepe la offset; returneaza:
+    #   0 - pachetul nu a sosit complet
+    #   None - la offset nu incepe un pachet valid
+    #   (lungimea, valorile) - valorile sunt None pentru ACK si rapoartele de tinta
+    def decode_at(self, offset):
+        view = self.view
+        available = self.length - offset
+        header = view[offset]
+
+        if header == HEADER_V2:
+            if available < PACKET_SIZE_V2:
+                return 0
+            if not check_crc(view, offset, PACKET_SIZE_V2):
+                return None
+            values = TELEMETRY_V2.unpack_from(view, offset + 1)
+            # CRC-ul acopera transmisia; verificarea valorilor prinde un firmware defect
+            if not check_values(view, values[2:5], offset + 19):
+                return None
+            return PACKET_SIZE_V2, values
+
+        if header == HEADER_V1:
+            if available < PACKET_SIZE_V1:
+                return 0
+            values = TELEMETRY_V1.unpack_from(view, offset + 1)
+            if not check_values(view, values[0:3], offset + 13):
+                return None
+            # Daca au sosit deja octeti dupa pachet, primul trebuie sa fie tot un header
+            following = offset + PACKET_SIZE_V1
+            if following < self.length and view[following] not in HEADERS:
+                return None
+            return PACKET_SIZE_V1, (None, None) + values
+
+        if header == HEADER_ACK:
+            if available < PACKET_SIZE_ACK:
+                return 0
+            if not check_crc(view, offset, PACKET_SIZE_ACK):
+                return None
+            version, baud_code, period = ACK.unpack_from(view, offset + 1)
+            if baud_code >= len(BAUD_RATES):
+                return None
+            self.ack = (version, BAUD_RATES[baud_code], period)
+            return PACKET_SIZE_ACK, None
+
+        if header == HEADER_GOAL:
+            if available < PACKET_SIZE_GOAL:
+                return 0
+            if not check_crc(view, offset, PACKET_SIZE_GOAL):
+                return None
+            self.goal = GOAL_REPORT.unpack_from(view, offset + 1)
+            return PACKET_SIZE_GOAL, None
+
+        return None
+
+    def decode_all(self):
+        view = self.view
+        decoded = []
+        offset = 0
+        skipped = 0
+
+        while offset < self.length:
+            result = self.decode_at(offset)
+            if result == 0:
+                # Pachet incomplet: asteptam restul
+                break
+
+            if result is not None:
+                size, values = result
+                if values is not None:
+                    decoded.append(values)
+                    self.check_seq(values[0])
+                offset += size
+                continue
+
+            # Header necunoscut sau pachet invalid: sarim la urmatorul header posibil
+            if view[offset] in HEADERS:
+                self.bad_frames += 1
+            match = HEADER_PATTERN.search(self.buffer, offset + 1, self.length)
+            next_offset = match.start() if match else self.length
+            if not skipped:
+                self.resyncs += 1
+            skipped += next_offset - offset
+            offset = next_offset
+
+        if skipped:
+            self.skipped_bytes += skipped
+            log.warning("resync, skipped %d bytes", skipped)
+
+        # Mutam restul (pachetul incomplet) la inceputul buffer-ului
+        if offset:
+            rest = self.length - offset
+            view[0:rest] = view[offset:self.length]
+            self.length = rest
+
+        self.packets += len(decoded)
+        return decoded
+
+    # Numara pachetele v2 pierdute pe legatura (numarul de ordine are 16 biti)
+    def check_seq(self, seq):
+        if seq is None:
+            return
+        if self.last_seq is not None:
+            self.lost += (seq - self.last_seq - 1) & 0xFFFF
+        self.last_seq = seq
+
+    # Statisticile decodorului (pentru metrici / depanare)
+    def stats(self):
+        return {
+            "packets": self.packets,
+            "bad_frames": self.bad_frames,
+            "skipped_bytes": self.skipped_bytes,
+            "resyncs": self.resyncs,
+            "lost": self.lost,
+        }
@@ -0,0 +1,208 @@
+# Conexiunea seriala cu Pico-ul: gasirea portului, conectarea si reconectarea in fundal
+#
+# Portul este cautat dupa VID-ul USB al Raspberry Pi (0x2E8A), nu dupa nume, pentru ca
+# Pico-ul poate aparea pe ttyACM0 sau ttyACM1. Conectarea ruleaza pe un fir separat,
+# asa ca backend-ul porneste si fara Pico, iar dupa o deconectare (ex. brown-out)
+# portul este redeschis automat, fara sa blocheze bucla de control.
+#
+# shared.pico este portul deschis sau None cat timp legatura este cazuta.
+# Cine citeste / scrie si primeste o eroare apeleaza lost(port, eroare).
+#
+# ROBOT_PICO_PORT=/dev/ttyUSB0 forteaza un port anume
+# ROBOT_PICO_PID=000a filtreaza si dupa PID (implicit orice placa cu VID-ul Raspberry Pi)
+import os
+import json
+import threading
+import time
+# comunicarea seriala si lista porturilor USB
+import serial
+from serial.tools import list_ports
+# modul partajat (portul curent)
+import shared
+# durata intreruperilor
+import metrics_service
+# jurnalul (niveluri pe module)
+import logging
+
+log = logging.getLogger(__name__)
+
+PICO_VID = 0x2E8A
+PICO_PID = int(os.environ["ROBOT_PICO_PID"], 16) if os.environ.get("ROBOT_PICO_PID") else None
+
+# Portul fortat din mediu (None = cautare dupa VID / PID)
+port_name = os.environ.get("ROBOT_PICO_PORT")
+
+# Porturile incercate daca nu gasim placa dupa VID (ex. sisteme fara informatii USB)
+FALLBACK_PORTS = ["/dev/ttyACM0", "/dev/ttyACM1"]
+
+# Viteza la deschidere (protocolul v1; negocierea o poate schimba) si timeout-ul citirii
+BAUDRATE = 9600
+READ_TIMEOUT = 0.1
+
+# Asteptarea intre incercari de conectare (creste pana la RETRY_MAX cat timp esueaza)
+RETRY_MIN, RETRY_MAX = 0.2, 5.0
+
+# Ce se intampla cu comenzile cat timp legatura este cazuta (vezi command_writer):
+#   stop   - comenzile motoarelor sunt aruncate: la reconectare motoarele pornesc oprite,
+#            iar perie / aspirator sunt retrimise
+#   latest - la reconectare se trimite ultima stare ceruta, inclusiv motoarele
+offline_policy = os.environ.get("ROBOT_PICO_OFFLINE_POLICY", "stop")
+
+# Starea legaturii: "disconnected", "connecting" sau "connected"
+state = "disconnected"
+# Semnalat cat timp legatura este activa (firul de citire asteapta pe el)
+connected = threading.Event()
+
+# Apelate pe firul legaturii cu portul nou deschis, inainte sa fie folosit (ex. negocierea)
+on_open = []
+# Apelate dupa ce shared.pico a fost setat (ex. inregistrarea in bucla asyncio)
+on_connect = []
+# Apelate cu portul vechi cand legatura a cazut, inainte de inchiderea lui
+on_disconnect = []
+
+# Statistici
+connects = 0
+disconnects = 0
+connected_since = None
+disconnected_since = time.time()
+last_downtime = None
+last_error = None
+
+lock = threading.Lock()
+wake = threading.Event()
+running = False
+thread = None
+
+
+# Cauta portul Pico-ului; returneaza numele lui sau None
+def find_port():
+    if port_name:
+        return port_name if os.path.exists(port_name) else None
+
+    for info in list_ports.comports():
+        if info.vid == PICO_VID and (PICO_PID is None or info.pid == PICO_PID):
+            return info.device
+
+    for name in FALLBACK_PORTS:
+        if os.path.exists(name):
+            return name
+    return None
+
+
+def open_port(name):
+    return serial.Serial(port=name, baudrate=BAUDRATE, timeout=READ_TIMEOUT)
+
+
+# Raporteaza o eroare pe port; legatura este marcata cazuta si firul reincearca conectarea
+def lost(port, error=None):
+    global state, disconnects, disconnected_since, connected_since, last_error
+    with lock:
+        # Eroarea a fost deja raportata (de cititor sau de scriitor)
+        if port is None or shared.pico is not port:
+            return
+        shared.pico = None
+        state = "disconnected"
+        connected.clear()
+        disconnects += 1
+        disconnected_since = time.time()
+        connected_since = None
+        last_error = str(error) if error is not None else None
+
+    log.warning("Pico link lost: %s", error)
+    for callback in on_disconnect:
+        callback(port)
+    try:
+        port.close()
+    except (serial.SerialException, OSError):
+        pass
+    wake.set()
+
+
+# Firul legaturii: (re)conecteaza cat timp legatura este cazuta
+def run():
+    global state, connects, connected_since, last_downtime, last_error
+    delay = RETRY_MIN
+    while running:
+        if shared.pico is not None:
+            # Conectat: asteptam o deconectare (sau oprirea)
+            wake.wait()
+            wake.clear()
+            continue
+
+        state = "connecting"
+        name = find_port()
+        port = None
+        try:
+            if name is None:
+                raise serial.SerialException("Pico not found")
+            port = open_port(name)
+            for callback in on_open:
+                callback(port)
+        except (serial.SerialException, OSError) as e:
+            if port is not None:
+                port.close()
+            # Afisam doar prima eroare dintr-o serie de incercari esuate
+            if str(e) != last_error:
+                log.warning("Pico link: %s, retrying", e)
+            last_error = str(e)
+            state = "disconnected"
+            wake.wait(delay)
+            wake.clear()
+            delay = min(delay * 2, RETRY_MAX)
+            continue
+
+        with lock:
+            shared.pico = port
+            state = "connected"
+            connects += 1
+            connected_since = time.time()
+            last_downtime = connected_since - disconnected_since
+            last_error = None
+        connected.set()
+        delay = RETRY_MIN
+
+        # Prima conectare este pornirea; celelalte sunt recuperari dupa o intrerupere
+        if connects > 1:
+            metrics_service.record("serial.reconnect", last_downtime)
+        log.info("Pico link connected on %s after %.2f s", name, last_downtime)
+        for callback in on_connect:
+            callback(port)
+
+
+def start():
+    global running, thread
+    if running:
+        return
+    running = True
+    thread = threading.Thread(target=run, name="pico-link", daemon=True)
+    thread.start()
+
+
+def stop():
+    global running
+    running = False
+    wake.set()
+
+
+# Starea legaturii (pentru metrici / depanare)
+def stats():
+    return {
+        "state": state,
+        "port": getattr(shared.pico, "port", None),
+        "connects": connects,
+        "disconnects": disconnects,
+        "connected_for_s": round(time.time() - connected_since, 3) if connected_since else None,
+        "last_downtime_s": round(last_downtime, 3) if last_downtime is not None else None,
+        "last_error": last_error,
+    }
+
+
+# Handler HTTP pentru /link: starea legaturii ca JSON
+def serve(request):
+    body = json.dumps(stats()).encode()
+    request.send_response(200)
+    request.send_header("Content-Type", "application/json")
+    request.send_header("Content-Length", str(len(body)))
+    request.send_header("Cache-Control", "no-cache")
+    request.end_headers()
+    request.wfile.write(body)
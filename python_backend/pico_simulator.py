@@ -0,0 +1,603 @@
+# Pico simulat pe un pseudo-terminal (PTY), cu acelasi protocol ca sketch_dec19a.ino
+#
+# Backend-ul se conecteaza la simulator exact ca la placa, prin pico_link:
+#   python pico_simulator.py --port /tmp/pico-sim
+#   ROBOT_PICO_PORT=/tmp/pico-sim python main.py
+#
+# Simulatorul:
+#   - trimite telemetrie v1 (0x54) la frecventa ceruta (--rate, de la 20 Hz la mii pe secunda)
+#     si, daca backend-ul o cere cu HELLO, v2 / v3 (0x55 cu CRC, tinte de pozitie 0x9D / 0x9E);
+#     --protocol 1 simuleaza firmware-ul vechi, care ignora HELLO
+#   - citeste comenzile de 6 octeti ca firmware-ul (0xF0 0x0F motoare, 0x7A 0xF3 perie / aspirator)
+#   - integreaza pozitiile encoder-elor din vitezele comandate si pozitia robotului intr-o
+#     camera dreptunghiulara, din care calculeaza distantele ultrasonice
+#   - injecteaza erori la cerere: pachete corupte, rafale, blocaje cu eliberarea intarziata
+#     a datelor (ca un buffer USB plin) si deconectari (cu sau fara repornirea placii)
+#
+# Exemple pentru teste de anduranta:
+#   python pico_simulator.py --rate 2000 --corrupt-rate 0.01
+#   python pico_simulator.py --disconnect-every 30 --disconnect-for 2 --report 5
+#   python pico_simulator.py --stall-every 10 --stall-for 0.5 --burst-every 3 --burst-size 200
+#
+# Pe USB CDC viteza portului nu limiteaza transferul, asa ca nici simulatorul nu o aplica
+# (viteza ceruta prin HELLO este doar retinuta).
+import os
+import pty
+import tty
+import json
+import math
+import time
+import random
+import select
+import argparse
+import threading
+# numararea comenzilor primite
+from collections import Counter
+# CRC-16/CCITT, acelasi ca in firmware
+from binascii import crc_hqx
+# formatul pachetelor (acelasi cu decodorul backend-ului)
+import pico_codec
+
+DEFAULT_PATH = "/tmp/pico-sim"
+
+# Firmware-ul porneste la 20 Hz si protocolul v1; HELLO poate cere cel mult v3
+DEFAULT_RATE = 20.0
+PROTOCOL_MAX_VERSION = 3
+# Cea mai mica perioada (ms) acceptata prin HELLO, ca MIN_UPDATE_MESSAGE_DELAY din firmware
+MIN_PERIOD = 50
+
+# Modelul robotului (ales dupa miscarile din modurile autonome: 700 de pasi pe fiecare roata
+# rotesc robotul cu ~90 de grade, 1350 de pasi inainte sunt ~30 cm)
+STEPS_PER_CM = 45.0
+WHEEL_BASE = 20.0               # Distanta dintre roti (cm)
+MAX_STEPS_PER_SECOND = 3000.0   # Viteza encoder-ului la PWM 255
+
+# Camera implicita (cm); robotul porneste in centru, orientat spre +y
+ROOM = (400.0, 300.0)
+
+# Ecoul este asteptat cel mult 100 ms: peste ~1700 cm senzorul intoarce 0
+MAX_ECHO = 1700.0
+
+# Parametrii tintelor de pozitie, ca in firmware
+GOAL_SLOWDOWN = 200.0
+GOAL_MIN_SPEED = 0.35
+
+# Pasul maxim al simularii (secunde), ca tintele sa nu depaseasca toleranta
+MAX_STEP = 0.002
+
+# Cat poate ramane netrimis spre backend; peste atat nu mai generam pachete
+# (firmware-ul ar ramane blocat in Serial.write)
+MAX_BACKLOG = 64 * 1024
+
+# Intarzierea maxima recuperata prin pachete trimise in rafala (ex. dupa o suspendare)
+MAX_CATCHUP = 0.1
+
+# Pozitia intrarilor digitale in valorile unui pachet de telemetrie
+INPUT_INDEX = {"ir_scari": 3, "ir_aspirator": 4, "senzor_umid": 5}
+
+
+# Un motor cu encoder, ca clasa Motor din firmware
+class SimMotor():
+    speed: float            # Viteza comandata (0-1)
+    direction: bool         # False = inainte (pozitia scade), True = inapoi
+    position: float         # Pozitia encoder-ului (pasi)
+    goal_active: bool
+    goal_position: float
+
+    def __init__(self):
+        self.speed = 0.0
+        self.direction = False
+        self.position = 0.0
+        self.goal_active = False
+        self.goal_position = 0.0
+
+    def start_goal(self, relative):
+        self.goal_position = self.position + relative
+        self.goal_active = relative != 0
+
+    # Returneaza True cand tinta este atinsa (viteza scade liniar in ultimii GOAL_SLOWDOWN pasi)
+    def run_goal(self, max_speed, dead_band):
+        if not self.goal_active:
+            return True
+
+        error = self.goal_position - self.position
+        if abs(error) <= dead_band:
+            self.speed = 0.0
+            self.goal_active = False
+            return True
+
+        self.direction = error > 0
+        self.speed = max_speed * min(1.0, max(GOAL_MIN_SPEED, abs(error) / GOAL_SLOWDOWN))
+        return False
+
+    # Avanseaza encoder-ul cu dt secunde; returneaza distanta parcursa inainte (cm)
+    def advance(self, dt):
+        steps = self.speed * MAX_STEPS_PER_SECOND * dt
+        if self.direction:
+            self.position += steps
+            return -steps / STEPS_PER_CM
+        self.position -= steps
+        return steps / STEPS_PER_CM
+
+
+class SimulatedPico():
+    path: str                   # Legatura simbolica spre capatul PTY folosit de backend
+    rate: float                 # Frecventa telemetriei (pachete pe secunda)
+    protocol_max: int           # Cea mai noua versiune acceptata la HELLO (1 = ignora HELLO)
+    fixed_rate: bool            # Daca perioada ceruta prin HELLO este ignorata
+    room: tuple                 # Dimensiunile camerei (cm)
+    noise: float                # Deviatia standard a zgomotului distantelor (cm)
+    corrupt_rate: float         # Probabilitatea ca un pachet de telemetrie sa fie corupt
+    on_command: object          # Apelat cu (nume, comanda, time.time()) la fiecare comanda primita
+    on_input_sent: object       # Apelat cu (nume, valoare, time.time()) cand o intrare schimbata pleaca in telemetrie
+
+    def __init__(self, path=DEFAULT_PATH, rate=DEFAULT_RATE, protocol_max=PROTOCOL_MAX_VERSION,
+                 fixed_rate=False, room=ROOM, noise=0.0, corrupt_rate=0.0, micros_offset=0, seed=None):
+        self.path = path
+        self.initial_rate = rate
+        self.protocol_max = protocol_max
+        self.fixed_rate = fixed_rate
+        self.room = room
+        self.noise = noise
+        self.corrupt_rate = corrupt_rate
+        self.micros_offset = micros_offset
+        self.random = random.Random(seed)
+        self.on_command = None
+        self.on_input_sent = None
+
+        # Senzorii digitali (setati din teste) si distantele fortate (None = calculate din camera)
+        self.inputs = {"ir_scari": False, "ir_aspirator": False, "senzor_umid": False}
+        self.distances = {"us_front": None, "us_left": None, "us_right": None}
+        # Intrarile schimbate care nu au plecat inca intr-un pachet
+        self.changed_inputs = set()
+
+        self.master = None
+        self.slave = None
+        self.thread = None
+        self.running = False
+        self.lock = threading.Lock()
+
+        # Erorile cerute din alt fir, aplicate de firul simulatorului
+        self.pending_corrupt = 0
+        self.pending_burst = 0
+        self.stall_until = 0.0
+        self.pending_disconnect = None
+        self.reconnect_at = None
+
+        # Statistici
+        self.packets_sent = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.commands = Counter()
+        self.corrupted = 0
+        self.bursts = 0
+        self.stalls = 0
+        self.disconnects = 0
+        self.overflow = 0
+        self.goal_reports = Counter()
+
+        self.reset()
+
+    # Starea de dupa pornirea placii (si dupa o deconectare cu repornire)
+    def reset(self):
+        self.boot_time = time.perf_counter()
+        self.version = 1
+        self.baudrate = pico_codec.BAUD_RATES[0]
+        self.rate = self.initial_rate
+        self.seq = 0
+        self.left = SimMotor()
+        self.right = SimMotor()
+        # Iesirile comandate cu 0x7A 0xF3, ca in firmware: octetul 2 -> ASPIRATOR_TOGGLE,
+        # octetul 3 -> PERIE_TOGGLE
+        self.aspirator = False
+        self.perie = False
+        self.goal_active = False
+        self.goal_id = 0
+        self.goal_max_speed = 120 / 255
+        self.goal_dead_band = 10
+        self.x, self.y = self.room[0] / 2, self.room[1] / 2
+        self.heading = math.pi / 2
+        self.input_buffer = bytearray()
+        self.outgoing = bytearray()
+        self.held = bytearray()
+
+    # Creeaza PTY-ul si legatura simbolica path (inlocuita atomic, daca exista)
+    def open(self):
+        self.master, self.slave = pty.openpty()
+        # Fara ecou si fara prelucrarea liniilor pana cand backend-ul deschide portul
+        tty.setraw(self.slave)
+        os.set_blocking(self.master, False)
+        link = self.path + ".tmp"
+        if os.path.lexists(link):
+            os.remove(link)
+        os.symlink(os.ttyname(self.slave), link)
+        os.replace(link, self.path)
+
+    # Inchide PTY-ul: backend-ul primeste o eroare la urmatoarea citire / scriere
+    def close(self):
+        if os.path.lexists(self.path):
+            os.remove(self.path)
+        for fd in (self.master, self.slave):
+            if fd is not None:
+                os.close(fd)
+        self.master = self.slave = None
+
+    def start(self):
+        self.open()
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name="pico-sim", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+        self.close()
+
+    # Erorile la cerere (apelate din orice fir)
+
+    # Urmatoarele count pachete de telemetrie sunt corupte
+    def corrupt(self, count=1):
+        with self.lock:
+            self.pending_corrupt += count
+
+    # Trimite count pachete de telemetrie intr-o singura scriere
+    def burst(self, count):
+        with self.lock:
+            self.pending_burst += count
+
+    # Telemetria este retinuta seconds secunde, apoi eliberata dintr-o data
+    def stall(self, seconds):
+        self.stall_until = time.perf_counter() + seconds
+
+    # Deconecteaza portul seconds secunde; cu reset=True placa porneste din nou (v1, encoder 0)
+    def disconnect(self, seconds, reset=True):
+        self.pending_disconnect = (seconds, reset)
+
+    def set_input(self, name, value):
+        self.inputs[name] = bool(value)
+        self.changed_inputs.add(name)
+
+    # Forteaza distanta unui senzor ultrasonic (None = calculata din camera)
+    def set_distance(self, name, value):
+        self.distances[name] = value
+
+    # Firul simulatorului: comenzi, fizica, telemetrie
+    def run(self):
+        last = time.perf_counter()
+        next_packet = last
+        while self.running:
+            now = time.perf_counter()
+
+            if self.pending_disconnect is not None:
+                seconds, reset = self.pending_disconnect
+                self.pending_disconnect = None
+                self.close()
+                self.disconnects += 1
+                self.reconnect_at = now + seconds
+                if reset:
+                    self.reset()
+
+            if self.reconnect_at is not None:
+                if now < self.reconnect_at:
+                    time.sleep(min(0.01, self.reconnect_at - now))
+                    continue
+                self.reconnect_at = None
+                self.open()
+                last = next_packet = now
+
+            self.step(now - last)
+            last = now
+
+            # Dupa un blocaj, datele retinute pleaca dintr-o data (inaintea celor noi)
+            if self.held and now >= self.stall_until:
+                self.outgoing += self.held
+                self.held.clear()
+
+            # Telemetria care trebuia trimisa pana acum (mai multe pachete la frecvente mari)
+            period = 1 / self.rate
+            if now >= next_packet:
+                if now - next_packet > MAX_CATCHUP:
+                    next_packet = now
+                due = int((now - next_packet) / period) + 1
+                next_packet += due * period
+                self.send_telemetry(due, now)
+
+            with self.lock:
+                burst, self.pending_burst = self.pending_burst, 0
+            if burst:
+                self.bursts += 1
+                self.send_telemetry(burst, now)
+
+            self.write_pending()
+
+            timeout = max(0.0, min(next_packet - time.perf_counter(), MAX_STEP))
+            writers = [self.master] if self.outgoing else []
+            readable, _, _ = select.select([self.master], writers, [], timeout)
+            if readable:
+                self.read_commands()
+
+    # Scrie cat accepta PTY-ul din datele netrimise (restul ramane pentru pasul urmator)
+    def write_pending(self):
+        if not self.outgoing:
+            return
+        try:
+            written = os.write(self.master, self.outgoing)
+        except (BlockingIOError, OSError):
+            return
+        del self.outgoing[:written]
+        self.bytes_sent += written
+
+    def read_commands(self):
+        try:
+            data = os.read(self.master, 4096)
+        except (BlockingIOError, OSError):
+            return
+        self.bytes_received += len(data)
+        self.input_buffer += data
+
+        # Ca firmware-ul: cate 6 octeti, fara resincronizare
+        while len(self.input_buffer) >= 6:
+            command = bytes(self.input_buffer[:6])
+            del self.input_buffer[:6]
+            self.handle_command(command)
+
+    def handle_command(self, command):
+        received = time.time()
+        if command[0] == 0xF0 and command[1] == 0x0F:
+            name = "motors"
+            self.cancel_goal()
+            self.left.speed, self.right.speed = command[2] / 255, command[3] / 255
+            self.left.direction, self.right.direction = bool(command[4]), bool(command[5])
+        elif command[0] == 0x7A and command[1] == 0xF3:
+            name = "states"
+            self.aspirator, self.perie = bool(command[2]), bool(command[3])
+        elif tuple(command[0:2]) == pico_codec.HELLO_HEADER:
+            name = "hello"
+            self.handle_hello(*command[2:5])
+        elif command[0] == pico_codec.GOAL_HEADER and self.version >= 3:
+            name = "goal"
+            _, goal_id, left, right = pico_codec.GOAL.unpack(command)
+            self.handle_goal(goal_id, left, right)
+        elif tuple(command[0:2]) == pico_codec.GOAL_CONFIG_HEADER:
+            name = "goal_config"
+            self.goal_max_speed = command[2] / 255
+            self.goal_dead_band = command[3]
+        else:
+            name = "unknown"
+
+        self.commands[name] += 1
+        if self.on_command is not None:
+            self.on_command(name, command, received)
+
+    def handle_hello(self, version, baud_code, period):
+        if self.protocol_max < 2:
+            # Firmware-ul vechi nu cunoaste comanda
+            return
+        if version < 1 or baud_code >= len(pico_codec.BAUD_RATES) or period == 0:
+            return
+        version = min(version, self.protocol_max)
+        period = max(period, MIN_PERIOD)
+
+        ack = bytes([pico_codec.HEADER_ACK]) + pico_codec.ACK.pack(version, baud_code, period)
+        self.outgoing += ack + pico_codec.CRC.pack(crc_hqx(ack, 0xFFFF))
+
+        self.version = version
+        self.baudrate = pico_codec.BAUD_RATES[baud_code]
+        if not self.fixed_rate:
+            self.rate = 1000 / period
+        self.seq = 0
+
+    def handle_goal(self, goal_id, left, right):
+        if self.goal_active:
+            self.send_goal_report(pico_codec.GOAL_CANCELLED)
+        self.goal_id = goal_id
+        self.left.start_goal(left)
+        self.right.start_goal(right)
+        self.goal_active = True
+
+    def cancel_goal(self):
+        if not self.goal_active:
+            return
+        self.left.goal_active = self.right.goal_active = False
+        self.goal_active = False
+        self.send_goal_report(pico_codec.GOAL_CANCELLED)
+
+    def send_goal_report(self, status):
+        report = bytes([pico_codec.HEADER_GOAL]) + pico_codec.GOAL_REPORT.pack(self.goal_id, status)
+        self.outgoing += report + pico_codec.CRC.pack(crc_hqx(report, 0xFFFF))
+        self.goal_reports[status] += 1
+
+    # Avanseaza simularea cu dt secunde: tinta de pozitie, encoder-ele si pozitia robotului
+    def step(self, dt):
+        if self.goal_active:
+            left_done = self.left.run_goal(self.goal_max_speed, self.goal_dead_band)
+            right_done = self.right.run_goal(self.goal_max_speed, self.goal_dead_band)
+            if left_done and right_done:
+                self.goal_active = False
+                self.send_goal_report(pico_codec.GOAL_REACHED)
+
+        if dt <= 0:
+            return
+        # Motorul "stang" din firmware este motorul A al backend-ului
+        left = self.left.advance(dt)
+        right = self.right.advance(dt)
+        self.heading += (right - left) / WHEEL_BASE
+        distance = (left + right) / 2
+        width, height = self.room
+        self.x = min(width, max(0.0, self.x + distance * math.cos(self.heading)))
+        self.y = min(height, max(0.0, self.y + distance * math.sin(self.heading)))
+
+    # Distanta pana la peretele camerei pe directia angle
+    def wall_distance(self, angle):
+        dx, dy = math.cos(angle), math.sin(angle)
+        width, height = self.room
+        distance = math.inf
+        if dx > 1e-9:
+            distance = min(distance, (width - self.x) / dx)
+        elif dx < -1e-9:
+            distance = min(distance, -self.x / dx)
+        if dy > 1e-9:
+            distance = min(distance, (height - self.y) / dy)
+        elif dy < -1e-9:
+            distance = min(distance, -self.y / dy)
+        return distance
+
+    def measure(self, name, angle):
+        distance = self.distances[name]
+        if distance is None:
+            distance = self.wall_distance(self.heading + angle)
+        if self.noise:
+            distance += self.random.gauss(0.0, self.noise)
+        if distance > MAX_ECHO:
+            return 0.0
+        return max(0.0, distance)
+
+    # Valorile pachetului, in ordinea din firmware
+    def telemetry_values(self):
+        return (self.measure("us_front", 0.0), self.measure("us_left", math.pi / 2),
+                self.measure("us_right", -math.pi / 2),
+                self.inputs["ir_scari"], self.inputs["ir_aspirator"], self.inputs["senzor_umid"],
+                int(self.left.position), int(self.right.position))
+
+    def send_telemetry(self, count, now):
+        if len(self.outgoing) + len(self.held) > MAX_BACKLOG:
+            self.overflow += count
+            return
+
+        # Intrarile schimbate pana acum (luate inaintea valorilor, ca sa fie sigur in pachet)
+        changed, self.changed_inputs = self.changed_inputs, set()
+        values = self.telemetry_values()
+        packets = bytearray()
+        for _ in range(count):
+            if self.version >= 2:
+                micros = (int((now - self.boot_time) * 1e6) + self.micros_offset) & 0xFFFFFFFF
+                packet = bytes([pico_codec.HEADER_V2]) + pico_codec.TELEMETRY_V2.pack(self.seq, micros, *values)
+                packet += pico_codec.CRC.pack(crc_hqx(packet, 0xFFFF))
+                self.seq = (self.seq + 1) & 0xFFFF
+            else:
+                packet = bytes([pico_codec.HEADER_V1]) + pico_codec.TELEMETRY_V1.pack(*values)
+            packets += self.maybe_corrupt(packet)
+        self.packets_sent += count
+
+        if now < self.stall_until:
+            if not self.held:
+                self.stalls += 1
+            self.held += packets
+            # Intrarile vor fi raportate la primul pachet trimis
+            self.changed_inputs |= changed
+            return
+        self.outgoing += packets
+
+        # Momentul in care o intrare schimbata pleaca spre backend (ex. latenta pana la reactie)
+        if self.on_input_sent is not None:
+            sent = time.time()
+            for name in changed:
+                self.on_input_sent(name, values[INPUT_INDEX[name]], sent)
+
+    # Strica pachetul daca a fost cerut (corrupt) sau la intamplare (corrupt_rate)
+    def maybe_corrupt(self, packet):
+        with self.lock:
+            forced = self.pending_corrupt > 0
+            if forced:
+                self.pending_corrupt -= 1
+        if not forced and not (self.corrupt_rate and self.random.random() < self.corrupt_rate):
+            return packet
+
+        self.corrupted += 1
+        packet = bytearray(packet)
+        kind = self.random.randrange(3)
+        if kind == 0:
+            # Un octet modificat (eroare pe linie)
+            packet[self.random.randrange(len(packet))] ^= self.random.randrange(1, 256)
+        elif kind == 1:
+            # Pachet trunchiat (octeti pierduti)
+            del packet[self.random.randrange(1, len(packet)):]
+        else:
+            # Octeti in plus intre pachete
+            packet += bytes(self.random.randrange(256) for _ in range(self.random.randrange(1, 8)))
+        return bytes(packet)
+
+    def stats(self):
+        return {
+            "version": self.version,
+            "rate": round(self.rate, 1),
+            "connected": self.master is not None,
+            "packets_sent": self.packets_sent,
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+            "commands": dict(self.commands),
+            "corrupted": self.corrupted,
+            "bursts": self.bursts,
+            "stalls": self.stalls,
+            "disconnects": self.disconnects,
+            "overflow": self.overflow,
+            "goals_reached": self.goal_reports[pico_codec.GOAL_REACHED],
+            "goals_cancelled": self.goal_reports[pico_codec.GOAL_CANCELLED],
+            "motors": [int(self.left.position), int(self.right.position)],
+            "pose": [round(self.x, 1), round(self.y, 1), round(math.degrees(self.heading) % 360, 1)],
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pico simulat pe un PTY")
+    parser.add_argument("--port", default=DEFAULT_PATH, help="calea portului simulat (legatura simbolica)")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="pachete de telemetrie pe secunda")
+    parser.add_argument("--fixed-rate", action="store_true", help="ignora perioada ceruta prin HELLO")
+    parser.add_argument("--protocol", type=int, default=PROTOCOL_MAX_VERSION,
+                        help="versiunea maxima acceptata la HELLO (1 = firmware vechi)")
+    parser.add_argument("--room", type=float, nargs=2, default=ROOM, metavar=("LATIME", "LUNGIME"),
+                        help="dimensiunile camerei (cm)")
+    parser.add_argument("--noise", type=float, default=0.0, help="zgomotul distantelor (cm)")
+    parser.add_argument("--micros-offset", type=int, default=0,
+                        help="valoarea initiala a micros() (ex. aproape de depasire)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--corrupt-rate", type=float, default=0.0, help="probabilitatea unui pachet corupt")
+    parser.add_argument("--burst-every", type=float, default=0, help="secunde intre rafale")
+    parser.add_argument("--burst-size", type=int, default=100, help="pachete pe rafala")
+    parser.add_argument("--stall-every", type=float, default=0, help="secunde intre blocaje")
+    parser.add_argument("--stall-for", type=float, default=0.5, help="durata unui blocaj (secunde)")
+    parser.add_argument("--disconnect-every", type=float, default=0, help="secunde intre deconectari")
+    parser.add_argument("--disconnect-for", type=float, default=2.0, help="durata unei deconectari (secunde)")
+    parser.add_argument("--no-reset", action="store_true", help="placa nu reporneste la deconectare")
+    parser.add_argument("--report", type=float, default=0, help="secunde intre statistici (JSON)")
+    parser.add_argument("--duration", type=float, default=0, help="durata simularii (0 = pana la Ctrl+C)")
+    args = parser.parse_args()
+
+    pico = SimulatedPico(args.port, args.rate, args.protocol, args.fixed_rate, tuple(args.room),
+                         args.noise, args.corrupt_rate, args.micros_offset, args.seed)
+    pico.start()
+    print(f"Pico simulat pe {args.port} ({os.ttyname(pico.slave)}); "
+          f"porneste backend-ul cu ROBOT_PICO_PORT={args.port}")
+
+    # Evenimentele periodice: (interval, actiune, urmatorul moment)
+    start = time.time()
+    events = []
+    if args.burst_every:
+        events.append([args.burst_every, lambda: pico.burst(args.burst_size)])
+    if args.stall_every:
+        events.append([args.stall_every, lambda: pico.stall(args.stall_for)])
+    if args.disconnect_every:
+        events.append([args.disconnect_every, lambda: pico.disconnect(args.disconnect_for, not args.no_reset)])
+    if args.report:
+        events.append([args.report, lambda: print(json.dumps(pico.stats()))])
+    for event in events:
+        event.append(start + event[0])
+
+    try:
+        while not args.duration or time.time() - start < args.duration:
+            now = time.time()
+            for event in events:
+                if now >= event[2]:
+                    event[1]()
+                    event[2] += event[0]
+            time.sleep(0.01)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pico.stop()
+        print(json.dumps(pico.stats()))
+
+
+if __name__ == "__main__":
+    main()
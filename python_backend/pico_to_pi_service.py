@@ -1,11 +1,26 @@
-# Importam modulul pico din shared pentru comunicatia cu microcontrollerul
-from shared import pico
-# Importam struct pentru decodarea datelor binare
-import struct
+# Importam modulul shared pentru comunicatia cu microcontrollerul
+# (shared.pico este citit la fiecare apel, ca sa poata fi inlocuit la replay)
+import shared
+# inregistrarea sesiunii pentru replay
+import session_recorder
+# Decodarea pachetelor de telemetrie
+import pico_codec
+import os
 import time
+import threading
+# tuplul imutabil pentru ultimul pachet primit, fereastra pentru alinierea ceasurilor
+from collections import namedtuple, deque
+# erorile portului serial
+import serial
+# conexiunea cu Pico-ul (portul curent si reconectarea)
+import pico_link
+# jurnalul (niveluri pe module)
+import logging
+
+log = logging.getLogger(__name__)
 
 # us_front = senzorul ultrasonic din fata
-# us_left = senzorul ultrasonic din stanga  
+# us_left = senzorul ultrasonic din stanga
 # us_right = senzorul ultrasonic din dreapta
 us_front, us_left, us_right = 0, 0, 0
 
@@ -18,64 +33,238 @@ ir_scari, ir_aspirator, senzor_umid = False, False, False
 # motor_b_pos = pozitia motorului B
 motor_a_pos, motor_b_pos = 0, 0
 
+# receive_time = momentul (time.time()) in care a sosit pachetul ale carui valori sunt folosite
+receive_time = 0
+
 # Var pentru a memora timpul ultimei primiri de date
 last_recv_run = 0
 
-# Functia principala pentru primirea datelor de la microcontroller
+# Versiunea protocolului ceruta la pornire (1 = fara HELLO, ca firmware-ul vechi),
+# viteza portului si frecventa telemetriei pentru v2
+# (20 Hz ca firmware-ul vechi; firmware-ul nu accepta o perioada mai mica de 50 ms)
+protocol = int(os.environ.get("ROBOT_PICO_PROTOCOL", "3"))
+DEFAULT_BAUD = 460800
+baudrate = os.environ.get("ROBOT_PICO_BAUD", str(DEFAULT_BAUD))
+telemetry_rate = float(os.environ.get("ROBOT_PICO_RATE", "20"))
+
+# HELLO poate cere doar una din vitezele cunoscute de firmware; altfel negocierea ar esua
+if not baudrate.isdigit() or int(baudrate) not in pico_codec.BAUD_RATES:
+    log.warning("ROBOT_PICO_BAUD=%s is not one of %s, using %d", baudrate, pico_codec.BAUD_RATES, DEFAULT_BAUD)
+    baudrate = DEFAULT_BAUD
+baudrate = int(baudrate)
+
+# Cat asteptam ACK-ul la HELLO (secunde)
+HELLO_TIMEOUT = 0.5
+
+# Versiunea negociata (1 pana la primirea unui ACK)
+protocol_version = 1
+
+# Daca Pico-ul executa singur tintele de pozitie (protocolul v3)
+goals_supported = False
+
+# Ultimul raport de tinta de la Pico: (id, stare) sau None
+goal_report = None
+
+# Ultimul pachet decodificat, cu momentul primirii si numarul lui de ordine;
+# este inlocuit in intregime (atribuirea unei referinte), deci se citeste fara lock
+# pico_time = micros() de pe Pico in secunde (fara depasirea la 32 de biti), None pentru v1
+Telemetry = namedtuple("Telemetry", "us_front us_left us_right ir_scari ir_aspirator senzor_umid "
+                                    "motor_a_pos motor_b_pos receive_time seq pico_time")
+latest = Telemetry(0, 0, 0, False, False, False, 0, 0, 0, 0, None)
+
+# pico_time = momentul masurarii pe ceasul Pico-ului pentru valorile folosite (None pentru v1)
+pico_time = None
+
+# Alinierea ceasurilor: receive_time - pico_time pentru ultimele pachete; minimul este
+# cel mai apropiat de decalajul real (pachetul cu cea mai mica intarziere pe legatura)
+CLOCK_WINDOW = 200
+clock_samples = deque(maxlen=CLOCK_WINDOW)
+clock_offset = None
+
+# Ultima valoare micros() si depasirile numaratorului de 32 de biti
+last_micros = None
+micros_wraps = 0
+
+# Numarul de ordine al ultimului pachet aplicat de receive()
+applied_seq = 0
+
+# Pachete inlocuite de unele mai noi inainte sa fie folosite de bucla de control
+dropped = 0
+
+# Decodorul pachetelor (pachetele / octetii invalizi sunt numarati in decoder.stats())
+decoder = pico_codec.Decoder()
+
+# Converteste micros() de pe Pico in secunde, numarand depasirile (la ~71 de minute)
+def unwrap_micros(micros):
+    global last_micros, micros_wraps
+    if last_micros is not None and micros < last_micros:
+        micros_wraps += 1
+    last_micros = micros
+    return (micros_wraps * (1 << 32) + micros) / 1e6
+
+# Actualizeaza alinierea ceasurilor cu un pachet v2; returneaza momentul masurarii pe Pico
+def update_clock(micros, receive_time):
+    global clock_offset
+    measured = unwrap_micros(micros)
+    clock_samples.append(receive_time - measured)
+    clock_offset = min(clock_samples)
+    return measured
+
+# Construieste un Telemetry din valorile decodificate de pico_codec
+def to_telemetry(values, receive_time, seq):
+    pico_seq, micros, front, left, right, scari, aspirator, umid, pos_a, pos_b = values
+    measured = update_clock(micros, receive_time) if micros is not None else None
+
+    # Inmultim pozitiile cu -1 pentru inversarea directiei
+    return Telemetry(front, left, right, scari, aspirator, umid, -pos_a, -pos_b, receive_time, seq, measured)
+
+# Momentul (time.time()) corespunzator unui moment de pe ceasul Pico-ului
+# (ex. pentru alinierea pozitiilor encoder-elor cu frame-urile camerei)
+def host_time(pico_seconds):
+    if pico_seconds is None or clock_offset is None:
+        return None
+    return pico_seconds + clock_offset
+
+# Primeste octetii cititi de pe portul serial (de firul de citire sau de runtime-ul asyncio)
+# si decodifica toate pachetele complete; returneaza numarul de pachete decodificate
+def feed(data):
+    global latest, goal_report
+    session_recorder.record_pico(data)
+
+    decoder.goal = None
+    decoded = decoder.feed(data)
+    # Doar rapoartele noi (motor_service sterge raportul vechi la fiecare tinta noua)
+    if decoder.goal is not None:
+        goal_report = decoder.goal
+    if decoded:
+        now = time.time()
+        # Pachetele v2 intermediare intra doar in alinierea ceasurilor
+        for values in decoded[:-1]:
+            if values[1] is not None:
+                update_clock(values[1], now)
+        # Doar ultimul pachet devine vizibil; cele dinainte apar ca pierdute in receive()
+        latest = to_telemetry(decoded[-1], now, decoder.packets)
+
+    return len(decoded)
+
+# Firul de citire: goleste portul continuu, ca datele sa nu se adune in buffer-ul driverului
+def reader_loop():
+    while True:
+        pico = shared.pico
+        if pico is None:
+            # Legatura este cazuta: pico_link o reface in fundal
+            pico_link.connected.wait(0.5)
+            continue
+        try:
+            # Blocheaza firul (cel mult timeout-ul portului) pana la primul octet, apoi ia tot ce a sosit
+            data = pico.read(max(1, pico.in_waiting))
+        except (serial.SerialException, OSError) as e:
+            pico_link.lost(pico, e)
+            continue
+
+        if data:
+            feed(data)
+
+# Functia principala pentru primirea datelor de la microcontroller:
+# copiaza ultimul pachet decodificat in variabilele globale (fara acces la port)
 def receive(log_shit=False):
     # Declaram ca folosim variabilele globale
-    global last_recv_run
-    
+    global last_recv_run, applied_seq, dropped, receive_time, pico_time
+
     # Obtinem timpul curent
     curr_time = time.time()
-    
+
     # Daca este activat logging-ul, verificam daca a trecut prea mult timp
     if log_shit:
         # Daca au trecut mai mult de 10ms de la ultima primire, afisam avertisment
         if(curr_time - last_recv_run > 0.01):
-            print(f"[WARNING] Last pico_to_pi_service recv took {int((curr_time - last_recv_run) * 1000)}")
-    
+            log.warning("last pico_to_pi_service recv took %d ms", int((curr_time - last_recv_run) * 1000))
+
     # Actualizam timpul ultimei primiri
     last_recv_run = curr_time
-    
+
+    # Luam ultimul pachet (o singura citire a referintei)
+    snapshot = latest
+    if snapshot.seq == applied_seq:
+        return
+
+    # Pachetele dintre ultimul aplicat si cel curent nu au fost vazute de bucla de control
+    if applied_seq:
+        dropped += snapshot.seq - applied_seq - 1
+    applied_seq = snapshot.seq
+
     # Declaram ca folosim toate variabilele globale pentru senzori si motoare
     global us_front, us_left, us_right, ir_scari, ir_aspirator, senzor_umid, motor_a_pos, motor_b_pos
-    
-    # Verificam daca avem cel putin 24 de bytes disponibili pentru citire
-    # (1 byte header + 23 bytes date)
-    if pico.in_waiting >= 24:
-        # Citim header-ul pachetului (1 byte)
-        packet_header = pico.read(1)
-        
-        # Verificam daca header-ul este 0x54 (pachet valid)
-        if packet_header[0] == 0x54:
-            # Citim restul datelor (23 bytes)
-            byte_buffer = pico.read(23)
-            
-            # Decodificam senzorii ultrasonici (float, little-endian)
-            # Bytes 0-3: senzorul din fata
-            us_front = struct.unpack("<f", byte_buffer[0:4])[0]
-            # Bytes 4-7: senzorul din stanga
-            us_left = struct.unpack("<f", byte_buffer[4:8])[0]
-            # Bytes 8-11: senzorul din dreapta
-            us_right = struct.unpack("<f", byte_buffer[8:12])[0]
-            
-            # Decodificam senzorii digitali (boolean)
-            # Byte 12: senzorul infrarosu pentru scari
-            ir_scari = struct.unpack("<?", byte_buffer[12:13])[0]
-            # Byte 13: senzorul infrarosu pentru aspirator
-            ir_aspirator = struct.unpack("<?", byte_buffer[13:14])[0]
-            # Byte 14: senzorul de umiditate
-            senzor_umid = struct.unpack("<?", byte_buffer[14:15])[0]
-            
-            # Decodificam pozitiile motoarelor (long integer, little-endian)
-            # Bytes 15-18: pozitia motorului A (inmultim cu -1 pentru inversarea directiei)
-            motor_a_pos = struct.unpack("<l", byte_buffer[15:19])[0] * -1
-            # Bytes 19-22: pozitia motorului B (inmultim cu -1 pentru inversarea directiei)
-            motor_b_pos = struct.unpack("<l", byte_buffer[19:23])[0] * -1
-        else:
-            # Daca header-ul nu este recunoscut, afisam eroare
-            print(f"unknown packet id {hex(packet_header[0])}")
-        
-        # Golim buffer-ul pentru a evita acumularea de date vechi
-        pico.flush()
\ No newline at end of file
+    (us_front, us_left, us_right, ir_scari, ir_aspirator, senzor_umid,
+     motor_a_pos, motor_b_pos, receive_time) = snapshot[:9]
+    pico_time = snapshot.pico_time
+
+# Vechimea (secunde) ultimului pachet primit
+def telemetry_age():
+    return time.time() - latest.receive_time
+
+# Trimite HELLO la viteza curenta a portului si asteapta ACK-ul; returneaza ACK-ul sau None
+def send_hello(pico):
+    pico.reset_input_buffer()
+    pico.write(pico_codec.hello(protocol, baudrate, telemetry_rate))
+    pico.flush()
+
+    probe = pico_codec.Decoder()
+    deadline = time.time() + HELLO_TIMEOUT
+    while time.time() < deadline and probe.ack is None:
+        data = pico.read(max(1, pico.in_waiting))
+        if data:
+            probe.feed(data)
+    return probe.ack
+
+# Negocierea protocolului la pornire (inainte de pornirea citirii portului)
+# Un firmware vechi nu raspunde la HELLO: ramanem la v1, la viteza cu care a fost deschis portul
+def negotiate(pico):
+    global protocol_version, goals_supported
+    # Dupa o repornire Pico-ul este din nou la v1
+    protocol_version = 1
+    goals_supported = False
+    if protocol < 2:
+        return
+
+    initial = pico.baudrate
+    ack = None
+    try:
+        # Pico-ul poate fi deja la viteza ceruta (backend repornit fara resetarea placii)
+        for rate in dict.fromkeys([initial, baudrate]):
+            pico.baudrate = rate
+            ack = send_hello(pico)
+            if ack is not None:
+                break
+    except serial.SerialException as e:
+        log.warning("protocol negotiation failed: %s", e)
+
+    if ack is None:
+        pico.baudrate = initial
+        log.info("Pico protocol v1 at %d baud (no HELLO ack)", initial)
+        return
+
+    version, rate, period = ack
+    # Pico-ul trece la noua viteza dupa ce a trimis ACK-ul
+    pico.baudrate = rate
+    protocol_version = version
+    goals_supported = version >= 3
+    log.info("Pico protocol v%d at %d baud, telemetry every %d ms", version, rate, period)
+
+# La fiecare (re)conectare: Pico-ul poate fi repornit, deci ceasul lui o ia de la zero
+# si protocolul trebuie negociat din nou
+def on_link_open(port):
+    global last_micros, micros_wraps, clock_offset
+    clock_samples.clear()
+    clock_offset = None
+    last_micros = None
+    micros_wraps = 0
+    negotiate(port)
+
+# Pornim conectarea in fundal si firul de citire
+# (in runtime-ul asyncio portul este citit de bucla, la replay de replay.py)
+if shared.hardware_enabled:
+    pico_link.on_open.append(on_link_open)
+    if shared.runtime != "asyncio":
+        threading.Thread(target=reader_loop, name="pico-reader", daemon=True).start()
+    pico_link.start()
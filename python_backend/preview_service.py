@@ -0,0 +1,160 @@
+# OpenCV pentru codarea JPEG
+import cv2
+import threading
+import time
+# serverul HTTP al backend-ului
+import http_service
+# masurarea duratelor pe etape
+import metrics_service
+
+# Numarul maxim de imagini codate pe secunda pentru fiecare flux
+preview_fps = 10
+
+# Calitatea JPEG (0-100)
+jpeg_quality = 50
+
+# Delimitatorul dintre imaginile fluxului MJPEG
+BOUNDARY = "frame"
+
+
+# Un flux de previzualizare (ex. imaginea color sau cea binara)
+class PreviewStream():
+    name: str
+    frame: object           # Ultima imagine primita (referinta, fara copiere)
+    frame_id: int           # Id-ul ultimei imagini primite
+    jpeg: bytes             # Ultima imagine codata
+    jpeg_id: int            # Id-ul imaginii din care s-a codat jpeg
+    clients: int            # Numarul de clienti conectati
+
+    def __init__(self, name):
+        self.name = name
+        self.frame = None
+        self.frame_id = 0
+        self.jpeg = None
+        self.jpeg_id = 0
+        self.clients = 0
+        # Conditia trezeste clientii cand apare o imagine codata noua
+        self.cond = threading.Condition()
+
+    # Codeaza ultima imagine daca este noua; apelat doar de firul de lucru
+    def encode(self):
+        frame, frame_id = self.frame, self.frame_id
+        if frame is None or frame_id == self.jpeg_id:
+            return
+
+        t = metrics_service.start()
+        ret, buffer = cv2.imencode(".jpg", frame, [int(cv2.IMWRITE_JPEG_QUALITY), jpeg_quality])
+        metrics_service.stop("preview.jpeg", t)
+        if not ret:
+            return
+
+        with self.cond:
+            self.jpeg = buffer.tobytes()
+            self.jpeg_id = frame_id
+            self.cond.notify_all()
+
+    # Asteapta o imagine codata mai noua decat jpeg_id
+    def wait_jpeg(self, jpeg_id, timeout=1):
+        with self.cond:
+            self.cond.wait_for(lambda: self.jpeg_id != jpeg_id, timeout)
+            return self.jpeg_id, self.jpeg
+
+
+# Fluxurile disponibile pentru dashboard
+streams = {
+    "camera": PreviewStream("camera"),
+    "camerabin": PreviewStream("camerabin"),
+}
+
+# Eveniment folosit pentru a trezi firul de lucru cand se conecteaza un client
+wake_event = threading.Event()
+
+
+# Primeste imaginile din bucla de control; doar pastreaza referintele
+def submit(frame_id, frame, frame_binary):
+    camera, camerabin = streams["camera"], streams["camerabin"]
+    camera.frame, camera.frame_id = frame, frame_id
+    camerabin.frame, camerabin.frame_id = frame_binary, frame_id
+
+
+# Exista cel putin un client pentru fluxul dat
+def is_watched(name):
+    return streams[name].clients > 0
+
+
+# Firul de lucru: codeaza fiecare imagine o singura data, indiferent cati clienti sunt
+def worker_loop():
+    while True:
+        if not any(stream.clients > 0 for stream in streams.values()):
+            # Nimeni nu se uita - asteptam un client fara sa codam nimic
+            wake_event.wait()
+            wake_event.clear()
+
+        next_run = time.time() + 1 / preview_fps
+
+        for stream in streams.values():
+            if stream.clients > 0:
+                stream.encode()
+
+        time.sleep(max(0, next_run - time.time()))
+
+
+# Raspunde cu un flux multipart MJPEG pana cand clientul se deconecteaza
+def serve_mjpeg(stream, request):
+    request.send_response(200)
+    request.send_header("Content-Type", f"multipart/x-mixed-replace; boundary={BOUNDARY}")
+    request.send_header("Cache-Control", "no-cache")
+    request.end_headers()
+
+    with stream.cond:
+        stream.clients += 1
+    wake_event.set()
+
+    try:
+        jpeg_id = 0
+        while True:
+            new_id, jpeg = stream.wait_jpeg(jpeg_id)
+            if new_id == jpeg_id:
+                continue
+            jpeg_id = new_id
+
+            request.wfile.write(f"--{BOUNDARY}\r\nContent-Type: image/jpeg\r\nContent-Length: {len(jpeg)}\r\n\r\n".encode())
+            request.wfile.write(jpeg)
+            request.wfile.write(b"\r\n")
+    finally:
+        with stream.cond:
+            stream.clients -= 1
+
+
+# Raspunde cu o singura imagine JPEG (compatibil cu vechile /tmp/camera.jpg)
+def serve_snapshot(stream, request):
+    with stream.cond:
+        stream.clients += 1
+    wake_event.set()
+
+    try:
+        # Asteptam o imagine codata proaspat; la expirare o folosim pe ultima
+        jpeg_id, jpeg = stream.wait_jpeg(stream.jpeg_id)
+    finally:
+        with stream.cond:
+            stream.clients -= 1
+
+    if jpeg is None:
+        request.send_error(503)
+        return
+
+    request.send_response(200)
+    request.send_header("Content-Type", "image/jpeg")
+    request.send_header("Content-Length", str(len(jpeg)))
+    request.send_header("Cache-Control", "no-cache")
+    request.end_headers()
+    request.wfile.write(jpeg)
+
+
+# Inregistram rutele pentru fiecare flux: /camera.mjpg, /camera.jpg etc.
+for stream_name, preview_stream in streams.items():
+    http_service.add_route(f"/{stream_name}.mjpg", lambda request, s=preview_stream: serve_mjpeg(s, request))
+    http_service.add_route(f"/{stream_name}.jpg", lambda request, s=preview_stream: serve_snapshot(s, request))
+
+# Pornim firul de codare
+threading.Thread(target=worker_loop, name="preview-encoder", daemon=True).start()
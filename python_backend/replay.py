@@ -0,0 +1,280 @@
+# Reda o sesiune inregistrata cu session_recorder prin codul real al backend-ului
+# (pico_to_pi_service, mqtt_service, mode_service si masinile de stari), fara hardware.
+#
+# Utilizare:
+#   python replay.py sesiune.rec                 - cat de repede se poate (ceas virtual)
+#   python replay.py sesiune.rec --realtime      - in timp real
+#   python replay.py sesiune.rec --output r.json - raportul se scrie intr-un fisier
+#
+# Raportul contine timpii pe etape si secventa de tranzitii changeState,
+# ca doua rulari (ex. inainte / dupa o modificare) sa poata fi comparate.
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import contextlib
+
+# Modulele backend-ului nu trebuie sa deschida hardware-ul la import
+os.environ["ROBOT_NO_HARDWARE"] = "1"
+os.environ["ROBOT_VISION_PIPELINE"] = "0"
+os.environ.pop("ROBOT_RECORD", None)
+
+# operatii pe array-uri
+import numpy as np
+# OpenCV pentru decodarea frame-urilor
+import cv2
+import session_recorder
+
+
+# Ceas virtual: time() si sleep() folosesc timpul sesiunii, restul functiilor sunt cele reale.
+# Inlocuieste modulul time doar in modulele backend-ului (atributul lor "time"), nu pentru
+# tot procesul, asa ca firele care nu tin de bucla (jurnalul, preview-ul) raman pe ceasul real
+class VirtualClock():
+    def __init__(self):
+        self.now = 0.0
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        # Un sleep in starile masinii avanseaza doar ceasul virtual
+        self.now += max(0.0, seconds)
+
+    def __getattr__(self, name):
+        return getattr(time, name)
+
+
+# Modulele backend-ului care ruleaza pe fire proprii raman pe ceasul real
+# (firul preview-encoder, serverul HTTP, firul de scriere al jurnalului)
+REAL_CLOCK_MODULES = {"preview_service", "http_service", "log_service"}
+
+
+# Modulele backend-ului incarcate (din directorul acestui fisier) care folosesc modulul time
+def backend_modules():
+    directory = os.path.dirname(os.path.abspath(__file__))
+    # Modulul acesta poate aparea sub mai multe nume (ex. __mp_main__, adaugat de multiprocessing)
+    this = sys.modules[__name__]
+    for name, module in list(sys.modules.items()):
+        path = getattr(module, "__file__", None)
+        if (path and os.path.dirname(os.path.abspath(path)) == directory and module is not this
+                and name not in REAL_CLOCK_MODULES and getattr(module, "time", None) is time):
+            yield module
+
+
+# Portul serial simulat: retine comenzile trimise
+# (octetii inregistrati sunt dati direct lui pico_to_pi_service.feed, in locul firului de citire)
+class ReplayPico():
+    def __init__(self):
+        self.written = []
+
+    def write(self, data):
+        self.written.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+
+# Clientul MQTT simulat: retine mesajele publicate
+class ReplayMqttClient():
+    def __init__(self):
+        self.published = []
+
+    def publish(self, topic, payload=None, *args, **kwargs):
+        self.published.append((topic, payload))
+
+    def subscribe(self, *args, **kwargs):
+        pass
+
+    def loop_stop(self):
+        pass
+
+    def disconnect(self):
+        pass
+
+
+# Mesaj MQTT cu aceleasi atribute ca cel din paho
+class ReplayMessage():
+    def __init__(self, topic, payload):
+        self.topic = topic
+        self.payload = payload
+        self.qos = 0
+
+
+# Statistici pentru o etapa: numarul de apeluri si duratele (ms)
+class StageTimer():
+    def __init__(self):
+        self.samples = []
+
+    def add(self, seconds):
+        self.samples.append(seconds * 1000)
+
+    def summary(self):
+        if not self.samples:
+            return {"count": 0}
+        samples = np.array(self.samples)
+        return {
+            "count": len(samples),
+            "total_ms": round(float(samples.sum()), 3),
+            "mean_ms": round(float(samples.mean()), 4),
+            "p50_ms": round(float(np.percentile(samples, 50)), 4),
+            "p95_ms": round(float(np.percentile(samples, 95)), 4),
+            "p99_ms": round(float(np.percentile(samples, 99)), 4),
+            "max_ms": round(float(samples.max()), 4),
+        }
+
+
+# Importa backend-ul si inlocuieste hardware-ul (portul serial si clientul MQTT)
+def load_backend():
+    # Rezultate deterministe pentru id-urile notificarilor
+    random.seed(0)
+
+    # Urma masinilor de stari pastreaza toate tranzitiile redate (nu doar ultimele TRACE_SIZE);
+    # se seteaza inainte de importul modurilor, care isi creeaza masinile la import
+    import state_machine
+    state_machine.TRACE_SIZE = None
+
+    import shared
+    shared.pico = ReplayPico()
+    import mqtt_service
+    mqtt_service.client = ReplayMqttClient()
+    import camera_service
+    import pico_to_pi_service
+    import mode_service
+    import scheduler
+
+
+def replay(session_path, realtime=False):
+    records = list(session_recorder.read_session(session_path))
+    if not records:
+        raise ValueError(f"{session_path} nu contine inregistrari")
+
+    load_backend()
+    if realtime:
+        return run(session_path, records, None)
+
+    # In modul rapid backend-ul vede timpul sesiunii, nu timpul real; ceasul real este
+    # pus la loc la final, chiar daca redarea esueaza
+    clock = VirtualClock()
+    clock.now = records[0][1]
+    modules = list(backend_modules())
+    for module in modules:
+        module.time = clock
+    try:
+        # Starea modurilor autonome creata la import (masinile de stari, temporizatoarele)
+        # porneste din nou, pe ceasul sesiunii
+        import mode_aspirator_autonom
+        import mode_smart_perie_autonom
+        mode_aspirator_autonom.state = mode_aspirator_autonom.RobotState()
+        mode_smart_perie_autonom.state = mode_smart_perie_autonom.RobotState()
+        return run(session_path, records, clock)
+    finally:
+        for module in modules:
+            module.time = time
+
+
+# Trece inregistrarile prin backend; clock este ceasul virtual (None = timp real)
+def run(session_path, records, clock):
+    realtime = clock is None
+    start_time = records[0][1]
+    # Momentele tranzitiilor sunt relative la inceputul sesiunii (in timp real: al redarii)
+    time_base = start_time if clock is not None else time.time()
+
+    import state_machine
+    import shared
+    import mqtt_service
+    import camera_service
+    import pico_to_pi_service
+    import mode_service
+    import scheduler
+
+    # Masinile de stari care au rulat (modul perie isi reface masina la fiecare pornire,
+    # asa ca registrul state_machine.machines o pastreaza doar pe ultima)
+    machines = []
+
+    # Sarcinile buclei de control, pe ceasul sesiunii
+    loop = scheduler.Scheduler(clock=time.time if realtime else clock.time)
+    mode_service.register_tasks(loop)
+
+    stages = {name: StageTimer() for name in ("mqtt_on_message", "frame_decode", "run_pending")}
+    counts = {"frames": 0, "pico": 0, "mqtt": 0}
+    wall_start = time.perf_counter()
+    real_start = None
+
+    for kind, timestamp, data in records:
+        if realtime:
+            # Asteptam momentul inregistrarii, relativ la inceputul sesiunii
+            if real_start is None:
+                real_start = time.monotonic()
+            delay = (timestamp - start_time) - (time.monotonic() - real_start)
+            if delay > 0:
+                time.sleep(delay)
+        else:
+            clock.now = max(clock.now, timestamp)
+
+        if kind == session_recorder.PICO:
+            counts["pico"] += 1
+            pico_to_pi_service.feed(data)
+        elif kind == session_recorder.MQTT:
+            counts["mqtt"] += 1
+            topic, payload = data
+            t0 = time.perf_counter()
+            mqtt_service.mqtt_on_message(mqtt_service.client, None, ReplayMessage(topic, payload))
+            stages["mqtt_on_message"].add(time.perf_counter() - t0)
+        elif kind == session_recorder.FRAME:
+            counts["frames"] += 1
+            frame_id, jpeg = data
+            t0 = time.perf_counter()
+            frame = cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)
+            stages["frame_decode"].add(time.perf_counter() - t0)
+            camera_service.camera.publish(frame, timestamp)
+
+        # Sarcinile scadente ale buclei de control dupa fiecare eveniment
+        t0 = time.perf_counter()
+        loop.run_pending()
+        stages["run_pending"].add(time.perf_counter() - t0)
+
+        for machine in list(state_machine.machines.values()):
+            if not any(machine is seen for seen in machines):
+                machines.append(machine)
+
+    # Tranzitiile tuturor masinilor, din urmele lor, in ordinea in care au avut loc
+    transitions = sorted(
+        ({"t": round(moment - time_base, 4), "mode": machine.name, "from": str(old), "to": str(new)}
+         for machine in machines for moment, old, new, spent in machine.trace),
+        key=lambda transition: transition["t"])
+
+    return {
+        "session": os.path.abspath(session_path),
+        "realtime": realtime,
+        "duration_s": round(records[-1][1] - start_time, 3),
+        "wall_time_s": round(time.perf_counter() - wall_start, 3),
+        "records": counts,
+        "stages": {name: timer.summary() for name, timer in stages.items()},
+        "tasks": loop.stats(),
+        "transitions": transitions,
+        "serial_writes": len(shared.pico.written),
+        "mqtt_published": len(mqtt_service.client.published),
+        "final_mode": mqtt_service.mode,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reda o sesiune inregistrata prin backend")
+    parser.add_argument("session", help="fisierul de sesiune (ROBOT_RECORD)")
+    parser.add_argument("--realtime", action="store_true", help="reda in timp real, nu cat de repede se poate")
+    parser.add_argument("--output", help="fisierul JSON pentru raport (implicit stdout)")
+    args = parser.parse_args()
+
+    # Mesajele afisate de backend merg la stderr, ca raportul sa ramana JSON valid
+    with contextlib.redirect_stdout(sys.stderr):
+        report = replay(args.session, args.realtime)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=4)
+    else:
+        json.dump(report, sys.stdout, indent=4)
+        print()
@@ -0,0 +1,129 @@
+# Planificator cooperativ cu frecventa fixa pentru bucla de control
+#
+# Fiecare subsistem inregistreaza o sarcina cu o frecventa (Hz) si o prioritate
+# (0 = cea mai importanta). Bucla ruleaza sarcinile scadente in ordinea prioritatii,
+# apoi doarme pana la urmatorul termen, in loc sa se invarta continuu.
+#
+#   loop = scheduler.Scheduler()
+#   loop.add("telemetry", pico_to_pi_service.receive, rate=100, priority=0)
+#   loop.run_forever()
+#
+# O sarcina poate fi trezita inainte de termen cu notify() (ex. la sosirea unui frame).
+import threading
+import time
+# statisticile pentru depasirile de termen
+import metrics_service
+
+
+# O sarcina periodica
+class Task():
+    name: str
+    function: object          # Functia apelata, fara argumente
+    period: float             # Intervalul dintre rulari (secunde)
+    priority: int             # Ordinea cand mai multe sarcini sunt scadente (0 = prima)
+    next_run: float           # Urmatorul termen (ceasul planificatorului)
+    runs: int                 # Numarul de rulari
+    overruns: int             # De cate ori sarcina a pierdut cel putin un termen
+    max_lateness: float       # Cea mai mare intarziere fata de termen (secunde)
+    pending: bool             # Notificata (notify), ruleaza la urmatoarea trecere
+
+    def __init__(self, name, function, rate, priority):
+        self.name = name
+        self.function = function
+        self.period = 1 / rate
+        self.priority = priority
+        self.next_run = 0
+        self.runs = 0
+        self.overruns = 0
+        self.max_lateness = 0.0
+        self.pending = False
+
+
+class Scheduler():
+    tasks: list               # Sarcinile, ordonate dupa prioritate
+    clock: object             # Functia care da timpul curent (time.monotonic sau ceasul de replay)
+
+    def __init__(self, clock=None):
+        self.tasks = []
+        self.clock = clock or time.monotonic
+        self._running = False
+        # Trezeste bucla cand o sarcina este notificata inainte de termen
+        self._wake = threading.Event()
+
+    # Inregistreaza o sarcina care ruleaza de rate ori pe secunda
+    def add(self, name, function, rate, priority=0):
+        task = Task(name, function, rate, priority)
+        task.next_run = self.clock()
+        self.tasks.append(task)
+        self.tasks.sort(key=lambda t: t.priority)
+        return task
+
+    # Face sarcina scadenta imediat si trezeste bucla (sigur din alte fire)
+    # Doar indicatorul pending este scris aici; next_run ramane al firului planificatorului
+    def notify(self, name):
+        for task in self.tasks:
+            if task.name == name:
+                task.pending = True
+        self._wake.set()
+
+    # Ruleaza o data toate sarcinile scadente; returneaza timpul pana la urmatorul termen
+    def run_pending(self):
+        for task in self.tasks:
+            now = self.clock()
+            notified = task.pending
+            if not notified and now < task.next_run:
+                continue
+
+            # Indicatorul este sters inainte de apel: o notificare sosita in timpul rularii
+            # (ex. un frame nou in timpul procesarii) face sarcina din nou scadenta imediat
+            task.pending = False
+
+            # Intarzierea fata de termen (o rulare la notificare nu are termen)
+            if not notified:
+                lateness = now - task.next_run
+                task.max_lateness = max(task.max_lateness, lateness)
+                metrics_service.record(f"sched.{task.name}.lateness", lateness)
+
+            t = metrics_service.start()
+            task.function()
+            metrics_service.stop(f"sched.{task.name}", t)
+            task.runs += 1
+
+            # Dupa o notificare ritmul reporneste de la momentul rularii; altfel pastram ritmul
+            # fix, iar daca am pierdut un termen intreg, nu incercam sa recuperam
+            if notified:
+                task.next_run = now + task.period
+            else:
+                task.next_run += task.period
+                if task.next_run <= self.clock():
+                    task.overruns += 1
+                    task.next_run = self.clock() + task.period
+
+        if any(task.pending for task in self.tasks):
+            return 0.0
+        return max(0.0, min(task.next_run for task in self.tasks) - self.clock())
+
+    # Bucla principala: ruleaza sarcinile si doarme pana la urmatorul termen
+    def run_forever(self):
+        self._running = True
+        while self._running:
+            delay = self.run_pending()
+            if delay > 0:
+                # Event.wait doarme (nu consuma procesor) si se trezeste la notify()
+                self._wake.wait(delay)
+            self._wake.clear()
+            metrics_service.tick()
+
+    def stop(self):
+        self._running = False
+        self._wake.set()
+
+    # Statisticile sarcinilor (pentru depanare / metrici)
+    def stats(self):
+        return {task.name: {
+            "rate_hz": round(1 / task.period, 2),
+            "priority": task.priority,
+            "runs": task.runs,
+            "overruns": task.overruns,
+            "max_lateness_ms": round(task.max_lateness * 1000, 3),
+        } for task in self.tasks}
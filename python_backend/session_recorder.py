@@ -0,0 +1,154 @@
+# Inregistrarea unei sesiuni (camera, pachete Pico, mesaje MQTT) intr-un singur fisier,
+# pentru reproducerea problemelor din teren cu replay.py
+#
+# Activare: ROBOT_RECORD=/cale/sesiune.rec python main.py
+#
+# Formatul fisierului: MAGIC, apoi inregistrari [tip, timp, lungime] + continut
+#   FRAME - frame_id (int64) + imaginea comprimata JPEG
+#   PICO  - octetii cititi de pe portul serial, exact cum au sosit
+#   MQTT  - lungimea topicului (uint16) + topicul + payload-ul
+import os
+import struct
+import threading
+import time
+import queue
+# OpenCV pentru comprimarea frame-urilor
+import cv2
+# jurnalul (niveluri pe module)
+import logging
+
+log = logging.getLogger(__name__)
+
+MAGIC = b"RCSESS1\n"
+
+# Tipurile de inregistrari
+FRAME, PICO, MQTT = 1, 2, 3
+
+# Antetul fiecarei inregistrari: tip, timp (time.time()), lungimea continutului
+RECORD_HEADER = struct.Struct("<BdI")
+FRAME_ID = struct.Struct("<q")
+TOPIC_LENGTH = struct.Struct("<H")
+
+# Calitatea JPEG pentru frame-urile inregistrate
+jpeg_quality = 90
+
+# Fisierul sesiunii (din variabila de mediu); inregistrarea e oprita daca lipseste
+path = os.environ.get("ROBOT_RECORD")
+enabled = bool(path)
+
+# Coada catre firul de scriere, ca bucla de control sa nu astepte discul sau codarea JPEG.
+# Este limitata, ca memoria sa nu creasca daca discul sau codarea raman in urma: un frame
+# (~1 MB) este inregistrat doar cat timp asteapta mai putin de FRAME_QUEUE_LIMIT inregistrari,
+# altfel este aruncat si numarat. Octetii Pico si mesajele MQTT (mici) nu se pierd niciodata:
+# au rezervat restul cozii, iar daca si aceasta se umple, bucla asteapta firul de scriere.
+QUEUE_SIZE = 4096
+FRAME_QUEUE_LIMIT = 8
+record_queue = queue.Queue(maxsize=QUEUE_SIZE)
+
+# Frame-uri aruncate pentru ca firul de scriere ramasese in urma
+dropped_frames = 0
+
+
+# Inregistreaza un frame; se face o copie pentru ca frame-ul poate fi desenat ulterior
+def record_frame(frame_id, frame, capture_time=None):
+    global dropped_frames
+    if not enabled:
+        return
+    if record_queue.qsize() >= FRAME_QUEUE_LIMIT:
+        dropped_frames += 1
+        return
+    try:
+        record_queue.put_nowait((FRAME, capture_time or time.time(), (frame_id, frame.copy())))
+    except queue.Full:
+        dropped_frames += 1
+
+
+# Inregistreaza octetii cititi de la Pico (fara pierderi)
+def record_pico(data):
+    if not enabled:
+        return
+    record_queue.put((PICO, time.time(), bytes(data)))
+
+
+# Inregistreaza un mesaj MQTT primit (fara pierderi)
+def record_mqtt(topic, payload):
+    if not enabled:
+        return
+    record_queue.put((MQTT, time.time(), (topic, bytes(payload))))
+
+
+# Transforma o inregistrare din coada in octetii scrisi in fisier
+def encode_record(kind, timestamp, data):
+    if kind == FRAME:
+        frame_id, frame = data
+        ret, buffer = cv2.imencode(".jpg", frame, [int(cv2.IMWRITE_JPEG_QUALITY), jpeg_quality])
+        payload = FRAME_ID.pack(frame_id) + buffer.tobytes()
+    elif kind == MQTT:
+        topic, message = data
+        topic = topic.encode()
+        payload = TOPIC_LENGTH.pack(len(topic)) + topic + message
+    else:
+        payload = data
+
+    return RECORD_HEADER.pack(kind, timestamp, len(payload)) + payload
+
+
+# Firul de scriere: comprima frame-urile si scrie inregistrarile in ordinea sosirii
+def writer_loop(file):
+    while True:
+        item = record_queue.get()
+        if item is None:
+            break
+        file.write(encode_record(*item))
+    file.close()
+
+
+# Citeste inregistrarile dintr-un fisier de sesiune: genereaza (tip, timp, date)
+# FRAME -> (frame_id, jpeg), PICO -> octeti, MQTT -> (topic, payload)
+def read_session(session_path):
+    with open(session_path, "rb") as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{session_path} nu este un fisier de sesiune")
+
+        while True:
+            header = file.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                break
+
+            kind, timestamp, length = RECORD_HEADER.unpack(header)
+            payload = file.read(length)
+            if len(payload) < length:
+                # Inregistrare trunchiata (ex. oprire brusca)
+                break
+
+            if kind == FRAME:
+                yield kind, timestamp, (FRAME_ID.unpack_from(payload)[0], payload[FRAME_ID.size:])
+            elif kind == MQTT:
+                topic_length = TOPIC_LENGTH.unpack_from(payload)[0]
+                topic = payload[TOPIC_LENGTH.size:TOPIC_LENGTH.size + topic_length].decode()
+                yield kind, timestamp, (topic, payload[TOPIC_LENGTH.size + topic_length:])
+            else:
+                yield kind, timestamp, payload
+
+
+writer_thread = None
+
+# Pornim firul de scriere daca inregistrarea este activata
+if enabled:
+    session_file = open(path, "wb")
+    session_file.write(MAGIC)
+    writer_thread = threading.Thread(target=writer_loop, args=(session_file,), name="session-recorder", daemon=True)
+    writer_thread.start()
+    log.info("recording session to %s", path)
+
+
+# Scrie tot ce a ramas in coada si inchide fisierul
+def close():
+    global enabled
+    if writer_thread is None:
+        return
+    enabled = False
+    record_queue.put(None)
+    writer_thread.join()
+    if dropped_frames:
+        log.warning("session recorder dropped %d frames (writer behind)", dropped_frames)
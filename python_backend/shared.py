@@ -1,21 +1,20 @@
-# Comunicarea seriala cu dispozitive
-import serial
+# variabile de mediu
+import os
 
-# Initializam variabila globala pentru conexiunea cu microcontrollerul Pico
-pico = None
+# ROBOT_NO_HARDWARE=1 porneste backend-ul fara hardware (ex. la replay):
+# nu se deschid portul serial, camera si conexiunea MQTT, iar obiectele
+# (pico, camera, clientul MQTT) sunt furnizate din afara
+hardware_enabled = os.environ.get("ROBOT_NO_HARDWARE") != "1"
+
+# ROBOT_RUNTIME=asyncio porneste backend-ul pe bucla asyncio (async_runtime.py):
+# portul serial, MQTT si camera sunt conduse de bucla, nu de fire separate
+runtime = os.environ.get("ROBOT_RUNTIME", "threads")
 
-# Incercam sa stabilim conexiunea cu microcontrollerul Pico
-# Uneori Pico-ul ajunge pe ttyACM0 sau ttyACM1 (porturile pot varia)
-try:
-    # Prima incercare: conectare pe portul /dev/ttyACM0
-    # Parametri conexiune:
-    # - port: "/dev/ttyACM0" - primul port serial disponibil
-    # - baudrate: 9600 - viteza de comunicare (biti pe secunda)
-    # - timeout: 1 - timeout de 1 secunda pentru operatiile de citire
-    pico = serial.Serial(port="/dev/ttyACM0", baudrate=9600, timeout=1)
-    
-# Daca prima incercare esueaza (portul nu este disponibil)
-except serial.serialutil.SerialException as e:
-    # A doua incercare: conectare pe portul /dev/ttyACM1
-    # Folosim aceiasi parametri ca mai sus
-    pico = serial.Serial(port="/dev/ttyACM1", baudrate=9600, timeout=1)
\ No newline at end of file
+# Brokerul MQTT (implicit cel local, pe portul standard); ROBOT_MQTT_HOST / ROBOT_MQTT_PORT
+# conecteaza backend-ul la alt broker (ex. cel din latency_benchmark.py)
+mqtt_host = os.environ.get("ROBOT_MQTT_HOST", "localhost")
+mqtt_port = int(os.environ.get("ROBOT_MQTT_PORT", "1883"))
+
+# Conexiunea cu microcontrollerul Pico: portul deschis sau None cat timp legatura este
+# cazuta; este deschisa (si redeschisa dupa o deconectare) de pico_link, pe un fir separat
+pico = None
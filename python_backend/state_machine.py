@@ -0,0 +1,116 @@
+# Motorul comun al masinilor de stari din modurile autonome (aspirare, perie)
+#
+# Starile (un Enum) si tranzitiile permise sunt declarate o singura data, ca tabel. Fiecare
+# stare are o metoda cu acelasi nume in obiectul modului; tranzitia retine direct metoda starii
+# noi, asa ca un pas al buclei este un singur apel (machine.handler(...)), fara cautari sau alocari.
+#
+# La fiecare tranzitie: hook-ul de iesire al starii vechi, timpul petrecut in ea, numarul
+# tranzitiei (de la, la), o intrare in urma (trace, ultimele TRACE_SIZE tranzitii), apoi hook-ul
+# de intrare al starii noi. O tranzitie nedeclarata este scrisa in jurnal si duce masina in
+# starea de rezerva (fallback).
+#
+# Dashboard-ul cere statisticile si urma pe "fsm_trace_request" (payload gol sau numele
+# masinii) si le primeste pe "fsm_trace" (publicate pe clientul dat de mqtt_service):
+#   {"aspirare": {"state": "MOVE_FORWARD", "in_state_s": 1.2, "running_s": 95.1,
+#                 "time_in_state_s": {"MOVE_FORWARD": 61.0, ...},
+#                 "transitions": {"MOVE_FORWARD->DECIDE_DIRECTION": 14, ...}, "invalid": 0,
+#                 "trace": [[1718000000.123, "MOVE_FORWARD", "DECIDE_DIRECTION", 4.52], ...]}}
+#   (in urma: momentul, starea veche, starea noua, secundele petrecute in starea veche)
+import json
+import time
+# jurnalul (niveluri pe module)
+import logging
+from collections import deque
+
+TOPIC = "fsm_trace"
+TRACE_SIZE = 256
+
+log = logging.getLogger(__name__)
+# Tranzitiile masinilor de stari (urma FSM, la nivelul DEBUG)
+fsm_log = logging.getLogger("fsm")
+
+# Masinile de stari active, dupa nume (modul perie isi reface masina la fiecare pornire)
+machines = {}
+
+
+class StateMachine():
+    name: str                   # Numele masinii (modul)
+    state: object               # Starea curenta (valoare din Enum)
+    handler: object             # Metoda starii curente, apelata la fiecare pas
+    fallback: object            # Starea in care duce o tranzitie nedeclarata
+    entered: float              # Momentul intrarii in starea curenta
+    invalid: int                # Tranzitiile nedeclarate cerute
+
+    # owner are cate o metoda pentru fiecare stare din transitions (cu numele starii);
+    # on_enter / on_exit: {stare: functie fara argumente}
+    def __init__(self, name, owner, transitions, initial, fallback=None, on_enter=None, on_exit=None):
+        self.name = name
+        self.transitions = {state: frozenset(targets) for state, targets in transitions.items()}
+        self.handlers = {state: getattr(owner, state.name) for state in self.transitions}
+        self.on_enter = on_enter or {}
+        self.on_exit = on_exit or {}
+        self.fallback = initial if fallback is None else fallback
+
+        self.state = initial
+        self.handler = self.handlers[initial]
+        self.started = self.entered = time.time()
+
+        # Statistici: timpul petrecut in fiecare stare, numarul fiecarei tranzitii, urma
+        self.time_in_state = dict.fromkeys(self.transitions, 0.0)
+        self.counts = {(state, target): 0 for state, targets in self.transitions.items() for target in targets}
+        self.invalid = 0
+        self.trace = deque(maxlen=TRACE_SIZE)
+
+        machines[name] = self
+
+    # Trece in starea noua; returneaza False daca tranzitia nu este declarata (masina ajunge in fallback)
+    def transition(self, new_state):
+        old = self.state
+        valid = new_state in self.transitions[old]
+        if not valid:
+            log.error("%s: invalid transition %s --> %s", self.name, old, new_state)
+            self.invalid += 1
+            new_state = self.fallback
+
+        exit_hook = self.on_exit.get(old)
+        if exit_hook is not None:
+            exit_hook()
+
+        now = time.time()
+        spent = now - self.entered
+        self.time_in_state[old] += spent
+        if valid:
+            self.counts[(old, new_state)] += 1
+        self.trace.append((now, old, new_state, spent))
+        fsm_log.debug("%s: %s --> %s", self.name, old, new_state)
+
+        self.state = new_state
+        self.handler = self.handlers[new_state]
+        self.entered = now
+
+        enter_hook = self.on_enter.get(new_state)
+        if enter_hook is not None:
+            enter_hook()
+        return valid
+
+    # Statisticile si urma (pentru dashboard / depanare)
+    def stats(self):
+        now = time.time()
+        time_in_state = dict(self.time_in_state)
+        time_in_state[self.state] += now - self.entered
+        return {
+            "state": self.state.name,
+            "in_state_s": round(now - self.entered, 3),
+            "running_s": round(now - self.started, 3),
+            "time_in_state_s": {state.name: round(seconds, 3) for state, seconds in time_in_state.items() if seconds},
+            "transitions": {f"{old.name}->{new.name}": count for (old, new), count in self.counts.items() if count},
+            "invalid": self.invalid,
+            "trace": [[round(moment, 3), old.name, new.name, round(spent, 3)]
+                      for moment, old, new, spent in list(self.trace)],
+        }
+
+
+# Cererea dashboard-ului: statisticile tuturor masinilor (sau doar a celei cerute), publicate pe client
+def publish_trace(client, payload=None):
+    selected = {name: machine for name, machine in list(machines.items()) if not payload or name == payload}
+    client.publish(TOPIC, json.dumps({name: machine.stats() for name, machine in selected.items()}))
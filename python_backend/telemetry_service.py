@@ -0,0 +1,292 @@
+# Publicarea telemetriei pentru dashboard: senzori, encodere, modul, starea FSM si bucla
+#
+# Valorile sunt esantionate de SAMPLE_RATE ori pe secunda si adunate intr-un singur mesaj
+# MQTT trimis de PUBLISH_RATE ori pe secunda. Un mesaj contine fie un cadru complet
+# (keyframe, la fiecare KEYFRAME_INTERVAL secunde sau la cererea dashboard-ului pe topicul
+# "telemetry_request"), fie doar campurile schimbate fata de esantionul anterior, asa ca
+# un robot oprit costa cativa octeti pe secunda pe broker.
+#
+# ROBOT_TELEMETRY_RATE=10     esantioane pe secunda (0 = oprit)
+# ROBOT_TELEMETRY_PUBLISH=2   mesaje pe secunda
+# ROBOT_TELEMETRY_FORMAT=json json (topicul "telemetry"), binary ("telemetry/bin") sau both
+#
+# JSON: {"seq": 12, "key": true, "t0": 1718000000.123, "samples": [{"t": 0, "us_front": 41, ...}, {"t": 100, "motor_a_pos": 1210}]}
+#   t = milisecunde fata de t0; lipsa unui camp inseamna ca nu s-a schimbat
+#
+# Binar (little-endian): header "<BBHdB" = versiune, indicatori (bit 0 = keyframe), seq, t0,
+# numarul de esantioane incluse; fiecare esantion: t (uint16, ms), masca de biti a campurilor
+# prezente (uint16, in ordinea FIELDS), apoi campurile prezente cu formatele din FIELDS.
+# Schema (campurile, formatele, modurile si starile) este publicata retinut pe "telemetry/schema".
+import os
+import json
+import time
+import struct
+import threading
+# modulele citite la esantionare
+import pico_to_pi_service
+import mqtt_service
+import mode_aspirator_autonom
+import mode_smart_perie_autonom
+# durata publicarii si frecventa buclei
+import metrics_service
+# jurnalul (niveluri pe module)
+import logging
+
+log = logging.getLogger(__name__)
+
+# Frecventa esantionarii, a mesajelor si formatul
+sample_rate = float(os.environ.get("ROBOT_TELEMETRY_RATE", "10"))
+DEFAULT_PUBLISH_RATE = 2.0
+publish_rate = float(os.environ.get("ROBOT_TELEMETRY_PUBLISH", str(DEFAULT_PUBLISH_RATE)))
+encoding = os.environ.get("ROBOT_TELEMETRY_FORMAT", "json")
+
+# step() imparte la publish_rate; o valoare nula sau negativa ar opri publicarea la primul pas
+if publish_rate <= 0:
+    log.warning("ROBOT_TELEMETRY_PUBLISH=%s must be positive, using %g", publish_rate, DEFAULT_PUBLISH_RATE)
+    publish_rate = DEFAULT_PUBLISH_RATE
+
+# Intervalul dintre cadrele complete (secunde)
+KEYFRAME_INTERVAL = 5
+
+TOPIC = "telemetry"
+BINARY_TOPIC = "telemetry/bin"
+SCHEMA_TOPIC = "telemetry/schema"
+BINARY_VERSION = 1
+
+# Campurile unui esantion (valori intregi) si formatul lor in mesajul binar
+#   us_*      distanta in cm
+#   flags     bit 0 ir_scari, bit 1 ir_aspirator, bit 2 senzor_umid
+#   mode      indexul din MODES (255 = necunoscut)
+#   state     valoarea starii FSM din modul curent (255 = fara FSM)
+#   loop_hz   frecventa buclei (0 = masurarea etapelor este oprita)
+#   age_ms    vechimea ultimului pachet de la Pico, rotunjita in jos la AGE_RESOLUTION
+#             (cat timp pachetele sosesc la timp valoarea ramane 0 si nu apare in diferente)
+FIELDS = (
+    ("us_front", "H"), ("us_left", "H"), ("us_right", "H"),
+    ("flags", "B"),
+    ("motor_a_pos", "i"), ("motor_b_pos", "i"),
+    ("mode", "B"), ("state", "B"),
+    ("loop_hz", "H"), ("age_ms", "H"),
+)
+AGE_RESOLUTION = 100
+FIELD_STRUCTS = [struct.Struct("<" + fmt) for _, fmt in FIELDS]
+FIELD_INDEX = {name: i for i, (name, _) in enumerate(FIELDS)}
+HEADER = struct.Struct("<BBHdB")
+SAMPLE_HEADER = struct.Struct("<HH")
+
+FLAG_NAMES = ("ir_scari", "ir_aspirator", "senzor_umid")
+MODES = ("manual", "aspirare", "perie")
+# Masinile de stari ale modurilor (numele starilor, dupa valoare)
+STATE_MACHINES = {
+    "aspirare": mode_aspirator_autonom,
+    "perie": mode_smart_perie_autonom,
+}
+NO_STATE = 255
+
+# Esantioanele care asteapta publicarea: (momentul, valorile)
+pending = []
+# Ultimul esantion (referinta pentru diferente) si momentul ultimului keyframe
+last_sample = None
+last_keyframe = 0.0
+keyframe_requested = True
+seq = 0
+
+# Statistici: mesaje si octeti publicati
+messages = 0
+bytes_sent = 0
+
+
+# Citeste valorile curente (din firul publicarii; fiecare valoare este o singura citire)
+def sample():
+    telemetry = pico_to_pi_service.latest
+    flags = (telemetry.ir_scari << 0) | (telemetry.ir_aspirator << 1) | (telemetry.senzor_umid << 2)
+
+    mode = mqtt_service.mode
+    state = NO_STATE
+    machine = STATE_MACHINES.get(mode)
+    if machine is not None:
+        state = machine.state.state.value
+
+    loop_hz = metrics_service.loop_rate() if metrics_service.enabled else None
+    age = time.time() - telemetry.receive_time
+
+    return (
+        clamp(round(telemetry.us_front), 0xFFFF),
+        clamp(round(telemetry.us_left), 0xFFFF),
+        clamp(round(telemetry.us_right), 0xFFFF),
+        flags,
+        int(telemetry.motor_a_pos), int(telemetry.motor_b_pos),
+        MODES.index(mode) if mode in MODES else 255,
+        state,
+        clamp(round(loop_hz), 0xFFFF) if loop_hz else 0,
+        clamp(int(age * 1000) // AGE_RESOLUTION * AGE_RESOLUTION, 0xFFFF),
+    )
+
+
+def clamp(value, maximum):
+    return max(0, min(maximum, value))
+
+
+# Cere un keyframe la urmatorul mesaj (ex. un dashboard abia conectat)
+def request_keyframe(payload=None):
+    global keyframe_requested
+    keyframe_requested = True
+
+
+# Campurile care difera intre doua esantioane, ca masca de biti
+def changed_mask(values, previous):
+    if previous is None:
+        return (1 << len(FIELDS)) - 1
+    mask = 0
+    for i, (value, old) in enumerate(zip(values, previous)):
+        if value != old:
+            mask |= 1 << i
+    return mask
+
+
+# Un esantion ca dictionar JSON (doar campurile din masca)
+def json_sample(offset_ms, values, mask):
+    result = {"t": offset_ms}
+    for i, (name, _) in enumerate(FIELDS):
+        if not mask & (1 << i):
+            continue
+        value = values[i]
+        if name == "flags":
+            for bit, flag in enumerate(FLAG_NAMES):
+                result[flag] = bool(value & (1 << bit))
+        elif name == "mode":
+            result["mode"] = MODES[value] if value < len(MODES) else None
+        elif name == "state":
+            result["state"] = state_name(values[FIELD_INDEX["mode"]], value)
+        elif name == "loop_hz":
+            result["loop_hz"] = value or None
+        else:
+            result[name] = value
+    return result
+
+
+def state_name(mode_index, value):
+    if value == NO_STATE or mode_index >= len(MODES):
+        return None
+    machine = STATE_MACHINES.get(MODES[mode_index])
+    return machine.States(value).name if machine is not None else None
+
+
+# Construieste mesajele (JSON si / sau binar) pentru esantioanele adunate
+# Esantioanele identice cu cele anterioare nu apar deloc in mesaj
+def encode(samples, keyframe, previous):
+    t0 = samples[0][0]
+    json_samples = []
+    binary = bytearray()
+    count = 0
+
+    for i, (timestamp, values) in enumerate(samples):
+        offset_ms = min(0xFFFF, round((timestamp - t0) * 1000))
+        # Primul esantion dintr-un keyframe este complet
+        mask = changed_mask(values, None if keyframe and i == 0 else previous)
+        previous = values
+        if not mask:
+            continue
+        # O schimbare de mod schimba si numele starii
+        if mask & (1 << FIELD_INDEX["mode"]):
+            mask |= 1 << FIELD_INDEX["state"]
+        count += 1
+
+        if encoding != "binary":
+            json_samples.append(json_sample(offset_ms, values, mask))
+        if encoding != "json":
+            binary += SAMPLE_HEADER.pack(offset_ms, mask)
+            for index, field in enumerate(FIELD_STRUCTS):
+                if mask & (1 << index):
+                    binary += field.pack(values[index])
+
+    text = None
+    if encoding != "binary":
+        text = json.dumps({"seq": seq, "key": keyframe, "t0": round(t0, 3), "samples": json_samples},
+                          separators=(",", ":"))
+    if encoding != "json":
+        binary[0:0] = HEADER.pack(BINARY_VERSION, int(keyframe), seq & 0xFFFF, t0, count)
+    return text, (bytes(binary) if encoding != "json" else None)
+
+
+# Adauga un esantion si publica mesajul cand s-au adunat destule
+def step():
+    global last_sample, last_keyframe, keyframe_requested, seq, messages, bytes_sent
+    now = time.time()
+    pending.append((now, sample()))
+    if len(pending) < max(1, round(sample_rate / publish_rate)):
+        return
+
+    t = metrics_service.start()
+    keyframe = keyframe_requested or now - last_keyframe >= KEYFRAME_INTERVAL
+    text, binary = encode(pending, keyframe, last_sample)
+    client = mqtt_service.client
+    if text is not None:
+        client.publish(TOPIC, text)
+        bytes_sent += len(text)
+    if binary is not None:
+        client.publish(BINARY_TOPIC, binary)
+        bytes_sent += len(binary)
+    messages += 1
+    metrics_service.stop("telemetry.publish", t)
+
+    last_sample = pending[-1][1]
+    pending.clear()
+    seq += 1
+    if keyframe:
+        keyframe_requested = False
+        last_keyframe = now
+
+
+# Un pas al publicarii pentru firul / sarcina periodica: o eroare (ex. la publicarea MQTT)
+# este jurnalizata si nu opreste telemetria; esantioanele nepublicate sunt aruncate
+def publish_step():
+    try:
+        step()
+    except Exception:
+        log.exception("telemetry step failed")
+        pending.clear()
+
+
+# Descrierea formatului, pentru dashboard / decodarea mesajelor binare
+def schema():
+    return {
+        "version": BINARY_VERSION,
+        "fields": [{"name": name, "format": fmt} for name, fmt in FIELDS],
+        "flags": FLAG_NAMES,
+        "modes": MODES,
+        "states": {mode: [state.name for state in machine.States] for mode, machine in STATE_MACHINES.items()},
+        "sample_rate": sample_rate,
+        "publish_rate": publish_rate,
+    }
+
+
+# Firul publicarii: esantionarea si serializarea nu ruleaza pe bucla de control
+def publish_loop():
+    next_run = time.monotonic()
+    while True:
+        publish_step()
+        next_run += 1 / sample_rate
+        delay = next_run - time.monotonic()
+        if delay < 0:
+            next_run = time.monotonic()
+            delay = 0
+        time.sleep(delay)
+
+
+# Publica schema la fiecare conectare la broker (retinuta pentru clientii care se conecteaza mai tarziu)
+def publish_schema(client):
+    if sample_rate > 0:
+        client.publish(SCHEMA_TOPIC, json.dumps(schema()), retain=True)
+
+
+# Porneste publicarea periodica (runtime-ul cu fire; in asyncio publish_step() ruleaza pe bucla)
+def start_publishing():
+    if sample_rate <= 0:
+        return
+    threading.Thread(target=publish_loop, name="telemetry-publisher", daemon=True).start()
+
+
+# Statisticile publicarii (pentru metrici / depanare)
+def stats():
+    return {"messages": messages, "bytes": bytes_sent, "seq": seq}
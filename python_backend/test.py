@@ -3,8 +3,13 @@ import time
 import pico_to_pi_service 
 # Serviciu pentru controlul motorului
 import motor_service  
-# Modul partajat
-import shared
+# Trimiterea comenzilor motoarelor (motor_service doar actualizeaza starea dorita)
+import command_writer
+# Conexiunea cu Pico-ul (deschisa in fundal)
+import pico_link
+
+# Asteptam conectarea la Pico inainte de primele comenzi
+pico_link.connected.wait()
 
 def write_states(perie_status, aspirator_status):
     """
@@ -14,13 +19,9 @@ def write_states(perie_status, aspirator_status):
     perie_status - statusul periei (True/False sau 1/0)
     aspirator_status - statusul aspiratorului (True/False sau 1/0)
     """
-    # Cream un pachet de date pentru a trimite statusul componentelor
-    # Pachetul are format: [0x7A, 0xF3, status_perie, status_aspirator, 0, 0]
-    # 0x7A si 0xF3 sunt probabil header-uri/identificatori pentru tip de mesaj
-    byte_buffer = bytearray([0x7A, 0xF3, perie_status, aspirator_status, 0, 0])
-    
-    # Trimitem pachetul catre microcontrollerul Pico prin conexiunea din shared
-    shared.pico.write(byte_buffer)
+    # Pachetul [0x7A, 0xF3, status_perie, status_aspirator, 0, 0] este trimis de command_writer
+    # la urmatorul flush(), impreuna cu comanda motoarelor (o singura scriere pe port)
+    command_writer.set_states(perie_status, aspirator_status)
 
 # Incepem executia principala cu tratarea exceptiilor
 try:
@@ -31,6 +32,7 @@ try:
         
         # Setam statusul: peria oprita (False), aspiratorul pornit (True)
         write_states(False, True)
+        command_writer.flush()
         
 # Tratam exceptia KeyboardInterrupt (Ctrl+C) pentru oprirea programului
 except KeyboardInterrupt:
@@ -41,6 +43,7 @@ except KeyboardInterrupt:
     
     # Ne asiguram ca motorul este oprit
     motor_service.stop()
+    command_writer.flush(force=True)
     
     # Afisam mesaj de confirmare ca programul se inchide
     print("Exiting...")
\ No newline at end of file
@@ -0,0 +1,9 @@
+# Testele importa modulele backend-ului direct, fara hardware (serial, camera, MQTT)
+import os
+import sys
+
+os.environ["ROBOT_NO_HARDWARE"] = "1"
+os.environ["ROBOT_VISION_PIPELINE"] = "0"
+os.environ.pop("ROBOT_RECORD", None)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
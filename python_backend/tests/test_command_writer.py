@@ -0,0 +1,139 @@
+# Testele scrierii comenzilor: coalescenta intr-o singura scriere pe pas si keepalive-ul
+import pytest
+import serial
+
+import command_writer
+import pico_codec
+import pico_link
+import shared
+
+
+# Ceas controlat de test, folosit doar de command_writer
+class FakeTime():
+    def __init__(self):
+        self.now = 100.0
+
+    def time(self):
+        return self.now
+
+
+# Portul serial: retine fiecare write(); poate simula un port disparut
+class FakePico():
+    def __init__(self):
+        self.writes = []
+        self.error = None
+
+    def write(self, data):
+        if self.error is not None:
+            raise self.error
+        self.writes.append(bytes(data))
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeTime()
+    monkeypatch.setattr(command_writer, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def pico(monkeypatch, clock):
+    pico = FakePico()
+    monkeypatch.setattr(shared, "pico", pico)
+    # Starea modulului o ia de la zero: nimic trimis, nicio tinta
+    monkeypatch.setattr(command_writer, "keepalive_rate", 2.0)
+    monkeypatch.setattr(command_writer, "motors", (0, 0, False, False))
+    monkeypatch.setattr(command_writer, "states", (False, False))
+    monkeypatch.setattr(command_writer, "pending_goal", None)
+    monkeypatch.setattr(command_writer, "goal_active", False)
+    monkeypatch.setattr(command_writer, "sent_motors", None)
+    monkeypatch.setattr(command_writer, "sent_states", None)
+    monkeypatch.setattr(command_writer, "sent_goal_config", None)
+    monkeypatch.setattr(command_writer, "last_write", clock.now)
+    monkeypatch.setattr(command_writer, "on_change", None)
+    monkeypatch.setattr(command_writer, "updates", 0)
+    monkeypatch.setattr(command_writer, "writes", 0)
+    monkeypatch.setattr(command_writer, "keepalives", 0)
+    return pico
+
+
+def motors_packet(*motors):
+    return command_writer.MOTORS_HEADER + bytes(motors)
+
+
+def states_packet(perie, aspirator):
+    return command_writer.STATES_HEADER + bytes([perie, aspirator, 0, 0])
+
+
+def test_changes_in_one_step_become_one_write(pico):
+    command_writer.set_motors(100, 100, False, False)
+    command_writer.set_motors(120, 80, False, True)
+    command_writer.set_states(True, False)
+    command_writer.flush()
+
+    # Doar ultima comanda a motoarelor, impreuna cu starea periei, intr-un singur write()
+    assert pico.writes == [motors_packet(120, 80, 0, 1) + states_packet(1, 0)]
+    assert command_writer.stats() == {"updates": 3, "writes": 1, "keepalives": 0}
+
+
+def test_unchanged_state_is_not_written(pico, clock):
+    command_writer.set_motors(100, 100, False, False)
+    command_writer.flush()
+    pico.writes.clear()
+
+    # Aceeasi comanda, inainte de termenul keepalive-ului
+    clock.now += 0.1
+    command_writer.set_motors(100, 100, False, False)
+    command_writer.flush()
+    assert pico.writes == []
+
+    # O schimbare trimite doar pachetul care difera
+    command_writer.set_states(False, True)
+    command_writer.flush()
+    assert pico.writes == [states_packet(0, 1)]
+
+
+def test_keepalive_resends_state_at_2_hz(pico, clock):
+    command_writer.set_motors(100, 100, False, False)
+    command_writer.set_states(True, True)
+    command_writer.flush()
+    pico.writes.clear()
+
+    # Bucla ruleaza la 50 Hz timp de o secunda, fara nicio schimbare
+    start = clock.now
+    for step in range(1, 51):
+        clock.now = start + step * 0.02
+        command_writer.flush()
+
+    full = motors_packet(100, 100, 0, 0) + states_packet(1, 1)
+    assert pico.writes == [full, full]
+    assert command_writer.keepalives == 2
+
+
+def test_keepalive_does_not_cancel_a_running_goal(pico, clock):
+    command_writer.start_goal(1, 700, -700)
+    command_writer.flush()
+    # Comanda motoarelor nu pleaca odata cu tinta (ar anula-o pe Pico)
+    assert pico.writes == [states_packet(0, 0) + pico_codec.goal_config(120, 10) + pico_codec.goal(1, 700, -700)]
+    pico.writes.clear()
+
+    # Cat timp tinta ruleaza pe Pico, keepalive-ul retrimite doar perie / aspirator
+    clock.now += 0.5
+    command_writer.flush()
+    assert pico.writes == [states_packet(0, 0)]
+
+
+def test_write_error_reports_the_link_lost(pico, monkeypatch):
+    lost = []
+    monkeypatch.setattr(pico_link, "lost", lambda port, error: lost.append((port, error)))
+    pico.error = serial.SerialException("device disconnected")
+
+    command_writer.set_motors(100, 100, False, False)
+    command_writer.flush()
+    assert lost == [(pico, pico.error)]
+    # Starea ramane netrimisa si pleaca la urmatorul flush()
+    assert command_writer.sent_motors is None
+
+    pico.error = None
+    command_writer.flush()
+    assert pico.writes == [motors_packet(100, 100, 0, 0) + states_packet(0, 0)]
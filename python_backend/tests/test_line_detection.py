@@ -0,0 +1,83 @@
+# Testele detectiei liniilor de rost: clasificarea segmentelor si gruparea lor in linii separate
+import cv2
+import numpy as np
+
+import line_detection
+
+WIDTH, HEIGHT = 640, 480
+
+
+def segments(*lines):
+    return np.array(lines, dtype=np.int32).reshape(-1, 1, 4)
+
+
+def test_classify_horizontal_vertical_and_diagonal():
+    found, horizontal, vertical = line_detection.classify(segments(
+        [0, 100, 300, 110],     # orizontal
+        [200, 0, 205, 300],     # vertical
+        [0, 0, 100, 100],       # diagonal: niciunul
+    ))
+    assert found.shape == (3, 4)
+    assert horizontal.tolist() == [True, False, False]
+    assert vertical.tolist() == [False, True, False]
+
+
+def test_separated_vertical_lines_are_clustered_not_averaged():
+    hlines, vlines = line_detection.detect_lines(segments(
+        [100, 400, 100, 100],
+        [102, 460, 102, 200],
+        [400, 450, 400, 50],
+    ), WIDTH, HEIGHT)
+    assert hlines == []
+    assert len(vlines) == 2
+    # Prima linie este cea mai apropiata de centrul imaginii (x = 320)
+    assert abs(vlines[0][0] - 400) <= 1
+    # Segmentele apropiate (100 si 102) formeaza o singura linie, intre ele
+    assert 100 <= vlines[1][0] <= 102
+    # Nicio linie la mijlocul dintre rosturi (media gresita a tuturor segmentelor)
+    assert all(abs(line[0] - 250) > 100 for line in vlines)
+
+
+def test_vertical_line_endpoints_start_at_the_bottom():
+    _, vlines = line_detection.detect_lines(segments([300, 50, 300, 400]), WIDTH, HEIGHT)
+    x1, y1, x2, y2 = vlines[0]
+    assert (x1, x2) == (300, 300)
+    assert (y1, y2) == (400, 50)
+
+
+def test_horizontal_lines_sorted_by_distance_to_centre():
+    hlines, _ = line_detection.detect_lines(segments(
+        [0, 50, 500, 50],
+        [0, 250, 500, 250],
+    ), WIDTH, HEIGHT)
+    assert [line[1] for line in hlines] == [250, 50]
+    # Liniile orizontale incep din stanga
+    assert hlines[0][0] < hlines[0][2]
+
+
+def test_cluster_weight_and_extent():
+    found, _, vertical = line_detection.classify(segments([100, 100, 100, 200], [101, 300, 101, 400]))
+    fitted = line_detection.fit_lines(found[vertical], True, WIDTH, HEIGHT)
+    assert fitted.shape == (1, 5)
+    assert fitted[0, line_detection.LO] == 100
+    assert fitted[0, line_detection.HI] == 400
+    assert fitted[0, line_detection.WEIGHT] == 200
+
+
+def test_no_segments():
+    assert line_detection.detect_lines(None, WIDTH, HEIGHT) == ([], [])
+    assert line_detection.fit_lines(np.empty((0, 4), np.float32), True, WIDTH, HEIGHT).shape == (0, 5)
+
+
+def test_detects_grout_lines_in_an_image():
+    # Doua rosturi verticale si unul orizontal, albe pe fond negru
+    frame = np.zeros((HEIGHT, WIDTH, 3), np.uint8)
+    cv2.line(frame, (200, 0), (200, HEIGHT - 1), (255, 255, 255), 6)
+    cv2.line(frame, (450, 0), (450, HEIGHT - 1), (255, 255, 255), 6)
+    cv2.line(frame, (0, 240), (WIDTH - 1, 240), (255, 255, 255), 6)
+
+    binary = line_detection.preprocess(frame)
+    hlines, vlines = line_detection.detect_lines(line_detection.find_segments(binary), WIDTH, HEIGHT)
+
+    assert sorted(round(line[0] / 10) * 10 for line in vlines) == [200, 450]
+    assert len(hlines) == 1 and abs(hlines[0][1] - 240) <= 3
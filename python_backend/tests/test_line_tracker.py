@@ -0,0 +1,79 @@
+# Testele trackerului de rosturi: achizitia, urmarirea in banda si pastrarea liniei prezise
+# cel mult MAX_MISSED frame-uri fara masuratoare
+import cv2
+import numpy as np
+
+import line_tracker
+
+WIDTH, HEIGHT = 640, 480
+
+
+# Frame binar cu rosturi verticale la coordonatele x date (si optional unul orizontal la y)
+def frame(xs=(), y=None):
+    binary = np.zeros((HEIGHT, WIDTH), np.uint8)
+    for x in xs:
+        cv2.line(binary, (x, 0), (x, HEIGHT - 1), 255, 8)
+    if y is not None:
+        cv2.line(binary, (0, y), (WIDTH - 1, y), 255, 8)
+    return binary
+
+
+def test_acquires_line_closest_to_centre():
+    tracker = line_tracker.GroutTracker()
+    hline, vline = tracker.update(frame(xs=(150, 340)), horizontal=False)
+    assert hline is None
+    assert abs(vline[0] - 340) <= 3
+    assert tracker.vline_track.active
+
+
+def test_follows_moving_line_with_band_search():
+    tracker = line_tracker.GroutTracker()
+    tracker.update(frame(xs=(300,)), horizontal=False)
+    for x in range(304, 340, 4):
+        _, vline = tracker.update(frame(xs=(x,)), horizontal=False)
+        assert abs(vline[0] - x) <= 4
+    assert tracker.band_searches > 0
+
+
+def test_coasts_for_max_missed_frames_then_reports_none():
+    tracker = line_tracker.GroutTracker()
+    tracker.update(frame(xs=(320,)), horizontal=False)
+    tracker.update(frame(xs=(320,)), horizontal=False)
+
+    empty = frame()
+    for _ in range(line_tracker.MAX_MISSED):
+        _, vline = tracker.update(empty, horizontal=False)
+        # Linia prezisa ramane pe loc
+        assert vline is not None and abs(vline[0] - 320) <= 3
+
+    _, vline = tracker.update(empty, horizontal=False)
+    assert vline is None
+    assert not tracker.vline_track.active
+
+
+def test_measurement_resets_missed_count():
+    tracker = line_tracker.GroutTracker()
+    tracker.update(frame(xs=(320,)), horizontal=False)
+    for _ in range(line_tracker.MAX_MISSED):
+        tracker.update(frame(), horizontal=False)
+    _, vline = tracker.update(frame(xs=(320,)), horizontal=False)
+    assert vline is not None
+    assert tracker.vline_track.missed == 0
+
+
+def test_unwanted_line_is_not_tracked():
+    tracker = line_tracker.GroutTracker()
+    hline, vline = tracker.update(frame(xs=(320,), y=240))
+    assert hline is not None and vline is not None
+    hline, vline = tracker.update(frame(xs=(320,), y=240), horizontal=False)
+    assert hline is None
+    assert not tracker.hline_track.active
+
+
+def test_reset_forgets_tracks():
+    tracker = line_tracker.GroutTracker()
+    tracker.update(frame(xs=(320,)), horizontal=False)
+    tracker.reset()
+    assert not tracker.vline_track.active
+    _, vline = tracker.update(frame(), horizontal=False)
+    assert vline is None
@@ -0,0 +1,108 @@
+# Testele hartii pentru dashboard: diferentele ferestrei, mutarea ei (shift) si keyframe-urile
+import json
+
+import pytest
+
+import map_service
+
+
+# Clientul MQTT simulat: retine mesajele publicate
+class RecordingClient():
+    def __init__(self):
+        self.published = []
+
+    def publish(self, topic, payload):
+        self.published.append((topic, payload))
+
+    def messages(self, topic=map_service.TOPIC):
+        return [json.loads(payload) for name, payload in self.published if name == topic]
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    # Fiecare test porneste ca un dashboard abia conectat
+    for name, value in (("last_map", None), ("last_origin", None), ("last_cells", None),
+                        ("last_robot", None), ("last_legacy", None), ("last_key", None),
+                        ("last_keyframe", 0.0), ("keyframe_requested", True), ("seq", 0),
+                        ("messages", 0), ("bytes_sent", 0), ("viewport_size", 3), ("zoom", 1)):
+        monkeypatch.setattr(map_service, name, value)
+
+
+def test_delta_without_shift_lists_changed_cells(monkeypatch):
+    monkeypatch.setattr(map_service, "last_origin", (0, 0))
+    monkeypatch.setattr(map_service, "last_cells", list("000000000"))
+    message = map_service.delta((0, 0), list("000020001"), 3, 1)
+    assert "shift" not in message
+    assert message["cells"] == [[4, "2"], [8, "1"]]
+
+
+def test_delta_with_shift_reuses_cells_the_dashboard_has(monkeypatch):
+    # Fereastra veche, cu originea (0, 0):
+    #   a b c
+    #   d e f
+    #   g h i
+    monkeypatch.setattr(map_service, "last_origin", (0, 0))
+    monkeypatch.setattr(map_service, "last_cells", list("abcdefghi"))
+    # Fereastra s-a mutat cu o celula la dreapta: coloanele b c / e f / h i raman, apare o coloana noua
+    message = map_service.delta((1, 0), list("bcXefYhiZ"), 3, 1)
+    assert message["shift"] == [1, 0]
+    assert (message["x0"], message["y0"]) == (1, 0)
+    assert message["cells"] == [[2, "X"], [5, "Y"], [8, "Z"]]
+
+
+def test_delta_shift_up_with_zoom(monkeypatch):
+    monkeypatch.setattr(map_service, "last_origin", (4, 4))
+    monkeypatch.setattr(map_service, "last_cells", list("abcdefghi"))
+    # La zoom 2 originea se muta cu cate un bloc (2 celule ale hartii)
+    message = map_service.delta((4, 2), list("XYZabcdef"), 3, 2)
+    assert message["shift"] == [0, -1]
+    assert message["cells"] == [[0, "X"], [1, "Y"], [2, "Z"]]
+
+
+def test_delta_unchanged_window_has_no_cells(monkeypatch):
+    monkeypatch.setattr(map_service, "last_origin", (0, 0))
+    monkeypatch.setattr(map_service, "last_cells", list("012012012"))
+    assert map_service.delta((0, 0), list("012012012"), 3, 1) == {"seq": 0, "key": False}
+
+
+def test_viewport_origin_is_aligned_to_zoom_blocks():
+    assert map_service.viewport_origin(10, 10, 3, 1) == (9, 9)
+    assert map_service.viewport_origin(10, 10, 3, 2) == (8, 8)
+    assert map_service.viewport_origin(11, 11, 3, 2) == (8, 8)
+
+
+def test_block_value_prefers_obstacles_and_marks_outside():
+    grid = [[0, 1], [3, 2]]
+    assert map_service.block_value(grid, 0, 0, 2) == "2"
+    assert map_service.block_value(grid, 0, 0, 1) == "0"
+    assert map_service.block_value(grid, 5, 5, 1) == map_service.OUTSIDE
+
+
+def test_publish_keyframe_then_shifted_delta():
+    client = RecordingClient()
+    grid = map_service.DetectionMap(8, 8)
+
+    map_service.publish(client, grid, 4, 4)
+    key = client.messages()[-1]
+    assert key["key"] is True
+    assert (key["x0"], key["y0"], key["size"]) == (3, 3, 3)
+    assert key["cells"] == "000000000"
+
+    # Robotul avanseaza o celula; o celula din fereastra este marcata
+    grid[3][5] = 1
+    map_service.publish(client, grid, 5, 4)
+    update = client.messages()[-1]
+    assert update["key"] is False
+    assert update["shift"] == [1, 0]
+    assert update["robot"] == [5, 4]
+    # Celula marcata si coloana noua (dashboard-ul nu o avea)
+    assert update["cells"] == [[1, "1"], [2, "0"], [5, "0"], [8, "0"]]
+
+
+def test_publish_skips_unchanged_map():
+    client = RecordingClient()
+    grid = map_service.DetectionMap(8, 8)
+    map_service.publish(client, grid, 4, 4)
+    count = len(client.published)
+    map_service.publish(client, grid, 4, 4)
+    assert len(client.published) == count
@@ -0,0 +1,82 @@
+# Testele modului perie: viziunea ceruta de stari si folosirea liniilor urmarite
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+import line_tracker
+import mode_smart_perie_autonom as perie
+import motor_service
+from vision_frame import Needs, VisionFrame
+
+WIDTH, HEIGHT = 640, 480
+
+
+# Frame color cu un rost vertical alb la x si unul orizontal la y (sau fara rosturi)
+def frame(x=None, y=None):
+    image = np.zeros((HEIGHT, WIDTH, 3), np.uint8)
+    if x is not None:
+        cv2.line(image, (x, 0), (x, HEIGHT - 1), (255, 255, 255), 8)
+    if y is not None:
+        cv2.line(image, (0, y), (WIDTH - 1, y), (255, 255, 255), 8)
+    return image
+
+
+@pytest.fixture
+def mode(monkeypatch):
+    monkeypatch.setattr(perie, "state", perie.RobotState())
+    monkeypatch.setattr(perie, "tracker", line_tracker.GroutTracker())
+    # Pachetele Pico nu exista in teste
+    monkeypatch.setattr(perie.pico_to_pi_service, "receive", lambda: None)
+    return perie.state
+
+
+def test_needs_stay_the_state_needs_during_the_wait(mode):
+    mode.wait_timer = time.time() + 10
+    assert perie.get_needs() == perie.state_needs[perie.States.MOVE_FORWARD]
+
+
+def test_tracker_survives_the_wait_after_a_transition(mode):
+    mode.wait_timer = time.time() + 10
+    for _ in range(3):
+        perie.run(VisionFrame(1, 0.0, frame(320, 400)))
+    # Starea nu a rulat in asteptare, dar linia este urmarita in continuare
+    assert mode.state is perie.States.MOVE_FORWARD
+    assert perie.tracker.vline_track.active and perie.tracker.hline_track.active
+    # Dupa achizitie liniile sunt masurate in banda, fara alta cautare pe toata imaginea
+    assert perie.tracker.full_searches == 1
+    assert perie.tracker.band_searches == 4
+
+
+@pytest.fixture
+def stops(monkeypatch, mode):
+    stops = []
+    monkeypatch.setattr(motor_service, "stop", lambda: stops.append(True))
+    # Doar oprirea din run_lines: handler-ele starilor nu ruleaza
+    monkeypatch.setattr(mode, "run", lambda frame, hline, vline: None)
+    return stops
+
+
+def test_motors_stop_when_no_line_is_tracked(stops):
+    perie.run_lines(None, None, None, Needs.LINES)
+    assert stops == [True]
+
+
+def test_motors_keep_running_when_lines_are_not_needed(stops):
+    perie.run_lines(None, None, None, Needs.NONE)
+    assert stops == []
+
+
+def test_predicted_line_keeps_motors_running_for_max_missed_frames(stops):
+    perie.run(VisionFrame(1, 0.0, frame(320)))
+    assert stops == []
+
+    # Frame-uri fara rost: linia prezisa este folosita MAX_MISSED frame-uri
+    for _ in range(line_tracker.MAX_MISSED):
+        perie.run(VisionFrame(2, 0.0, frame()))
+    assert stops == []
+
+    # Apoi linia este pierduta si motoarele se opresc
+    perie.run(VisionFrame(3, 0.0, frame()))
+    assert stops == [True]
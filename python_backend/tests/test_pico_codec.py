@@ -0,0 +1,182 @@
+# Testele decodorului de telemetrie: resincronizarea, CRC-ul, pachetele incomplete,
+# numararea pachetelor pierdute si validarea structurala a pachetelor v1
+import struct
+from binascii import crc_hqx
+
+import pico_codec
+
+
+# Construieste un pachet v1 (fara CRC)
+def v1(front=100.0, left=50.0, right=50.0, bools=(0, 1, 0), pos=(10, 20)):
+    return bytes([pico_codec.HEADER_V1]) + struct.pack("<fff", front, left, right) + bytes(bools) + struct.pack("<ll", *pos)
+
+
+# Adauga CRC-ul peste header si date
+def with_crc(body):
+    return body + pico_codec.CRC.pack(crc_hqx(body, 0xFFFF))
+
+
+# Construieste un pachet v2 cu numarul de ordine dat
+def v2(seq, micros=1000, front=100.0, left=50.0, right=50.0, bools=(0, 1, 0), pos=(10, 20)):
+    body = bytes([pico_codec.HEADER_V2]) + struct.pack("<HIfff", seq, micros, front, left, right) \
+        + bytes(bools) + struct.pack("<ll", *pos)
+    return with_crc(body)
+
+
+def ack(version=2, baud_code=1, period=10):
+    return with_crc(bytes([pico_codec.HEADER_ACK]) + pico_codec.ACK.pack(version, baud_code, period))
+
+
+def test_packet_sizes():
+    assert len(v1()) == pico_codec.PACKET_SIZE_V1 == 24
+    assert len(v2(0)) == pico_codec.PACKET_SIZE_V2 == 32
+
+
+def test_check_crc():
+    packet = bytearray(v2(7))
+    view = memoryview(packet)
+    assert pico_codec.check_crc(view, 0, len(packet))
+    packet[5] ^= 0x01
+    assert not pico_codec.check_crc(view, 0, len(packet))
+
+
+def test_check_crc_at_offset():
+    data = b"\x00\x00\x00" + v2(1)
+    assert pico_codec.check_crc(memoryview(data), 3, pico_codec.PACKET_SIZE_V2)
+
+
+def test_decode_v2_values():
+    decoder = pico_codec.Decoder()
+    packets = decoder.feed(v2(5, micros=123456, front=12.5, bools=(1, 0, 1), pos=(-3, 4)))
+    assert packets == [(5, 123456, 12.5, 50.0, 50.0, True, False, True, -3, 4)]
+    assert decoder.length == 0
+
+
+def test_decode_v1_values():
+    decoder = pico_codec.Decoder()
+    packets = decoder.feed(v1(front=30.0) + v1(front=40.0))
+    assert [p[2] for p in packets] == [30.0, 40.0]
+    assert packets[0][:2] == (None, None)
+
+
+def test_decode_at_reports_incomplete_packets():
+    decoder = pico_codec.Decoder()
+    packet = v2(1)
+    assert decoder.feed(packet[:20]) == []
+    assert decoder.decode_at(0) == 0
+    assert decoder.length == 20
+    # Restul pachetului completeaza decodarea
+    assert len(decoder.feed(packet[20:])) == 1
+    assert decoder.bad_frames == 0
+
+
+def test_decode_at_rejects_bad_crc():
+    decoder = pico_codec.Decoder()
+    packet = bytearray(v2(1))
+    packet[10] ^= 0xFF
+    decoder.view[0:len(packet)] = packet
+    decoder.length = len(packet)
+    assert decoder.decode_at(0) is None
+
+
+def test_bad_crc_packet_is_dropped_and_next_one_decoded():
+    decoder = pico_codec.Decoder()
+    bad = bytearray(v2(1))
+    bad[-1] ^= 0xFF
+    packets = decoder.feed(bytes(bad) + v2(2))
+    assert [p[0] for p in packets] == [2]
+    assert decoder.bad_frames >= 1
+    assert decoder.resyncs == 1
+
+
+def test_truncated_v2_packet_followed_by_valid_one():
+    decoder = pico_codec.Decoder()
+    # Un pachet taiat la jumatate (octeti pierduti pe linie), apoi pachete intregi
+    packets = decoder.feed(v2(1)[:15] + v2(2) + v2(3))
+    assert [p[0] for p in packets] == [2, 3]
+    assert decoder.resyncs == 1
+    assert decoder.skipped_bytes >= 15
+
+
+def test_resync_on_leading_garbage():
+    decoder = pico_codec.Decoder()
+    packets = decoder.feed(b"\x00\x01\x02\xff\x10" + v2(1))
+    assert [p[0] for p in packets] == [1]
+    assert decoder.skipped_bytes == 5
+    assert decoder.resyncs == 1
+    # Octetii fara header nu sunt numarati ca pachete invalide
+    assert decoder.bad_frames == 0
+
+
+def test_resync_across_feeds():
+    decoder = pico_codec.Decoder()
+    assert decoder.feed(b"\x99\x98") == []
+    assert [p[0] for p in decoder.feed(v2(9))] == [9]
+
+
+def test_lost_packets_are_counted():
+    decoder = pico_codec.Decoder()
+    decoder.feed(v2(1) + v2(2) + v2(5))
+    assert decoder.lost == 2
+    assert decoder.last_seq == 5
+
+
+def test_sequence_wraps_around():
+    decoder = pico_codec.Decoder()
+    decoder.feed(v2(0xFFFE) + v2(0xFFFF) + v2(0) + v2(2))
+    assert decoder.lost == 1
+
+
+def test_v1_packets_do_not_count_losses():
+    decoder = pico_codec.Decoder()
+    decoder.feed(v1() + v1() + v1())
+    assert decoder.lost == 0
+    assert decoder.last_seq is None
+
+
+def test_v1_rejects_invalid_bool():
+    decoder = pico_codec.Decoder()
+    packets = decoder.feed(v1(bools=(0, 2, 0)) + v1(front=33.0))
+    assert [p[2] for p in packets] == [33.0]
+    assert decoder.bad_frames == 1
+
+
+def test_v1_rejects_out_of_range_and_nan_distances():
+    decoder = pico_codec.Decoder()
+    packets = decoder.feed(v1(front=-1.0) + v1(left=float("nan")) + v1(right=5000.0) + v1(front=20.0))
+    assert [p[2] for p in packets] == [20.0]
+    assert decoder.bad_frames == 3
+
+
+def test_v1_requires_header_after_packet():
+    decoder = pico_codec.Decoder()
+    packet = v1(front=25.0)
+    # Octetul de dupa pachet nu este un header: pachetul nu este acceptat
+    decoder.view[0:25] = packet + b"\x00"
+    decoder.length = 25
+    assert decoder.decode_at(0) is None
+    # Fara octeti dupa pachet, acesta este acceptat
+    decoder.length = 24
+    assert decoder.decode_at(0) == (24, (None, None, 25.0, 50.0, 50.0, False, True, False, 10, 20))
+
+
+def test_ack_is_decoded():
+    decoder = pico_codec.Decoder()
+    packets = decoder.feed(ack(version=3, baud_code=2, period=10) + v2(1))
+    assert decoder.ack == (3, 230400, 10)
+    assert [p[0] for p in packets] == [1]
+
+
+def test_ack_with_unknown_baud_code_is_rejected():
+    decoder = pico_codec.Decoder()
+    decoder.feed(ack(baud_code=len(pico_codec.BAUD_RATES)))
+    assert decoder.ack is None
+    assert decoder.bad_frames == 1
+
+
+def test_buffer_grows_for_large_feeds():
+    decoder = pico_codec.Decoder(size=64)
+    packets = decoder.feed(b"".join(v2(seq) for seq in range(10)))
+    assert len(packets) == 10
+    assert decoder.lost == 0
+    assert decoder.stats()["packets"] == 10
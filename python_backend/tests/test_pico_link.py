@@ -0,0 +1,138 @@
+# Testele legaturii cu Pico-ul: conectarea in fundal si reconectarea dupa disparitia portului
+import threading
+import time
+
+import pytest
+import serial
+
+import pico_link
+import shared
+
+TIMEOUT = 5.0
+
+
+# Portul serial deschis de pico_link (doar inchiderea conteaza aici)
+class FakePort():
+    def __init__(self, name):
+        self.port = name
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+# Porturile prezente in sistem; testul le scoate si le pune la loc
+class FakeSystem():
+    def __init__(self):
+        self.present = set()
+        self.opened = []
+
+    def find_port(self):
+        return min(self.present) if self.present else None
+
+    def open_port(self, name):
+        if name not in self.present:
+            raise serial.SerialException("could not open port %s" % name)
+        port = FakePort(name)
+        self.opened.append(port)
+        return port
+
+
+@pytest.fixture
+def system(monkeypatch):
+    system = FakeSystem()
+    monkeypatch.setattr(pico_link, "find_port", system.find_port)
+    monkeypatch.setattr(pico_link, "open_port", system.open_port)
+    monkeypatch.setattr(pico_link, "RETRY_MIN", 0.01)
+    monkeypatch.setattr(pico_link, "RETRY_MAX", 0.05)
+    monkeypatch.setattr(shared, "pico", None)
+    # Starea legaturii o ia de la zero, fara callback-urile celorlalte module
+    monkeypatch.setattr(pico_link, "state", "disconnected")
+    monkeypatch.setattr(pico_link, "connected", threading.Event())
+    monkeypatch.setattr(pico_link, "wake", threading.Event())
+    monkeypatch.setattr(pico_link, "on_open", [])
+    monkeypatch.setattr(pico_link, "on_connect", [])
+    monkeypatch.setattr(pico_link, "on_disconnect", [])
+    monkeypatch.setattr(pico_link, "connects", 0)
+    monkeypatch.setattr(pico_link, "disconnects", 0)
+    monkeypatch.setattr(pico_link, "connected_since", None)
+    monkeypatch.setattr(pico_link, "disconnected_since", time.time())
+    monkeypatch.setattr(pico_link, "last_downtime", None)
+    monkeypatch.setattr(pico_link, "last_error", None)
+    monkeypatch.setattr(pico_link, "running", False)
+    monkeypatch.setattr(pico_link, "thread", None)
+    yield system
+    pico_link.stop()
+    pico_link.thread.join(TIMEOUT)
+
+
+# Asteapta pana cand firul legaturii ajunge in starea ceruta
+def wait_for(condition):
+    for _ in range(int(TIMEOUT / 0.01)):
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_connects_when_the_port_appears(system):
+    pico_link.start()
+    # Fara Pico backend-ul porneste oricum; firul reincearca in fundal
+    assert wait_for(lambda: pico_link.last_error == "Pico not found")
+    assert not pico_link.connected.is_set()
+
+    system.present.add("/dev/ttyACM0")
+    assert pico_link.connected.wait(TIMEOUT)
+    assert shared.pico is system.opened[0]
+    assert pico_link.stats()["port"] == "/dev/ttyACM0"
+
+
+def test_reconnects_after_the_port_disappears(system):
+    events = []
+    pico_link.on_connect.append(lambda port: events.append(("connect", port)))
+    pico_link.on_disconnect.append(lambda port: events.append(("disconnect", port)))
+
+    system.present.add("/dev/ttyACM0")
+    pico_link.start()
+    assert pico_link.connected.wait(TIMEOUT)
+    assert wait_for(lambda: len(events) == 1)
+    first = shared.pico
+
+    # Brown-out: portul dispare, iar cititorul raporteaza eroarea
+    system.present.clear()
+    pico_link.lost(first, OSError("device disconnected"))
+    assert shared.pico is None
+    assert first.closed
+    assert not pico_link.connected.is_set()
+    # O a doua raportare a aceleiasi erori (de la scriitor) este ignorata
+    pico_link.lost(first, OSError("device disconnected"))
+    assert pico_link.disconnects == 1
+
+    # Pico-ul revine pe alt port (ttyACM1 in loc de ttyACM0)
+    assert wait_for(lambda: pico_link.last_error == "Pico not found")
+    system.present.add("/dev/ttyACM1")
+    assert pico_link.connected.wait(TIMEOUT)
+    assert wait_for(lambda: len(events) == 3)
+
+    second = shared.pico
+    assert second is not first and second.port == "/dev/ttyACM1"
+    assert events == [("connect", first), ("disconnect", first), ("connect", second)]
+    assert pico_link.stats()["connects"] == 2
+    assert pico_link.stats()["last_downtime_s"] is not None
+
+
+def test_failed_negotiation_closes_the_port_and_retries(system):
+    attempts = []
+
+    def negotiate(port):
+        attempts.append(port)
+        if len(attempts) == 1:
+            raise serial.SerialException("no answer")
+    pico_link.on_open.append(negotiate)
+
+    system.present.add("/dev/ttyACM0")
+    pico_link.start()
+    assert pico_link.connected.wait(TIMEOUT)
+    assert len(attempts) == 2
+    assert attempts[0].closed
+    assert shared.pico is attempts[1]
@@ -0,0 +1,155 @@
+# Testele planificatorului: ordinea sarcinilor scadente si contorizarea depasirilor
+import scheduler
+
+
+# Ceas controlat de test; o sarcina il poate avansa ca sa simuleze o rulare lunga
+class FakeClock():
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_due_tasks_run_in_priority_order():
+    clock = FakeClock()
+    loop = scheduler.Scheduler(clock=clock)
+    order = []
+    loop.add("low", lambda: order.append("low"), rate=10, priority=5)
+    loop.add("high", lambda: order.append("high"), rate=10, priority=0)
+    loop.add("mid", lambda: order.append("mid"), rate=10, priority=2)
+
+    loop.run_pending()
+    assert order == ["high", "mid", "low"]
+
+
+def test_only_due_tasks_run():
+    clock = FakeClock()
+    loop = scheduler.Scheduler(clock=clock)
+    runs = []
+    loop.add("fast", lambda: runs.append("fast"), rate=100, priority=0)
+    loop.add("slow", lambda: runs.append("slow"), rate=10, priority=1)
+
+    loop.run_pending()
+    runs.clear()
+
+    # Dupa 10 ms doar sarcina de 100 Hz este scadenta
+    clock.now += 0.01
+    delay = loop.run_pending()
+    assert runs == ["fast"]
+    assert abs(delay - 0.01) < 1e-9
+
+    # La 100 ms ambele, tot in ordinea prioritatii
+    runs.clear()
+    clock.now += 0.09
+    loop.run_pending()
+    assert runs == ["fast", "slow"]
+
+
+def test_run_pending_returns_time_to_next_deadline():
+    clock = FakeClock()
+    loop = scheduler.Scheduler(clock=clock)
+    loop.add("a", lambda: None, rate=4, priority=0)
+    loop.add("b", lambda: None, rate=20, priority=1)
+
+    assert abs(loop.run_pending() - 0.05) < 1e-9
+
+
+def test_fixed_rate_keeps_cadence_without_overrun():
+    clock = FakeClock()
+    loop = scheduler.Scheduler(clock=clock)
+    task = loop.add("tick", lambda: None, rate=10)
+
+    loop.run_pending()
+    # Rulata cu 20 ms intarziere: urmatorul termen ramane pe grila de 100 ms
+    clock.now += 0.12
+    loop.run_pending()
+    assert task.runs == 2
+    assert task.overruns == 0
+    assert abs(task.next_run - 100.2) < 1e-9
+    assert abs(task.max_lateness - 0.02) < 1e-9
+
+
+def test_missed_period_counts_an_overrun_and_skips_ahead():
+    clock = FakeClock()
+    loop = scheduler.Scheduler(clock=clock)
+    task = loop.add("tick", lambda: None, rate=10)
+
+    loop.run_pending()
+    # Bucla a stat 350 ms: un singur apel, o depasire, termenul mutat dupa momentul curent
+    clock.now += 0.35
+    loop.run_pending()
+    assert task.runs == 2
+    assert task.overruns == 1
+    assert abs(task.next_run - (clock.now + 0.1)) < 1e-9
+
+
+def test_slow_task_counts_an_overrun():
+    clock = FakeClock()
+    loop = scheduler.Scheduler(clock=clock)
+
+    # Sarcina dureaza mai mult decat perioada ei
+    def slow():
+        clock.now += 0.15
+
+    task = loop.add("slow", slow, rate=10)
+    loop.run_pending()
+    assert task.overruns == 1
+    assert loop.stats()["slow"]["overruns"] == 1
+
+
+def test_notify_makes_task_due_immediately():
+    clock = FakeClock()
+    loop = scheduler.Scheduler(clock=clock)
+    runs = []
+    task = loop.add("frame", lambda: runs.append(clock.now), rate=1)
+
+    loop.run_pending()
+    clock.now += 0.2
+    loop.notify("frame")
+    loop.run_pending()
+    assert runs == [100.0, 100.2]
+    # Dupa o notificare ritmul reporneste de la momentul rularii
+    assert abs(task.next_run - 101.2) < 1e-9
+    assert task.overruns == 0
+
+
+def test_notify_during_run_is_not_lost():
+    clock = FakeClock()
+    loop = scheduler.Scheduler(clock=clock)
+    runs = []
+
+    # Un frame nou soseste in timpul procesarii celui curent
+    def vision():
+        runs.append(clock.now)
+        if len(runs) == 2:
+            loop.notify("vision")
+        clock.now += 0.01
+
+    task = loop.add("vision", vision, rate=1)
+    loop.run_pending()
+    clock.now += 0.2
+    loop.notify("vision")
+    loop.run_pending()
+    assert len(runs) == 2
+
+    # Notificarea din timpul rularii face sarcina scadenta imediat, nu dupa o perioada
+    assert task.pending
+    assert loop.run_pending() >= 0
+    assert len(runs) == 3
+    assert not task.pending
+
+
+def test_pending_notification_makes_the_delay_zero():
+    clock = FakeClock()
+    loop = scheduler.Scheduler(clock=clock)
+    loop.add("frame", lambda: None, rate=1, priority=0)
+    # O sarcina rulata dupa "frame" in aceeasi trecere o notifica
+    loop.add("camera", lambda: loop.notify("frame"), rate=1, priority=1)
+
+    # Bucla nu trebuie sa doarma pana la urmatorul termen
+    assert loop.run_pending() == 0.0
+    assert loop.tasks[0].pending
+    loop.notify("camera")
+    loop.run_pending()
+    assert loop.tasks[0].runs == 2
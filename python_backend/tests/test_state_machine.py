@@ -0,0 +1,166 @@
+# Testele motorului masinilor de stari: tranzitiile declarate, starea de rezerva,
+# timpul petrecut in fiecare stare, hook-urile si limita urmei
+import json
+from enum import Enum
+
+import pytest
+
+import state_machine
+
+
+class States(Enum):
+    IDLE = 0
+    MOVE = 1
+    TURN = 2
+    ERROR = 3
+
+
+# Obiectul modului: cate o metoda pentru fiecare stare
+class Owner():
+    def IDLE(self):
+        return "idle"
+
+    def MOVE(self):
+        return "move"
+
+    def TURN(self):
+        return "turn"
+
+    def ERROR(self):
+        return "error"
+
+
+TRANSITIONS = {
+    States.IDLE: (States.MOVE,),
+    States.MOVE: (States.TURN, States.IDLE),
+    States.TURN: (States.MOVE,),
+    States.ERROR: (States.IDLE,),
+}
+
+
+# Ceasul masinii (inlocuieste modulul time din state_machine)
+class FakeTime():
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+class RecordingClient():
+    def __init__(self):
+        self.published = []
+
+    def publish(self, topic, payload):
+        self.published.append((topic, payload))
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeTime()
+    monkeypatch.setattr(state_machine, "time", fake)
+    monkeypatch.setattr(state_machine, "machines", {})
+    return fake
+
+
+def make(fallback=States.ERROR, **hooks):
+    return state_machine.StateMachine("test", Owner(), TRANSITIONS, States.IDLE, fallback=fallback, **hooks)
+
+
+def test_initial_state_and_handler(clock):
+    machine = make()
+    assert machine.state is States.IDLE
+    assert machine.handler() == "idle"
+    assert state_machine.machines["test"] is machine
+
+
+def test_declared_transition(clock):
+    machine = make()
+    assert machine.transition(States.MOVE) is True
+    assert machine.state is States.MOVE
+    assert machine.handler() == "move"
+    assert machine.counts[(States.IDLE, States.MOVE)] == 1
+    assert machine.invalid == 0
+
+
+def test_undeclared_transition_goes_to_fallback(clock):
+    machine = make()
+    assert machine.transition(States.TURN) is False
+    assert machine.state is States.ERROR
+    assert machine.handler() == "error"
+    assert machine.invalid == 1
+    # Tranzitia ceruta nu este numarata, dar apare in urma cu starea in care a ajuns masina
+    assert sum(machine.counts.values()) == 0
+    assert machine.trace[-1][1:3] == (States.IDLE, States.ERROR)
+
+
+def test_fallback_defaults_to_initial_state(clock):
+    machine = make(fallback=None)
+    machine.transition(States.MOVE)
+    machine.transition(States.ERROR)
+    assert machine.state is States.IDLE
+
+
+def test_time_in_state(clock):
+    machine = make()
+    clock.now += 2.0
+    machine.transition(States.MOVE)
+    clock.now += 0.5
+    machine.transition(States.TURN)
+    clock.now += 1.25
+    machine.transition(States.MOVE)
+    clock.now += 3.0
+
+    assert machine.time_in_state[States.IDLE] == pytest.approx(2.0)
+    assert machine.time_in_state[States.MOVE] == pytest.approx(0.5)
+    assert machine.time_in_state[States.TURN] == pytest.approx(1.25)
+
+    stats = machine.stats()
+    # Starea curenta include si timpul de la ultima intrare
+    assert stats["state"] == "MOVE"
+    assert stats["in_state_s"] == pytest.approx(3.0)
+    assert stats["time_in_state_s"]["MOVE"] == pytest.approx(3.5)
+    assert stats["running_s"] == pytest.approx(6.75)
+    assert stats["transitions"] == {"IDLE->MOVE": 1, "MOVE->TURN": 1, "TURN->MOVE": 1}
+
+
+def test_trace_records_time_spent(clock):
+    machine = make()
+    clock.now += 1.5
+    machine.transition(States.MOVE)
+    assert machine.trace[-1] == (1001.5, States.IDLE, States.MOVE, 1.5)
+
+
+def test_trace_is_bounded(clock):
+    machine = make()
+    for _ in range(state_machine.TRACE_SIZE):
+        machine.transition(States.MOVE)
+        machine.transition(States.IDLE)
+    assert len(machine.trace) == state_machine.TRACE_SIZE
+    assert machine.counts[(States.IDLE, States.MOVE)] == state_machine.TRACE_SIZE
+    assert len(machine.stats()["trace"]) == state_machine.TRACE_SIZE
+
+
+def test_hooks_run_around_the_transition(clock):
+    calls = []
+    machine = make(on_exit={States.IDLE: lambda: calls.append(("exit", machine.state))},
+                   on_enter={States.MOVE: lambda: calls.append(("enter", machine.state))})
+    machine.transition(States.MOVE)
+    assert calls == [("exit", States.IDLE), ("enter", States.MOVE)]
+
+
+def test_publish_trace(clock):
+    make()
+    other = state_machine.StateMachine("other", Owner(), TRANSITIONS, States.MOVE)
+    other.transition(States.TURN)
+    client = RecordingClient()
+
+    state_machine.publish_trace(client)
+    topic, payload = client.published[-1]
+    assert topic == state_machine.TOPIC
+    assert set(json.loads(payload)) == {"test", "other"}
+
+    state_machine.publish_trace(client, "other")
+    selected = json.loads(client.published[-1][1])
+    assert list(selected) == ["other"]
+    assert selected["other"]["trace"][0][1:3] == ["MOVE", "TURN"]
@@ -0,0 +1,133 @@
+# Testele codificarii telemetriei: mastile de diferente, keyframe-urile si formatul binar
+import json
+
+import pytest
+
+import telemetry_service
+
+ALL_FIELDS = (1 << len(telemetry_service.FIELDS)) - 1
+MODE = telemetry_service.FIELD_INDEX["mode"]
+STATE = telemetry_service.FIELD_INDEX["state"]
+
+
+# Un esantion: us_front, us_left, us_right, flags, motor_a_pos, motor_b_pos, mode, state, loop_hz, age_ms
+def values(front=40, flags=0, pos_a=0, mode=0, state=255):
+    return (front, 50, 50, flags, pos_a, 0, mode, state, 0, 0)
+
+
+@pytest.fixture
+def encoding(monkeypatch):
+    def use(name):
+        monkeypatch.setattr(telemetry_service, "encoding", name)
+    monkeypatch.setattr(telemetry_service, "seq", 7)
+    return use
+
+
+def test_changed_mask():
+    previous = values()
+    assert telemetry_service.changed_mask(previous, None) == ALL_FIELDS
+    assert telemetry_service.changed_mask(previous, previous) == 0
+    mask = telemetry_service.changed_mask(values(front=41, pos_a=3), previous)
+    assert mask == (1 << 0) | (1 << telemetry_service.FIELD_INDEX["motor_a_pos"])
+
+
+def test_keyframe_first_sample_is_complete(encoding):
+    encoding("json")
+    previous = values()
+    text, binary = telemetry_service.encode([(100.0, values()), (100.1, values(front=41))], True, previous)
+    message = json.loads(text)
+    assert binary is None
+    assert message["key"] is True
+    assert message["seq"] == 7
+    first, second = message["samples"]
+    # Keyframe: toate campurile, chiar daca esantionul este identic cu cel anterior
+    assert first["t"] == 0
+    assert {"us_front", "us_left", "motor_a_pos", "ir_scari", "mode", "state"} <= first.keys()
+    # Esantionul urmator contine doar campul schimbat
+    assert second == {"t": 100, "us_front": 41}
+
+
+def test_delta_skips_unchanged_samples(encoding):
+    encoding("json")
+    previous = values()
+    samples = [(10.0, values()), (10.1, values()), (10.2, values(flags=0b101))]
+    message = json.loads(telemetry_service.encode(samples, False, previous)[0])
+    assert message["key"] is False
+    assert message["samples"] == [{"t": 200, "ir_scari": True, "ir_aspirator": False, "senzor_umid": True}]
+
+
+def test_mode_change_includes_state(encoding):
+    encoding("json")
+    previous = values(mode=0, state=255)
+    # Aceeasi valoare a starii, dar in alt mod: numele starii se schimba
+    message = json.loads(telemetry_service.encode([(0.0, values(mode=1, state=255))], False, previous)[0])
+    assert message["samples"] == [{"t": 0, "mode": "aspirare", "state": None}]
+
+
+def test_binary_delta_layout(encoding):
+    encoding("binary")
+    previous = values()
+    text, binary = telemetry_service.encode([(5.0, values()), (5.05, values(front=300))], False, previous)
+    assert text is None
+
+    version, flags, seq, t0, count = telemetry_service.HEADER.unpack_from(binary, 0)
+    assert (version, flags, seq, t0, count) == (telemetry_service.BINARY_VERSION, 0, 7, 5.0, 1)
+
+    offset = telemetry_service.HEADER.size
+    t, mask = telemetry_service.SAMPLE_HEADER.unpack_from(binary, offset)
+    assert (t, mask) == (50, 1)
+    offset += telemetry_service.SAMPLE_HEADER.size
+    assert telemetry_service.FIELD_STRUCTS[0].unpack_from(binary, offset) == (300,)
+    assert len(binary) == offset + telemetry_service.FIELD_STRUCTS[0].size
+
+
+def test_binary_keyframe_contains_every_field(encoding):
+    encoding("binary")
+    _, binary = telemetry_service.encode([(1.0, values(pos_a=-5, mode=2, state=3))], True, values())
+    _, flags, _, _, count = telemetry_service.HEADER.unpack_from(binary, 0)
+    assert flags == 1 and count == 1
+
+    offset = telemetry_service.HEADER.size
+    _, mask = telemetry_service.SAMPLE_HEADER.unpack_from(binary, offset)
+    assert mask == ALL_FIELDS
+    offset += telemetry_service.SAMPLE_HEADER.size
+    decoded = []
+    for field in telemetry_service.FIELD_STRUCTS:
+        decoded.append(field.unpack_from(binary, offset)[0])
+        offset += field.size
+    assert tuple(decoded) == values(pos_a=-5, mode=2, state=3)
+    assert offset == len(binary)
+
+
+def test_both_encodings(encoding):
+    encoding("both")
+    text, binary = telemetry_service.encode([(0.0, values(front=12))], False, values())
+    assert json.loads(text)["samples"] == [{"t": 0, "us_front": 12}]
+    assert telemetry_service.HEADER.unpack_from(binary, 0)[4] == 1
+
+
+# Client MQTT care refuza publicarea (ex. broker cazut)
+class FailingClient():
+    def __init__(self):
+        self.calls = 0
+
+    def publish(self, topic, payload, retain=False):
+        self.calls += 1
+        raise OSError("broker unreachable")
+
+
+def test_publish_error_is_logged_and_publishing_continues(encoding, monkeypatch, caplog):
+    encoding("json")
+    client = FailingClient()
+    monkeypatch.setattr(telemetry_service.mqtt_service, "client", client)
+    monkeypatch.setattr(telemetry_service, "sample", values)
+    monkeypatch.setattr(telemetry_service, "sample_rate", 10.0)
+    monkeypatch.setattr(telemetry_service, "publish_rate", 2.0)
+    monkeypatch.setattr(telemetry_service, "pending", [])
+
+    # 5 esantioane pe mesaj: doua mesaje esuate, fara exceptie in firul publicarii
+    for _ in range(10):
+        telemetry_service.publish_step()
+    assert client.calls == 2
+    assert telemetry_service.pending == []
+    assert caplog.text.count("telemetry step failed") == 2
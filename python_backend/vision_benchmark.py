@@ -0,0 +1,252 @@
+# Benchmark pentru detectia liniilor de rost: latenta pe etape si acuratete
+#
+# Utilizare:
+#   python vision_benchmark.py                         - suita implicita de gresie sintetica
+#   python vision_benchmark.py --rotation 5 --noise 20 - un singur caz sintetic
+#   python vision_benchmark.py --frames "img/*.jpg"    - imagini inregistrate (doar latenta)
+#   python vision_benchmark.py --frames sesiune.rec    - frame-urile dintr-o sesiune (session_recorder)
+#   python vision_benchmark.py --output rezultate.jsonl
+#
+# Fiecare caz produce o linie JSON cu parametrii, timpii pe etape (ms) si,
+# pentru imaginile sintetice, eroarea fata de liniile reale.
+import sys
+import json
+import glob
+import time
+import argparse
+# operatii pe array-uri
+import numpy as np
+# OpenCV pentru procesarea imaginilor
+import cv2
+# detectia si urmarirea liniilor de rost
+import line_detection
+import line_tracker
+import camera_service
+import session_recorder
+
+# Distanta maxima (pixeli) pentru ca o linie detectata sa fie considerata corecta
+MATCH_DISTANCE = 10
+
+
+# Parametrii unei imagini sintetice de gresie
+class TileFloor():
+    def __init__(self, tile_size=220, grout_width=10, contrast=120, rotation=0.0,
+                 noise=0.0, blur=0, shift_x=0.0, shift_y=0.0, seed=0):
+        self.tile_size = tile_size      # Latura unei placi (pixeli)
+        self.grout_width = grout_width  # Latimea rostului (pixeli)
+        self.contrast = contrast        # Diferenta de luminozitate rost - placa
+        self.rotation = rotation        # Rotatia gresiei fata de camera (grade)
+        self.noise = noise              # Deviatia standard a zgomotului gaussian
+        self.blur = blur                # Dimensiunea blur-ului gaussian (0 = fara)
+        self.shift_x = shift_x          # Deplasarea retelei fata de centrul imaginii
+        self.shift_y = shift_y
+        self.seed = seed
+
+    def params(self):
+        return dict(self.__dict__)
+
+    # Genereaza imaginea color (BGR) a gresiei
+    def render(self, width=camera_service.width, height=camera_service.height):
+        theta = np.deg2rad(self.rotation)
+        x = np.arange(width, dtype=np.float32) - width / 2
+        y = np.arange(height, dtype=np.float32)[:, None] - height / 2
+
+        # Coordonatele in sistemul gresiei (u de-a lungul randurilor, v de-a lungul coloanelor)
+        u = x * np.cos(theta) + y * np.sin(theta) - self.shift_x
+        v = -x * np.sin(theta) + y * np.cos(theta) - self.shift_y
+
+        half = self.grout_width / 2
+        grout = (np.abs(u - self.tile_size * np.round(u / self.tile_size)) <= half) | \
+                (np.abs(v - self.tile_size * np.round(v / self.tile_size)) <= half)
+
+        base = 128 - self.contrast / 2
+        image = np.where(grout, base + self.contrast, base).astype(np.float32)
+
+        if self.noise > 0:
+            image += np.random.default_rng(self.seed).normal(0, self.noise, image.shape).astype(np.float32)
+
+        image = np.clip(image, 0, 255).astype(np.uint8)
+
+        if self.blur > 0:
+            size = self.blur | 1
+            image = cv2.GaussianBlur(image, (size, size), 0)
+
+        return cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+
+    # Liniile reale, ca array-uri (offset, slope) in conventia din line_detection.fit_lines()
+    def ground_truth(self, width=camera_service.width, height=camera_service.height):
+        theta = np.deg2rad(self.rotation)
+        cos, sin = np.cos(theta), np.sin(theta)
+        diagonal = np.hypot(width, height)
+        k = np.arange(-int(diagonal // self.tile_size) - 1, int(diagonal // self.tile_size) + 2)
+
+        # Linii verticale: u = shift_x + k * tile -> x = cx + u / cos - (y - cy) * tan
+        u = self.shift_x + k * self.tile_size
+        vertical = np.column_stack((width / 2 + u / cos, np.full(len(k), -sin / cos)))
+        vertical = vertical[(vertical[:, 0] >= 0) & (vertical[:, 0] < width)]
+
+        # Linii orizontale: v = shift_y + k * tile -> y = cy + v / cos + (x - cx) * tan
+        v = self.shift_y + k * self.tile_size
+        horizontal = np.column_stack((height / 2 + v / cos, np.full(len(k), sin / cos)))
+        horizontal = horizontal[(horizontal[:, 0] >= 0) & (horizontal[:, 0] < height)]
+
+        return horizontal, vertical
+
+
+# Masoara durata apelului si returneaza (rezultat, milisecunde)
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+# Ruleaza etapele din mode_service / mode_smart_perie_autonom pe un frame
+def run_stages(frame):
+    timings = {}
+    gray, timings["gray"] = timed(cv2.cvtColor, frame, cv2.COLOR_BGR2GRAY)
+    (ret, binary), timings["threshold"] = timed(cv2.threshold, gray, line_detection.BINARY_THRESHOLD, 255, cv2.THRESH_BINARY)
+    binary, timings["blur"] = timed(cv2.blur, binary, line_detection.BLUR_SIZE)
+    segments, timings["hough"] = timed(line_detection.find_segments, binary)
+
+    height, width = binary.shape[:2]
+    start = time.perf_counter()
+    if segments is None:
+        hfit = vfit = np.empty((0, 5))
+    else:
+        classified, horizontal, vertical = line_detection.classify(segments)
+        hfit = line_detection.fit_lines(classified[horizontal], False, width, height)
+        vfit = line_detection.fit_lines(classified[vertical], True, width, height)
+    timings["classification"] = (time.perf_counter() - start) * 1000
+
+    # Tracker-ul: prima actualizare cauta pe toata imaginea, a doua doar in banda
+    tracker = line_tracker.GroutTracker()
+    tracker.update(binary)
+    tracked, timings["tracker_band"] = timed(tracker.update, binary)
+
+    timings["total_full_frame"] = sum(timings[name] for name in ("gray", "threshold", "blur", "hough", "classification"))
+    return timings, hfit, vfit, tracked
+
+
+# Compara liniile detectate cu cele reale: erori pentru linia principala si ratele de potrivire
+def score(detected, truth, vertical, width, height):
+    result = {"detected": int(len(detected)), "truth": int(len(truth))}
+    if len(truth) == 0:
+        return result
+
+    centre = width / 2 if vertical else height / 2
+    primary_truth = truth[np.argmin(np.abs(truth[:, 0] - centre))]
+
+    if len(detected) == 0:
+        result.update(primary_found=False, recall=0.0)
+        return result
+
+    # Fiecare linie detectata fata de cea mai apropiata linie reala
+    distance = np.abs(detected[:, line_detection.OFFSET][:, None] - truth[:, 0][None, :])
+    matched = distance.min(axis=1) <= MATCH_DISTANCE
+    recall = np.mean(distance.min(axis=0) <= MATCH_DISTANCE)
+
+    # Linia principala (cea folosita de masina de stari) fata de linia reala cea mai apropiata de centru
+    primary = detected[0]
+    offset_error = primary[line_detection.OFFSET] - primary_truth[0]
+    angle_error = np.degrees(np.arctan(primary[line_detection.SLOPE]) - np.arctan(primary_truth[1]))
+
+    result.update(
+        primary_found=bool(abs(offset_error) <= MATCH_DISTANCE),
+        offset_error_px=round(float(offset_error), 2),
+        angle_error_deg=round(float(angle_error), 3),
+        precision=round(float(np.mean(matched)), 3),
+        recall=round(float(recall), 3),
+    )
+    return result
+
+
+# Repeta etapele de mai multe ori si pastreaza mediana fiecarei etape
+def benchmark_frame(frame, repeat):
+    runs = [run_stages(frame) for _ in range(repeat)]
+    latency = {name: round(float(np.median([run[0][name] for run in runs])), 4) for name in runs[0][0]}
+    return latency, runs[-1]
+
+
+def benchmark_synthetic(floor, repeat):
+    frame = floor.render()
+    height, width = frame.shape[:2]
+    latency, (timings, hfit, vfit, tracked) = benchmark_frame(frame, repeat)
+    htruth, vtruth = floor.ground_truth(width, height)
+
+    return {
+        "source": "synthetic",
+        "params": floor.params(),
+        "latency_ms": latency,
+        "vertical": score(vfit, vtruth, True, width, height),
+        "horizontal": score(hfit, htruth, False, width, height),
+    }
+
+
+def benchmark_recorded(name, frame, repeat):
+    latency, (timings, hfit, vfit, tracked) = benchmark_frame(frame, repeat)
+    return {
+        "source": name,
+        "latency_ms": latency,
+        "vertical": {"detected": int(len(vfit))},
+        "horizontal": {"detected": int(len(hfit))},
+    }
+
+
+# Suita implicita: variaza pe rand fiecare parametru pornind de la un caz de baza
+def default_suite():
+    cases = [TileFloor()]
+    cases += [TileFloor(grout_width=w) for w in (4, 6, 16)]
+    cases += [TileFloor(contrast=c) for c in (40, 70)]
+    cases += [TileFloor(rotation=r) for r in (2, 5, 10, 20)]
+    cases += [TileFloor(noise=n, seed=i) for i, n in enumerate((10, 25, 40))]
+    cases += [TileFloor(blur=b) for b in (5, 9, 15)]
+    cases += [TileFloor(shift_x=sx, shift_y=sy) for sx, sy in ((60, 30), (-90, 100))]
+    cases += [TileFloor(rotation=6, noise=20, blur=7, contrast=80, shift_x=40)]
+    return cases
+
+
+# Frame-urile inregistrate: imagini (glob) sau un fisier de sesiune
+def load_frames(pattern):
+    if pattern.endswith(".rec"):
+        for kind, timestamp, data in session_recorder.read_session(pattern):
+            if kind == session_recorder.FRAME:
+                frame_id, jpeg = data
+                yield f"{pattern}#{frame_id}", cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)
+        return
+
+    for path in sorted(glob.glob(pattern)):
+        frame = cv2.imread(path, cv2.IMREAD_COLOR)
+        if frame is not None:
+            yield path, frame
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark pentru detectia liniilor de rost")
+    parser.add_argument("--frames", help="imagini inregistrate (glob) sau fisier de sesiune .rec")
+    parser.add_argument("--repeat", type=int, default=20, help="repetari pentru fiecare caz")
+    parser.add_argument("--output", help="fisierul JSON lines pentru rezultate (implicit stdout)")
+    parser.add_argument("--tile-size", type=int)
+    parser.add_argument("--grout-width", type=int)
+    parser.add_argument("--contrast", type=float)
+    parser.add_argument("--rotation", type=float)
+    parser.add_argument("--noise", type=float)
+    parser.add_argument("--blur", type=int)
+    args = parser.parse_args()
+
+    output = open(args.output, "w") if args.output else sys.stdout
+
+    if args.frames:
+        results = (benchmark_recorded(name, frame, args.repeat) for name, frame in load_frames(args.frames))
+    else:
+        custom = {name: value for name, value in (
+            ("tile_size", args.tile_size), ("grout_width", args.grout_width), ("contrast", args.contrast),
+            ("rotation", args.rotation), ("noise", args.noise), ("blur", args.blur)) if value is not None}
+        cases = [TileFloor(**custom)] if custom else default_suite()
+        results = (benchmark_synthetic(floor, args.repeat) for floor in cases)
+
+    for result in results:
+        output.write(json.dumps(result) + "\n")
+        output.flush()
+
+    if output is not sys.stdout:
+        output.close()
@@ -0,0 +1,66 @@
+# Produsele de viziune cerute de moduri si stari, calculate doar la cerere
+#
+# Fiecare mod (si fiecare stare a masinii din modul perie) declara de ce are nevoie:
+# nimic, imaginea color, imaginea binara, linia verticala sau cea orizontala.
+# Pentru un frame, produsele se calculeaza o singura data, la prima cerere.
+from enum import IntFlag
+# preprocesarea imaginii
+import line_detection
+
+
+# Produsele de viziune (se pot combina: Needs.VLINE | Needs.HLINE)
+class Needs(IntFlag):
+    NONE = 0
+    FRAME = 1     # Imaginea color (decodata de camera)
+    BINARY = 2    # Imaginea binara (gri, prag, blur)
+    VLINE = 4     # Linia verticala urmarita
+    HLINE = 8     # Linia orizontala urmarita
+
+    LINES = VLINE | HLINE
+    ALL = FRAME | BINARY | VLINE | HLINE
+
+
+# Adauga dependentele: liniile au nevoie de imaginea binara, iar aceasta de cea color
+def expand(needs):
+    if needs & Needs.LINES:
+        needs |= Needs.BINARY
+    if needs & Needs.BINARY:
+        needs |= Needs.FRAME
+    return Needs(needs)
+
+
+# Un frame si produsele calculate din el, pastrate pana la urmatorul frame
+class VisionFrame():
+    frame_id: int
+    frame_time: float
+    frame: object           # Imaginea color sau None (camera doar a golit buffer-ul)
+    available: Needs        # Produsele care se pot obtine pentru acest frame
+
+    def __init__(self, frame_id, frame_time, frame, binary=None, lines=None, available=None):
+        self.frame_id = frame_id
+        self.frame_time = frame_time
+        self.frame = frame
+        self._binary = binary
+        self._lines = lines
+
+        # In-proces totul se poate calcula din imaginea color;
+        # in modul pipeline produsele vin gata calculate din procesele de viziune
+        if available is None:
+            available = Needs.ALL if frame is not None else Needs.NONE
+        self.available = Needs(available)
+
+    # Imaginea binara, calculata la prima cerere
+    def binary(self):
+        if self._binary is None and self.frame is not None:
+            self._binary = line_detection.preprocess(self.frame)
+        return self._binary
+
+    # Liniile (hline, vline) cerute, calculate o singura data cu tracker-ul dat
+    def lines(self, tracker, needs):
+        if self._lines is None:
+            binary = self.binary()
+            if binary is None or not needs & Needs.LINES:
+                self._lines = (None, None)
+            else:
+                self._lines = tracker.update(binary, bool(needs & Needs.HLINE), bool(needs & Needs.VLINE))
+        return self._lines
@@ -0,0 +1,275 @@
+# Pipeline de viziune pe mai multe nuclee (optional, activat din mode_service)
+#
+#   proces captura:  camera -> preprocesare -> slot in inelul din memoria partajata
+#   proces detectie: slot -> tracker linii -> rezultat compact
+#   procesul de control (main.py): citeste rezultatele fara sa astepte
+#
+# Procesul de control scrie in antetul inelului produsele cerute de modul curent
+# (vision_frame.Needs); captura si detectia calculeaza doar ce se cere, iar fiecare
+# slot retine produsele calculate pentru frame-ul lui.
+#
+# Id-ul frame-ului circula prin tot pipeline-ul: captura il scrie in antetul slotului
+# si il trimite detectiei printr-un pipe, detectia il pune in rezultat.
+#
+# Procesele sunt pornite cu subprocess pe acest fisier (nu cu multiprocessing),
+# ca sa nu reimporte main.py si sa nu copieze firele procesului de control.
+import os
+import sys
+import struct
+import subprocess
+import time
+# memoria partajata pentru inelul de frame-uri
+from multiprocessing import shared_memory, resource_tracker
+# operatii pe array-uri
+import numpy as np
+# camera si preprocesarea imaginii
+import camera_service
+import line_detection
+import line_tracker
+# produsele de viziune cerute
+from vision_frame import Needs, expand
+
+# Numarul de sloturi din inel
+SLOTS = 4
+
+# Dimensiunile unui frame
+WIDTH, HEIGHT = camera_service.width, camera_service.height
+
+# Mesajele din pipe-ul de frame-uri: id-ul frame-ului (sau RESET_TRACKER)
+FRAME_MESSAGE = struct.Struct("<q")
+RESET_TRACKER = -1
+
+# Rezultatul detectiei: frame_id, timp captura, durata detectiei, produsele calculate,
+# hline valida + [x1, y1, x2, y2], vline valida + [x1, y1, x2, y2]
+RESULT_MESSAGE = struct.Struct("<qddI?4i?4i")
+
+
+# Vederi numpy peste blocul de memorie partajata (fara copiere)
+class FrameRing():
+    def __init__(self, shm):
+        self.shm = shm
+        offset = 0
+        # Produsele cerute de procesul de control (Needs)
+        self.needs = np.ndarray((1,), np.int64, shm.buf, offset)
+        offset += self.needs.nbytes
+        # Antet: id-ul frame-ului din fiecare slot (0 = gol), momentul capturii
+        # si produsele calculate pentru el
+        self.ids = np.ndarray((SLOTS,), np.int64, shm.buf, offset)
+        offset += self.ids.nbytes
+        self.times = np.ndarray((SLOTS,), np.float64, shm.buf, offset)
+        offset += self.times.nbytes
+        self.products = np.ndarray((SLOTS,), np.int64, shm.buf, offset)
+        offset += self.products.nbytes
+        # Imaginile color si cele binare
+        self.frames = np.ndarray((SLOTS, HEIGHT, WIDTH, 3), np.uint8, shm.buf, offset)
+        offset += self.frames.nbytes
+        self.binaries = np.ndarray((SLOTS, HEIGHT, WIDTH), np.uint8, shm.buf, offset)
+
+    @staticmethod
+    def size():
+        return 8 + SLOTS * (8 + 8 + 8 + HEIGHT * WIDTH * 3 + HEIGHT * WIDTH)
+
+    # Slotul in care se afla frame-ul cu id-ul dat
+    @staticmethod
+    def slot(frame_id):
+        return frame_id % SLOTS
+
+
+# Se ataseaza la memoria partajata creata de procesul de control
+# (fara inregistrare la resource_tracker, altfel blocul ar fi sters la iesirea copilului)
+def attach(name):
+    shm = shared_memory.SharedMemory(name=name)
+    resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+# Procesul de captura: citeste camera direct in slot si preproceseaza in slot
+def capture_main(shm_name, frame_fd, device):
+    ring = FrameRing(attach(shm_name))
+    cap = camera_service.open_capture(device)
+    gray = np.empty((HEIGHT, WIDTH), np.uint8)
+    parent = os.getppid()
+    frame_id = 0
+
+    while os.getppid() == parent:
+        slot = FrameRing.slot(frame_id + 1)
+        # Marcam slotul ca fiind in scriere
+        ring.ids[slot] = 0
+
+        needs = expand(int(ring.needs[0]))
+
+        if needs & Needs.FRAME:
+            ret, frame = cap.read(ring.frames[slot])
+        else:
+            # Nimeni nu are nevoie de imagine: doar golim buffer-ul camerei
+            ret, frame = cap.grab(), None
+        if not ret:
+            time.sleep(0.01)
+            continue
+
+        # Daca OpenCV a alocat alt buffer, il copiem in slot
+        if frame is not None and not np.shares_memory(frame, ring.frames[slot]):
+            ring.frames[slot][...] = frame
+
+        frame_id += 1
+        ring.times[slot] = time.time()
+        if needs & Needs.BINARY:
+            line_detection.preprocess(ring.frames[slot], gray, ring.binaries[slot])
+        ring.products[slot] = needs
+        ring.ids[slot] = frame_id
+
+        # Anuntam detectia; scrierile mici intr-un pipe sunt atomice
+        try:
+            os.write(frame_fd, FRAME_MESSAGE.pack(frame_id))
+        except BrokenPipeError:
+            break
+
+    cap.release()
+
+
+# Procesul de detectie: ruleaza tracker-ul pe cel mai nou frame anuntat
+def detect_main(shm_name, frame_fd, result_fd):
+    ring = FrameRing(attach(shm_name))
+    tracker = line_tracker.GroutTracker()
+
+    while True:
+        data = os.read(frame_fd, FRAME_MESSAGE.size * 64)
+        if not data:
+            break
+
+        # Procesam doar cel mai nou frame; cele mai vechi sunt sarite
+        messages = [FRAME_MESSAGE.unpack_from(data, i)[0] for i in range(0, len(data), FRAME_MESSAGE.size)]
+        if RESET_TRACKER in messages:
+            tracker.reset()
+        frame_id = max(messages)
+        if frame_id <= 0:
+            continue
+
+        slot = FrameRing.slot(frame_id)
+        if ring.ids[slot] != frame_id:
+            continue
+
+        # Liniile cerute cand a fost capturat frame-ul
+        products = Needs(int(ring.products[slot]))
+        start = time.perf_counter()
+        if products & Needs.LINES:
+            hline, vline = tracker.update(ring.binaries[slot], bool(products & Needs.HLINE), bool(products & Needs.VLINE))
+        else:
+            # Liniile nu sunt cerute: tracker-ul cauta din nou cand vor fi
+            tracker.reset()
+            hline, vline = None, None
+        detect_time = time.perf_counter() - start
+
+        # Slotul a fost suprascris in timpul detectiei - rezultatul nu mai e valid
+        if ring.ids[slot] != frame_id:
+            continue
+
+        os.write(result_fd, RESULT_MESSAGE.pack(
+            frame_id, ring.times[slot], detect_time, products,
+            hline is not None, *(hline or (0, 0, 0, 0)),
+            vline is not None, *(vline or (0, 0, 0, 0))))
+
+
+# Partea din procesul de control
+shm = None
+ring = None
+processes = []
+frame_write_fd = None
+result_read_fd = None
+
+
+# Porneste procesele de captura si detectie
+def start(device=camera_service.device):
+    global shm, ring, processes, frame_write_fd, result_read_fd
+
+    shm = shared_memory.SharedMemory(create=True, size=FrameRing.size())
+    ring = FrameRing(shm)
+    ring.ids[:] = 0
+    ring.needs[0] = Needs.ALL
+
+    frame_read_fd, frame_write_fd = os.pipe()
+    result_read_fd, result_write_fd = os.pipe()
+
+    script = os.path.abspath(__file__)
+    processes = [
+        subprocess.Popen([sys.executable, script, "capture", shm.name, str(frame_write_fd), device],
+                         pass_fds=(frame_write_fd,)),
+        subprocess.Popen([sys.executable, script, "detect", shm.name, str(frame_read_fd), str(result_write_fd)],
+                         pass_fds=(frame_read_fd, result_write_fd)),
+    ]
+
+    # Capetele copiilor nu mai sunt necesare aici; pastram frame_write_fd pentru RESET_TRACKER
+    os.close(frame_read_fd)
+    os.close(result_write_fd)
+    os.set_blocking(result_read_fd, False)
+
+
+# Returneaza cel mai nou rezultat sosit de la ultimul apel, fara sa astepte:
+# (frame_id, capture_time, detect_time, products, hline, vline) sau None daca nu a sosit nimic nou
+def get_latest_result():
+    try:
+        data = os.read(result_read_fd, RESULT_MESSAGE.size * 64)
+    except BlockingIOError:
+        return None
+
+    if len(data) < RESULT_MESSAGE.size:
+        return None
+
+    values = RESULT_MESSAGE.unpack_from(data, len(data) - RESULT_MESSAGE.size)
+    frame_id, capture_time, detect_time, products = values[0:4]
+    hline = list(values[5:9]) if values[4] else None
+    vline = list(values[10:14]) if values[9] else None
+    return frame_id, capture_time, detect_time, Needs(products), hline, vline
+
+
+# Imaginile (color, binara) pentru frame_id, ca vederi in memoria partajata;
+# None pentru imaginile care nu au fost calculate sau daca slotul a fost deja suprascris
+def get_frame(frame_id):
+    slot = FrameRing.slot(frame_id)
+    if ring.ids[slot] != frame_id:
+        return None, None
+    products = int(ring.products[slot])
+    frame = ring.frames[slot] if products & Needs.FRAME else None
+    frame_binary = ring.binaries[slot] if products & Needs.BINARY else None
+    return frame, frame_binary
+
+
+# Anunta procesele ce produse sunt cerute pentru urmatoarele frame-uri
+def set_needs(needs):
+    if ring is not None and ring.needs[0] != needs:
+        ring.needs[0] = needs
+
+
+# Cere procesului de detectie sa uite liniile urmarite
+def reset_tracker():
+    if frame_write_fd is not None:
+        os.write(frame_write_fd, FRAME_MESSAGE.pack(RESET_TRACKER))
+
+
+# Opreste procesele si elibereaza memoria partajata
+def stop():
+    global shm, ring, processes
+
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        process.wait(timeout=2)
+    processes = []
+
+    if shm is not None:
+        ring = None
+        shm.unlink()
+        try:
+            shm.close()
+        except BufferError:
+            # Mai exista vederi numpy (ex. in previzualizare); blocul dispare la iesirea procesului
+            pass
+        shm = None
+
+
+# Punctul de intrare pentru procesele copil
+if __name__ == "__main__":
+    if sys.argv[1] == "capture":
+        capture_main(sys.argv[2], int(sys.argv[3]), sys.argv[4])
+    elif sys.argv[1] == "detect":
+        detect_main(sys.argv[2], int(sys.argv[3]), int(sys.argv[4]))
@@ -24,10 +24,22 @@
 #define ASPIRATOR_TOGGLE 18         // Pinul pentru controlul aspiratorului (on/off)
 #define PERIE_TOGGLE 5              // Pinul pentru controlul periei (on/off)
 
+// Cat asteptam ecoul unei masuratori (ca timeout-ul vechi al pulseIn: 100ms)
+#define ULTRASONIC_TIMEOUT 100000UL
+
 // Clasa pentru gestionarea senzorilor ultrasonici
+// Masurarea nu blocheaza bucla: trigger() trimite pulsul, intreruperea pinului echo
+// noteaza fronturile, iar poll() verifica la fiecare trecere prin loop daca ecoul a sosit
 class Ultrasonic {
 public:
     int echo, trig;  // Pinii pentru echo si trigger
+    float distance = 0.0f;                 // Ultima distanta masurata (cm, 0 = fara ecou)
+    volatile bool measuring = false;       // Daca asteptam ecoul
+    unsigned long triggerTime = 0;         // Momentul pulsului de trigger (micros)
+    volatile bool echoStarted = false;     // Frontul crescator al ecoului a fost vazut
+    volatile bool echoDone = false;        // Frontul descrescator al ecoului a fost vazut
+    volatile unsigned long echoStart = 0;  // Momentul frontului crescator (micros)
+    volatile unsigned long echoEnd = 0;    // Momentul frontului descrescator (micros)
 
     // Constructor implicit - initializeaza pinii cu 0
     Ultrasonic() {
@@ -44,9 +56,11 @@ public:
         pinMode(trig, OUTPUT); // Seteaza pinul trigger ca iesire
     }
 
-    // Functie pentru masurarea distantei cu senzorul ultrasonic
-    float measure() {
-        long duration;  // Variabila pentru stocarea duratei pulsului
+    // Porneste o masuratoare (blocheaza doar cele ~12 microsecunde ale pulsului)
+    void trigger() {
+        this->echoStarted = false;
+        this->echoDone = false;
+        this->measuring = true;
 
         // Genereaza pulsul de trigger pentru senzorul ultrasonic
         digitalWrite(this->trig, LOW);   // Asigura ca trigger-ul este LOW
@@ -55,13 +69,44 @@ public:
         delayMicroseconds(10);           // Mentine pulsul 10 microsecunde
         digitalWrite(this->trig, LOW);   // Opreste pulsul
 
-        // Masoara durata pulsului de la echo (cu timeout de 100ms)
-        duration = pulseIn(this->echo, HIGH, 100000);
+        this->triggerTime = micros();
+    }
+
+    // Apelata din intreruperea pinului echo (la ambele fronturi)
+    void onEcho() {
+        if(!this->measuring)
+            return;
+        if(digitalRead(this->echo)) {
+            this->echoStart = micros();
+            this->echoStarted = true;
+        } else if(this->echoStarted) {
+            this->echoEnd = micros();
+            this->echoDone = true;
+        }
+    }
+
+    // Verifica masuratoarea in curs; returneaza true cand s-a terminat (ecou sau timeout)
+    bool poll() {
+        if(!this->measuring)
+            return true;
+
+        if(this->echoDone) {
+            // Converteste durata in distanta (cm) folosind viteza sunetului
+            // Formula: distanta = (durata * viteza_sunet) / 2
+            // Viteza sunetului: 343 m/s = 0.0343 cm/microsecunda
+            unsigned long duration = this->echoEnd - this->echoStart;
+            this->distance = ((float)duration) * 0.034f / 2.f;
+            this->measuring = false;
+            return true;
+        }
 
-        // Converteste durata in distanta (cm) folosind viteza sunetului
-        // Formula: distanta = (durata * viteza_sunet) / 2
-        // Viteza sunetului: 343 m/s = 0.0343 cm/microsecunda
-        return ((float)duration) * 0.034f / 2.f;
+        if(micros() - this->triggerTime > ULTRASONIC_TIMEOUT) {
+            // Fara ecou in timp util: ca pulseIn, distanta este 0
+            this->distance = 0.0f;
+            this->measuring = false;
+            return true;
+        }
+        return false;
     }
 };
 
@@ -77,6 +122,10 @@ float fclamp(float x, float min, float max) {
     return x;                // Altfel returneaza valoarea originala
 }
 
+// Parametrii reglarii locale a pozitiei (comanda GOAL)
+#define GOAL_SLOWDOWN 200.0f     // Cu cati pasi inainte de tinta incepe incetinirea
+#define GOAL_MIN_SPEED 0.35f     // Fractiunea minima din viteza (sub ea motoarele se blocheaza)
+
 // Clasa pentru gestionarea motoarelor cu encoder rotativ
 class Motor {
 public:
@@ -152,6 +201,40 @@ public:
         }
     }
 
+    // Tinta de pozitie executata local (comanda GOAL)
+    bool goalActive = false;               // Daca motorul urmareste o tinta
+    long goalPosition = 0;                 // Pozitia tinta (in pasi de encoder)
+
+    // Porneste o tinta relativa la pozitia curenta
+    void startGoal(long relative) {
+        this->goalPosition = this->position + relative;
+        this->goalActive = (relative != 0);
+    }
+
+    // Regleaza viteza si directia spre tinta; returneaza true cand tinta este atinsa
+    // Viteza scade liniar in ultimii GOAL_SLOWDOWN pasi, dar nu sub GOAL_MIN_SPEED
+    bool runGoal(float maxSpeed, long deadBand) {
+        if(!this->goalActive)
+            return true;
+
+        long error = this->goalPosition - this->position;
+        if(labs(error) <= deadBand) {
+            this->setSpeed(0.0f);
+            this->goalActive = false;
+            return true;
+        }
+
+        // Pozitia scade cand motorul merge inainte (direction = false)
+        this->setDirection(error > 0);
+        this->setSpeed(maxSpeed * fclamp((float)labs(error) / GOAL_SLOWDOWN, GOAL_MIN_SPEED, 1.0f));
+        return false;
+    }
+
+    // Opreste urmarirea tintei (fara sa schimbe viteza)
+    void cancelGoal() {
+        this->goalActive = false;
+    }
+
     // Functie pentru setarea vitezei motorului (0.0 - 1.0)
     void setSpeed(float x) {
         this->targetValue = x;
@@ -168,71 +251,223 @@ Ultrasonic us_front;  // Senzorul ultrasonic din fata
 Ultrasonic us_left;   // Senzorul ultrasonic din stanga
 Ultrasonic us_right;  // Senzorul ultrasonic din dreapta
 
+// Senzorii sunt masurati pe rand (un singur puls in aer, fara ecouri incrucisate)
+Ultrasonic* ultrasonics[] = {&us_front, &us_left, &us_right};
+#define ULTRASONIC_COUNT 3
+int currentUltrasonic = 0;  // Senzorul masurat acum
+
+// Intreruperile pinilor echo (attachInterrupt cere cate o functie pentru fiecare senzor)
+void EchoFront() { us_front.onEcho(); }
+void EchoLeft() { us_left.onEcho(); }
+void EchoRight() { us_right.onEcho(); }
+
+// Avanseaza masurarea senzorilor ultrasonici, la fiecare trecere prin loop (fara asteptare)
+void RunUltrasonics() {
+    Ultrasonic* sensor = ultrasonics[currentUltrasonic];
+    if(!sensor->measuring) {
+        sensor->trigger();
+        return;
+    }
+    if(sensor->poll())
+        currentUltrasonic = (currentUltrasonic + 1) % ULTRASONIC_COUNT;
+}
+
 // Declararea obiectelor pentru motoare
 Motor motor_left;   // Motorul stang
 Motor motor_right;  // Motorul drept
 
 // Variabile pentru gestionarea trimiterii mesajelor de update
 unsigned long lastTimer_UpdateMessage = 0;   // Timpul ultimului mesaj trimis
-#define UPDATE_MESSAGE_DELAY (1000 / 20)     // Delay-ul dintre mesaje (50ms = 20Hz)
+#define UPDATE_MESSAGE_DELAY (1000 / 20)     // Delay-ul implicit dintre mesaje (50ms = 20Hz)
+unsigned long updateMessageDelay = UPDATE_MESSAGE_DELAY;  // Delay-ul curent (poate fi schimbat prin HELLO)
+#define MIN_UPDATE_MESSAGE_DELAY UPDATE_MESSAGE_DELAY  // Cea mai mica perioada acceptata prin HELLO (senzorii ultrasonici)
+
+// Protocolul de telemetrie
+// v1: 24 bytes - 0x54 + date
+// v2: 32 bytes - 0x55 + numar de ordine (uint16) + micros() (uint32) + date + CRC-16/CCITT
+// Placa porneste in v1 la 9600 baud; calculatorul cere v2 cu comanda HELLO
+#define PACKET_V1 0x54
+#define PACKET_V2 0x55
+#define PACKET_ACK 0x56
+#define PACKET_GOAL 0x57
+// v3: pachete v2 + comenzile GOAL / GOAL_CONFIG si raportul de tinta atinsa
+#define PROTOCOL_MAX_VERSION 3
+int protocolVersion = 1;                      // Versiunea curenta a protocolului
+uint16_t updateSeq = 0;                       // Numarul de ordine al pachetelor v2
+
+// Vitezele suportate (indexul este trimis in HELLO / ACK)
+const unsigned long BAUD_RATES[] = {9600, 115200, 230400, 460800, 921600};
+#define BAUD_RATES_COUNT 5
+
+// CRC-16/CCITT (polinom 0x1021, valoare initiala 0xFFFF)
+uint16_t crc16(const uint8_t* data, int length) {
+    uint16_t crc = 0xFFFF;
+    for(int i = 0; i < length; i++) {
+        crc ^= (uint16_t)data[i] << 8;
+        for(int bit = 0; bit < 8; bit++)
+            crc = (crc & 0x8000) ? (crc << 1) ^ 0x1021 : (crc << 1);
+    }
+    return crc;
+}
 
 // Functie pentru trimiterea mesajelor de status catre calculatorul principal
 void SendUpdateMessage() {
     unsigned long currTime = millis();
     // Verifica daca a trecut suficient timp de la ultimul mesaj
-    if(lastTimer_UpdateMessage + UPDATE_MESSAGE_DELAY > currTime)
+    if(lastTimer_UpdateMessage + updateMessageDelay > currTime)
         return;
     
-    // Citeste distantele de la senzorii ultrasonici
-    float front = us_front.measure();   // Distanta din fata
-    float left = us_left.measure();     // Distanta din stanga
-    float right = us_right.measure();   // Distanta din dreapta
+    // Ultimele distante masurate de senzorii ultrasonici (vezi RunUltrasonics)
+    float front = us_front.distance;    // Distanta din fata
+    float left = us_left.distance;      // Distanta din stanga
+    float right = us_right.distance;    // Distanta din dreapta
 
     // Citeste senzorii digitali
     bool ir_scara = digitalRead(IR_SCARI);           // Senzorul pentru detectarea scarilor
     bool ir_aspirator = digitalRead(IR_ASPIRATOR);   // Senzorul infrarosu al aspiratorului
     bool senzor_umiditate = digitalRead(SENZOR_UMIDITATE);  // Senzorul de umiditate
 
-    char byteBuffer[24];  // Buffer pentru datele care vor fi trimise (24 bytes)
-    
-    // ID-ul pachetului pentru identificare
-    byteBuffer[0] = 0x54;
+    // Momentul la care sunt citite pozitiile motoarelor (pentru alinierea cu frame-urile camerei)
+    unsigned long measureTime = micros();
+
+    uint8_t byteBuffer[32];  // Buffer pentru datele care vor fi trimise (24 bytes v1, 32 bytes v2)
+    int offset = 1;          // Unde incep datele senzorilor in buffer
+
+    if(protocolVersion >= 2) {
+        // ID-ul pachetului, numarul de ordine si momentul masurarii
+        byteBuffer[0] = PACKET_V2;
+        memcpy(byteBuffer + 1, &updateSeq, 2);
+        memcpy(byteBuffer + 3, &measureTime, 4);
+        updateSeq++;
+        offset = 7;
+    } else {
+        // ID-ul pachetului pentru identificare
+        byteBuffer[0] = PACKET_V1;
+    }
 
     // Converteste si copiaza distanta din fata (4 bytes - float)
     for(int i = 0; i < 4; i++)
-        byteBuffer[i + 1] = ((char*)&front)[i];
+        byteBuffer[offset + i] = ((uint8_t*)&front)[i];
 
     // Converteste si copiaza distanta din stanga (4 bytes - float)
     for(int i = 0; i < 4; i++)
-        byteBuffer[i + 5] = ((char*)&left)[i];
+        byteBuffer[offset + 4 + i] = ((uint8_t*)&left)[i];
 
     // Converteste si copiaza distanta din dreapta (4 bytes - float)
     for(int i = 0; i < 4; i++) 
-        byteBuffer[i + 9] = ((char*)&right)[i];
+        byteBuffer[offset + 8 + i] = ((uint8_t*)&right)[i];
     
     // Copiaza valorile senzorilor digitali (1 byte fiecare)
-    byteBuffer[13] = (char)ir_scara;
-    byteBuffer[14] = (char)ir_aspirator;
-    byteBuffer[15] = (char)senzor_umiditate;
+    byteBuffer[offset + 12] = (uint8_t)ir_scara;
+    byteBuffer[offset + 13] = (uint8_t)ir_aspirator;
+    byteBuffer[offset + 14] = (uint8_t)senzor_umiditate;
 
     // Converteste si copiaza pozitia motorului stang (4 bytes - long)
     for(int i = 0; i < 4; i++)
-        byteBuffer[16 + i] = ((char*)&motor_left.position)[i];
+        byteBuffer[offset + 15 + i] = ((uint8_t*)&motor_left.position)[i];
 
     // Converteste si copiaza pozitia motorului drept (4 bytes - long)
     for(int i = 0; i < 4; i++)
-        byteBuffer[20 + i] = ((char*)&motor_right.position)[i];
+        byteBuffer[offset + 19 + i] = ((uint8_t*)&motor_right.position)[i];
+
+    int length = offset + 23;
+    if(protocolVersion >= 2) {
+        // Suma de control peste tot pachetul
+        uint16_t crc = crc16(byteBuffer, length);
+        memcpy(byteBuffer + length, &crc, 2);
+        length += 2;
+    }
 
     // Trimite toate datele prin portul serial
-    Serial.write(byteBuffer, 24);
+    Serial.write(byteBuffer, length);
 
     // Actualizeaza timpul ultimului mesaj trimis
     lastTimer_UpdateMessage = currTime;
 }
 
+// Raspunde la HELLO si trece la versiunea, viteza si frecventa cerute
+// Comanda: 0xC5 0x5C versiune cod_viteza perioada_ms 0
+void HandleHello(uint8_t version, uint8_t baudCode, uint8_t period) {
+    // Ignoram valorile pe care nu le cunoastem; o versiune mai noua primeste cea mai noua suportata
+    if(version < 1 || baudCode >= BAUD_RATES_COUNT || period == 0)
+        return;
+    if(version > PROTOCOL_MAX_VERSION)
+        version = PROTOCOL_MAX_VERSION;
+    // O perioada prea mica este limitata; ACK-ul raporteaza perioada folosita de fapt
+    if(period < MIN_UPDATE_MESSAGE_DELAY)
+        period = MIN_UPDATE_MESSAGE_DELAY;
+
+    // ACK-ul se trimite la viteza curenta: 0x56 versiune cod_viteza perioada_ms CRC
+    uint8_t ack[6] = {PACKET_ACK, version, baudCode, period, 0, 0};
+    uint16_t crc = crc16(ack, 4);
+    memcpy(ack + 4, &crc, 2);
+    Serial.write(ack, 6);
+    Serial.flush();
+
+    // Abia dupa ce ACK-ul a plecat schimbam viteza
+    Serial.end();
+    Serial.begin(BAUD_RATES[baudCode]);
+
+    protocolVersion = version;
+    updateMessageDelay = period;
+    updateSeq = 0;
+}
+
+// Tinta de pozitie curenta (comanda GOAL, protocolul v3)
+bool goalActive = false;                     // Daca se executa o tinta
+uint8_t goalId = 0;                          // Id-ul tintei, ales de calculator
+float goalMaxSpeed = 120 / 255.f;            // Viteza maxima in timpul tintei (0-1)
+long goalDeadBand = 10;                      // Toleranta (pasi) in jurul tintei
+#define GOAL_REACHED 1
+#define GOAL_CANCELLED 2
+
+// Raporteaza terminarea tintei: 0x57 id stare CRC
+void SendGoalReport(uint8_t status) {
+    uint8_t report[5] = {PACKET_GOAL, goalId, status, 0, 0};
+    uint16_t crc = crc16(report, 3);
+    memcpy(report + 3, &crc, 2);
+    Serial.write(report, 5);
+}
+
+// Porneste o tinta relativa pentru ambele motoare (in pasi de encoder)
+// Comanda: 0x9D id pasi_stanga (int16) pasi_dreapta (int16)
+void HandleGoal(uint8_t id, int16_t left, int16_t right) {
+    // O tinta noua o inlocuieste pe cea veche
+    if(goalActive)
+        SendGoalReport(GOAL_CANCELLED);
+
+    goalId = id;
+    motor_left.startGoal(left);
+    motor_right.startGoal(right);
+    goalActive = true;
+}
+
+// Opreste tinta curenta (la orice comanda directa pentru motoare)
+void CancelGoal() {
+    if(!goalActive)
+        return;
+    motor_left.cancelGoal();
+    motor_right.cancelGoal();
+    goalActive = false;
+    SendGoalReport(GOAL_CANCELLED);
+}
+
+// Reglarea pozitiei, la fiecare trecere prin loop
+void RunGoal() {
+    if(!goalActive)
+        return;
+
+    bool leftDone = motor_left.runGoal(goalMaxSpeed, goalDeadBand);
+    bool rightDone = motor_right.runGoal(goalMaxSpeed, goalDeadBand);
+    if(leftDone && rightDone) {
+        goalActive = false;
+        SendGoalReport(GOAL_REACHED);
+    }
+}
+
 // Functia de setup - se executa o singura data la pornirea Arduino-ului
 void setup() {
-    // Initializeaza comunicarea seriala la 9600 baud
+    // Initializeaza comunicarea seriala la 9600 baud (protocolul v1, pana la primul HELLO)
     Serial.begin(9600);
 
     // Configureaza pinii pentru controlul aspiratorului si periei ca iesiri
@@ -251,6 +486,9 @@ void setup() {
     us_front.begin(ULTRASONIC_FATA_ECHO, ULTRASONIC_FATA_TRIG);
     us_left.begin(ULTRASONIC_STANGA_ECHO, ULTRASONIC_STANGA_TRIG);
     us_right.begin(ULTRASONIC_DREAPTA_ECHO, ULTRASONIC_DREAPTA_TRIG);
+    attachInterrupt(digitalPinToInterrupt(ULTRASONIC_FATA_ECHO), EchoFront, CHANGE);
+    attachInterrupt(digitalPinToInterrupt(ULTRASONIC_STANGA_ECHO), EchoLeft, CHANGE);
+    attachInterrupt(digitalPinToInterrupt(ULTRASONIC_DREAPTA_ECHO), EchoRight, CHANGE);
 
     // Initializeaza motoarele cu pinii corespunzatori
     // Atentie: pare sa fie o inversare in nume - motor_left foloseste pinii DREAPTA
@@ -270,6 +508,9 @@ void loop() {
 
         // Verifica daca primii 2 bytes sunt header-ul pentru comanda motoarelor
         if(incomingBytes[0] == 0xF0 && incomingBytes[1] == 0x0F) {
+            // O comanda directa opreste tinta de pozitie in curs
+            CancelGoal();
+
             // Extrage parametrii pentru motoare din mesaj
             float motor_a_speed = incomingBytes[2] / 255.f;    // Viteza motorului A (0-1)
             float motor_b_speed = incomingBytes[3] / 255.f;    // Viteza motorului B (0-1)
@@ -297,12 +538,35 @@ void loop() {
             // Controleaza aspiratorul si peria pe baza comenzilor primite
             digitalWrite(ASPIRATOR_TOGGLE, incomingBytes[2]);  // Porneste/opreste aspiratorul
             digitalWrite(PERIE_TOGGLE, incomingBytes[3]);      // Porneste/opreste peria
+
+        // Verifica daca primii 2 bytes sunt header-ul pentru negocierea protocolului (HELLO)
+        }else if((uint8_t)incomingBytes[0] == 0xC5 && (uint8_t)incomingBytes[1] == 0x5C) {
+            HandleHello(incomingBytes[2], incomingBytes[3], incomingBytes[4]);
+
+        // Verifica daca primul byte este header-ul pentru tinta de pozitie (GOAL)
+        // (comanda foloseste un singur byte de header, al doilea este id-ul tintei)
+        }else if((uint8_t)incomingBytes[0] == 0x9D && protocolVersion >= 3) {
+            int16_t left, right;
+            memcpy(&left, incomingBytes + 2, 2);
+            memcpy(&right, incomingBytes + 4, 2);
+            HandleGoal(incomingBytes[1], left, right);
+
+        // Verifica daca primii 2 bytes sunt header-ul pentru parametrii tintei (GOAL_CONFIG)
+        }else if((uint8_t)incomingBytes[0] == 0x9E && (uint8_t)incomingBytes[1] == 0xE9) {
+            goalMaxSpeed = (uint8_t)incomingBytes[2] / 255.f;   // Viteza maxima (0-255)
+            goalDeadBand = (uint8_t)incomingBytes[3];           // Toleranta (pasi)
         }
     }
 
+    // Masoara distantele fara sa blocheze bucla (encoder-ii si tinta sunt citite la fiecare trecere)
+    RunUltrasonics();
+
     // Trimite mesajul de update cu statusul robotului
     SendUpdateMessage();
 
+    // Regleaza tinta de pozitie (daca exista) inainte de actualizarea motoarelor
+    RunGoal();
+
     // Ruleaza motoarele (actualizeaza PWM si citeste encoder-ii)
     motor_left.run();
     motor_right.run();